@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ai_literacy_backend.settings')
+# Serve the progress endpoints with the async views (courses/async_views.py)
+os.environ.setdefault('ASYNC_PROGRESS_VIEWS', '1')
 
 application = get_asgi_application()
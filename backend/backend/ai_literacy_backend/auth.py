@@ -0,0 +1,123 @@
+"""
+Authentication middleware with a short-lived per-process user cache.
+
+Django's AuthenticationMiddleware loads ``request.user`` from the database on
+every request. CachedUserAuthenticationMiddleware keeps the loaded user in
+process memory for USER_CACHE_TTL seconds (0 disables the cache). Together with
+a cache-backed or signed-cookie session (SESSION_STORE) an authenticated
+request needs no query before the view runs.
+
+A cached user is still checked against the session's auth hash on every
+request, so a session from before a password change is rejected as soon as the
+entry is refreshed. Saving or deleting a user drops its entry in this process;
+other processes pick up the change within the TTL.
+
+The cache holds at most USER_CACHE_SIZE users. Entries are kept in the order
+they were stored, which is also the order they expire in, so each insert first
+drops expired entries from the front and then the oldest ones beyond the cap.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, aget_user, get_user
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+_users = OrderedDict()  # user_id -> (expires_at, user), oldest first
+_lock = threading.Lock()
+
+
+def clear_user_cache(user_id=None):
+    with _lock:
+        if user_id is None:
+            _users.clear()
+        else:
+            _users.pop(user_id, None)
+
+
+def _cached(user_id, session_hash):
+    with _lock:
+        entry = _users.get(user_id)
+    if entry is None or entry[0] <= time.monotonic():
+        return None
+    user = entry[1]
+    if not session_hash or not constant_time_compare(session_hash, user.get_session_auth_hash()):
+        return None
+    # Each request gets its own instance; views may modify request.user
+    return copy.copy(user)
+
+
+def _remember(user_id, user, ttl):
+    if not user.is_authenticated:
+        clear_user_cache(user_id)
+        return
+    now = time.monotonic()
+    size = getattr(settings, 'USER_CACHE_SIZE', 10000)
+    with _lock:
+        _users.pop(user_id, None)
+        _users[user_id] = (now + ttl, copy.copy(user))
+        while _users:
+            expires_at, _ = next(iter(_users.values()))
+            if expires_at > now and len(_users) <= size:
+                break
+            _users.popitem(last=False)
+
+
+def _cacheable_user_id(session_user_id, backend_path):
+    if session_user_id is None or backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return None
+    return User._meta.pk.to_python(session_user_id)
+
+
+def get_cached_user(request):
+    """get_user() served from the per-process cache when possible"""
+    ttl = getattr(settings, 'USER_CACHE_TTL', 0)
+    user_id = ttl and _cacheable_user_id(request.session.get(SESSION_KEY), request.session.get(BACKEND_SESSION_KEY))
+    if not user_id:
+        return get_user(request)
+
+    user = _cached(user_id, request.session.get(HASH_SESSION_KEY))
+    if user is None:
+        # Miss, expiry or hash mismatch: the full check also flushes stale sessions
+        user = get_user(request)
+        _remember(user_id, user, ttl)
+    return user
+
+
+async def aget_cached_user(request):
+    """Async counterpart of get_cached_user() for async views"""
+    ttl = getattr(settings, 'USER_CACHE_TTL', 0)
+    user_id = ttl and _cacheable_user_id(
+        await request.session.aget(SESSION_KEY), await request.session.aget(BACKEND_SESSION_KEY)
+    )
+    if not user_id:
+        return await aget_user(request)
+
+    user = _cached(user_id, await request.session.aget(HASH_SESSION_KEY))
+    if user is None:
+        user = await aget_user(request)
+        _remember(user_id, user, ttl)
+    return user
+
+
+class CachedUserAuthenticationMiddleware(AuthenticationMiddleware):
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
+        request.auser = partial(aget_cached_user, request)
+
+
+def _drop_cached_user(sender, instance, **kwargs):
+    clear_user_cache(instance.pk)
+
+
+post_save.connect(_drop_cached_user, sender=User, dispatch_uid='ai_literacy_backend.auth.user_saved')
+post_delete.connect(_drop_cached_user, sender=User, dispatch_uid='ai_literacy_backend.auth.user_deleted')
@@ -0,0 +1,54 @@
+"""
+Precompression helpers for immutable responses.
+
+Bodies are compressed once at build time at the highest level (gzip 9,
+brotli 11), and ``negotiate_encoding`` picks which stored variant to send.
+``brotli`` is in requirements.txt. Where it isn't installed, only gzip and
+identity variants are produced.
+"""
+
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def gzip_compress(data):
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_compress(data):
+    """Return the brotli-compressed body, or None when brotli isn't installed"""
+    if brotli is None:
+        return None
+    return brotli.compress(data, quality=11)
+
+
+def negotiate_encoding(accept_encoding, available):
+    """Pick the first of ``available`` (in server preference order) the client accepts.
+
+    Returns None when the identity encoding should be sent.
+    """
+    accepted = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+
+    for coding in available:
+        if accepted.get(coding, accepted.get('*', 0.0)) > 0:
+            return coding
+    return None
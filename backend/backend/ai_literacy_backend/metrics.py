@@ -0,0 +1,266 @@
+"""
+Per-view request metrics.
+
+MetricsMiddleware records, for every request, the resolved view name, status,
+latency, number of SQL queries, time spent in the database and response size.
+Totals are kept in memory per process and exposed in the Prometheus text
+format by ``metrics_view`` (mounted at /api/_metrics).
+
+Settings:
+
+- METRICS_LOG_REQUESTS: also log one JSON line per request.
+- METRICS_SLOW_REQUEST_MS: log a warning with the executed SQL for requests
+  slower than this many milliseconds (0 disables).
+- METRICS_TOKEN: if set, /api/_metrics requires ``Authorization: Bearer <token>``;
+  otherwise only staff users may read it.
+
+Queries are counted by an execute_wrapper installed once on every database
+connection, in whichever thread opens it. It hands each query to the recorder
+of the current request, found through a context variable. Under ASGI the ORM
+runs in sync_to_async worker threads, which inherit the request's context, so
+their queries are counted as well.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Only this many statements are kept per request for the slow-request log
+MAX_RECORDED_SQL = 50
+
+
+class QueryRecorder:
+    """execute_wrapper that counts queries and the time spent running them"""
+
+    __slots__ = ('count', 'duration', 'statements')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            if len(self.statements) < MAX_RECORDED_SQL:
+                self.statements.append((sql, elapsed))
+
+
+_current_recorder = ContextVar('metrics_query_recorder', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def _install(sender=None, connection=None, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(_install)
+# Connections opened before this module was imported never sent connection_created
+for _connection in connections.all(initialized_only=True):
+    _install(connection=_connection)
+
+
+@contextmanager
+def _recording():
+    """Count the queries run in the current context, in any thread, on a new QueryRecorder"""
+    recorder = QueryRecorder()
+    token = _current_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current_recorder.reset(token)
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'total', 'observations')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.observations = 0
+
+    def observe(self, value):
+        self.total += value
+        self.observations += 1
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.observations}')
+        lines.append(f'{name}_sum{{{labels}}} {self.total:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {self.observations}')
+        return lines
+
+
+class _ViewStats:
+    __slots__ = ('latency', 'queries', 'db_seconds', 'response_bytes')
+
+    def __init__(self):
+        self.latency = _Histogram(LATENCY_BUCKETS)
+        self.queries = _Histogram(QUERY_BUCKETS)
+        self.db_seconds = 0.0
+        self.response_bytes = 0
+
+
+class MetricsRegistry:
+    """Thread-safe in-process store of per-view request metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = defaultdict(_ViewStats)
+        self._requests = defaultdict(int)
+
+    def observe(self, view, method, status, latency, queries, db_seconds, response_bytes):
+        with self._lock:
+            stats = self._views[view]
+            stats.latency.observe(latency)
+            stats.queries.observe(queries)
+            stats.db_seconds += db_seconds
+            stats.response_bytes += response_bytes
+            self._requests[(view, method, status)] += 1
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+            self._requests.clear()
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                '# HELP http_requests_total Requests handled, by view, method and status.',
+                '# TYPE http_requests_total counter',
+            ]
+            for (view, method, status), count in sorted(self._requests.items()):
+                lines.append(f'http_requests_total{{view="{view}",method="{method}",status="{status}"}} {count}')
+
+            lines += [
+                '# HELP http_request_duration_seconds Request latency, by view.',
+                '# TYPE http_request_duration_seconds histogram',
+            ]
+            for view, stats in sorted(self._views.items()):
+                lines += stats.latency.render('http_request_duration_seconds', f'view="{view}"')
+
+            lines += [
+                '# HELP db_queries_per_request SQL queries executed per request, by view.',
+                '# TYPE db_queries_per_request histogram',
+            ]
+            for view, stats in sorted(self._views.items()):
+                lines += stats.queries.render('db_queries_per_request', f'view="{view}"')
+
+            lines += [
+                '# HELP db_query_seconds_total Time spent executing SQL, by view.',
+                '# TYPE db_query_seconds_total counter',
+            ]
+            for view, stats in sorted(self._views.items()):
+                lines.append(f'db_query_seconds_total{{view="{view}"}} {stats.db_seconds:.6f}')
+
+            lines += [
+                '# HELP http_response_bytes_total Response body bytes sent, by view.',
+                '# TYPE http_response_bytes_total counter',
+            ]
+            for view, stats in sorted(self._views.items()):
+                lines.append(f'http_response_bytes_total{{view="{view}"}} {stats.response_bytes}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with _recording() as recorder:
+            response = self.get_response(request)
+        self.record(request, response, recorder, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        # Async views must not be forced onto a thread just to be measured
+        started = time.perf_counter()
+        with _recording() as recorder:
+            response = await self.get_response(request)
+        self.record(request, response, recorder, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, recorder, latency):
+        match = getattr(request, 'resolver_match', None)
+        # Unresolved paths share one label so scanners can't blow up cardinality
+        view = match.view_name if match else 'unmatched'
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(view, request.method, response.status_code, latency, recorder.count, recorder.duration, size)
+
+        record = {
+            'view': view,
+            'method': request.method,
+            'status': response.status_code,
+            'latency_ms': round(latency * 1000, 2),
+            'queries': recorder.count,
+            'db_ms': round(recorder.duration * 1000, 2),
+            'bytes': size,
+        }
+        if getattr(settings, 'METRICS_LOG_REQUESTS', False):
+            logger.info(json.dumps(record))
+        slow_ms = getattr(settings, 'METRICS_SLOW_REQUEST_MS', 0)
+        if slow_ms and latency * 1000 >= slow_ms:
+            record['sql'] = [
+                {'ms': round(elapsed * 1000, 2), 'sql': sql} for sql, elapsed in recorder.statements
+            ]
+            logger.warning('Slow request %s', json.dumps(record))
+
+
+def metrics_view(request):
+    """Expose the registry in the Prometheus text format"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not constant_time_compare(supplied, token):
+            return HttpResponseForbidden()
+    elif not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
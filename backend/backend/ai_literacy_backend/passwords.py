@@ -0,0 +1,177 @@
+"""
+Password hashing for the login and register endpoints.
+
+The preferred hasher is picked with PASSWORD_HASHER (``scrypt``, ``argon2`` or
+``pbkdf2``) and its cost is tunable from settings. Stored hashes made with
+another algorithm or other parameters are upgraded the next time the user logs
+in successfully.
+
+Hashing is CPU-bound, so it runs on a small per-process thread pool
+(PASSWORD_HASH_WORKERS threads). At most PASSWORD_HASH_QUEUE more hashes may
+wait for a thread; beyond that ``HashingBusy`` is raised, so that a cohort
+logging in at once is turned away with 503 instead of starving the progress
+endpoints of CPU.
+
+Bulk imports instead use ``bulk_hasher()``, which spreads hashing over
+PASSWORD_IMPORT_WORKERS worker processes.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+from django.contrib.auth import user_login_failed
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, ScryptPasswordHasher, make_password, verify_password,
+)
+from django.contrib.auth.models import User
+from rest_framework.response import Response
+
+MODEL_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+# Seconds a client should wait before retrying when the pool is saturated
+BUSY_RETRY_AFTER = 1
+
+
+class TunableScryptPasswordHasher(ScryptPasswordHasher):
+    """scrypt with N, r and p read from SCRYPT_WORK_FACTOR/_BLOCK_SIZE/_PARALLELISM"""
+
+    @property
+    def work_factor(self):
+        return getattr(settings, 'SCRYPT_WORK_FACTOR', ScryptPasswordHasher.work_factor)
+
+    @property
+    def block_size(self):
+        return getattr(settings, 'SCRYPT_BLOCK_SIZE', ScryptPasswordHasher.block_size)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'SCRYPT_PARALLELISM', ScryptPasswordHasher.parallelism)
+
+
+class TunableArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id with costs read from ARGON2_TIME_COST/_MEMORY_COST/_PARALLELISM"""
+
+    @property
+    def time_cost(self):
+        return getattr(settings, 'ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool and its queue are full"""
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash'
+                )
+    return _executor
+
+
+def _run(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy
+    try:
+        future = _get_executor().submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future.result()
+
+
+def _verify(password, encoded):
+    # Re-encode in the pool too, so a rehash never runs on the request thread
+    is_correct, must_update = verify_password(password, encoded)
+    return is_correct, make_password(password) if is_correct and must_update else None
+
+
+def hash_password(password):
+    """make_password() on the hashing pool"""
+    return _run(make_password, password)
+
+
+def check_password(password, encoded):
+    """Whether ``password`` matches the hash ``encoded``, checked on the hashing pool"""
+    return _run(verify_password, password, encoded)[0]
+
+
+def authenticate_user(request, username, password):
+    """
+    Equivalent of authenticate() with ModelBackend, hashing on the pool.
+
+    Returns the user or None, and saves an upgraded hash when the stored one
+    uses an older algorithm or cost.
+    """
+    if username is None or password is None:
+        return None
+    try:
+        user = User._default_manager.get_by_natural_key(username)
+    except User.DoesNotExist:
+        # Hash anyway so response time doesn't reveal whether the user exists
+        _run(make_password, password)
+        user = None
+    else:
+        is_correct, upgraded = _run(_verify, password, user.password)
+        if upgraded:
+            user.password = upgraded
+            user.save(update_fields=['password'])
+        if not (is_correct and user.is_active):
+            user = None
+
+    if user is None:
+        user_login_failed.send(sender=__name__, credentials={'username': username}, request=request)
+        return None
+    user.backend = MODEL_BACKEND
+    return user
+
+
+@contextmanager
+def bulk_hasher(workers=None):
+    """Yield a function that hashes a list of passwords across worker processes.
+
+    ``None`` passwords become unusable passwords. With a single worker the
+    passwords are hashed in the calling process.
+    """
+    workers = workers or settings.PASSWORD_IMPORT_WORKERS
+    if workers <= 1:
+        yield lambda passwords: [make_password(password) for password in passwords]
+        return
+
+    # Fresh interpreters rather than fork(): the caller may be a threaded web worker.
+    # They load settings from DJANGO_SETTINGS_MODULE, inherited from this process.
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    with ProcessPoolExecutor(
+        workers, mp_context=multiprocessing.get_context(method), initializer=django.setup
+    ) as pool:
+        yield lambda passwords: list(
+            pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4)))
+        )
+
+
+def busy_response():
+    """503 returned by the sign-in views when ``HashingBusy`` is raised"""
+    return Response(
+        {'error': 'Too many sign-ins in progress, please retry'},
+        status=503,
+        headers={'Retry-After': str(BUSY_RETRY_AFTER)},
+    )
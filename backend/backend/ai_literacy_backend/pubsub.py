@@ -0,0 +1,157 @@
+"""
+In-process publish/subscribe for pushing events to open connections.
+
+A subscriber is an asyncio queue owned by the event loop that serves its
+connection, so an idle subscriber costs one small queue and a suspended
+coroutine, not a thread. ``publish()`` may be called from any thread,
+usually a transaction.on_commit callback on Django's sync thread. Each
+message is handed to its subscriber's loop with call_soon_threadsafe.
+
+Delivery goes through a broker (PUBSUB_BROKER). The default LocalBroker
+delivers within the publishing process, which is enough when one process
+serves both the writes and the streams. With several worker processes, use
+RedisBroker (PUBSUB_REDIS_URL, needs the ``redis`` package). Any other
+transport works too: subclass Broker, send messages in ``publish()`` and
+hand every received message to ``self.deliver(channel, message)``. Messages
+must be JSON-serializable.
+
+A subscriber that falls PUBSUB_QUEUE_SIZE messages behind has its queue
+replaced by a single RESYNC marker. The consumer should then reload the full
+state instead of applying deltas it has missed.
+"""
+
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+RESYNC = object()
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+class Broker:
+    """Carries published messages to the hub of every process"""
+
+    def __init__(self, deliver):
+        self.deliver = deliver
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+
+class LocalBroker(Broker):
+    def publish(self, channel, message):
+        self.deliver(channel, message)
+
+
+class RedisBroker(Broker):
+    """Fans messages out between processes over Redis pub/sub"""
+
+    prefix = 'pubsub:'
+
+    def __init__(self, deliver):
+        if redis is None:
+            raise RuntimeError('RedisBroker needs the redis package')
+        super().__init__(deliver)
+        self.client = redis.Redis.from_url(settings.PUBSUB_REDIS_URL)
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(**{f'{self.prefix}*': self._receive})
+        self.thread = pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    def _receive(self, item):
+        channel = item['channel'].decode()[len(self.prefix):]
+        self.deliver(channel, json.loads(item['data']))
+
+    def publish(self, channel, message):
+        self.client.publish(f'{self.prefix}{channel}', json.dumps(message, separators=(',', ':')))
+
+
+class Subscription:
+    def __init__(self, hub, channel, maxsize):
+        self.hub = hub
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+
+    def put(self, message):
+        """Queue ``message`` from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The loop has shut down; its connection is gone
+            self.hub.unsubscribe(self)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def get(self, timeout=None):
+        """Return the next message (possibly RESYNC), or None after ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class Hub:
+    def __init__(self, broker_class=LocalBroker, queue_size=100):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self.queue_size = queue_size
+        self.broker = broker_class(self.deliver)
+
+    def subscribe(self, channel):
+        """Return a Subscription to ``channel``; call from the loop that will read it"""
+        subscription = Subscription(self, channel, self.queue_size)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel, message):
+        self.broker.publish(channel, message)
+
+    def deliver(self, channel, message):
+        """Hand a message to this process's subscribers of ``channel``"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(message)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+def get_hub():
+    """Return the process-wide Hub, creating it with the configured broker on first use"""
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                _hub = Hub(import_string(settings.PUBSUB_BROKER), settings.PUBSUB_QUEUE_SIZE)
+    return _hub
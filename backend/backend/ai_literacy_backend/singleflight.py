@@ -0,0 +1,81 @@
+"""
+Single-flight call coalescing.
+
+``SingleFlight.do(key, fn)`` runs ``fn`` once for any number of concurrent
+callers using the same key. The first caller runs it and the rest wait and
+share its result (or its exception). Once the call finishes the key is
+released, so later callers run ``fn`` again. ``AsyncSingleFlight`` is the
+same for coroutines on one event loop.
+
+Coalescing is per process. Callers in other processes share results through
+the cache instead.
+"""
+
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn):
+        """Await ``fn()`` once for all concurrent callers with ``key``"""
+        future = self._calls.get(key)
+        if future is not None:
+            # shield: a cancelled waiter must not cancel the shared call
+            return await asyncio.shield(future)
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieve it so an exception nobody else awaited isn't logged as lost
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
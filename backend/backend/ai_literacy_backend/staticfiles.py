@@ -0,0 +1,230 @@
+"""
+Static asset pipeline: collect, fingerprint, precompress and serve.
+
+``manage.py collectstatic`` gathers three sources into STATIC_ROOT:
+
+- the apps' own static files (admin, DRF)
+- the original lesson site in the repository root, matched by the
+  STATIC_SITE_FILES patterns (SiteFinder)
+- the Vite build of the React app (``frontend/dist``), under ``app/``, if
+  it has been built
+
+CompressedManifestStaticFilesStorage fingerprints every file, so
+``style.css`` becomes ``style.3f2a9c81d4e5.css``. It rewrites references to
+the fingerprinted names, both in CSS and in the ``<link>``, ``<script>`` and
+``<img>`` tags of HTML pages. It also writes ``.gz`` and ``.br`` variants of
+text assets at the highest compression level (see compression.py). HTML pages
+keep their own names, so links and bookmarks stay valid; only the assets they
+load are renamed.
+
+``serve`` answers /static/ from an index of STATIC_ROOT that each process
+builds once. Fingerprinted files are sent with ``Cache-Control: immutable``
+for a year. Anything else, mainly the HTML entry points, is sent with
+``no-cache`` and an ETag. A repeat visit therefore costs one 304 for the page
+and nothing for its assets. The stored variant to send is chosen from
+Accept-Encoding and streamed from disk.
+"""
+
+import mimetypes
+import os
+import posixpath
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import BaseFinder
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.checks import Warning
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_safe
+
+from .compression import brotli_compress, gzip_compress, negotiate_encoding
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+COMPRESSIBLE = {'.css', '.js', '.mjs', '.html', '.svg', '.json', '.map', '.txt', '.xml', '.ico', '.ttf', '.otf', '.eot'}
+# Smaller files aren't worth a Content-Encoding header
+MIN_COMPRESS_SIZE = 256
+VARIANTS = {'br': '.br', 'gzip': '.gz'}
+# Vite fingerprints everything it writes here, so those names are immutable too
+PREFINGERPRINTED = ('app/assets/',)
+# The React app's client-side routes fall back to its index page
+SPA_ROOT = 'app/'
+
+_index = (None, {})
+_lock = threading.Lock()
+
+
+class SiteFinder(BaseFinder):
+    """Finds the lesson site's files (STATIC_SITE_FILES) in STATIC_SITE_ROOT"""
+
+    def __init__(self, app_names=None, *args, **kwargs):
+        self.root = Path(settings.STATIC_SITE_ROOT)
+        self.storage = FileSystemStorage(location=self.root)
+
+    def check(self, **kwargs):
+        if not self.root.is_dir():
+            return [Warning(f'STATIC_SITE_ROOT {self.root} does not exist.', id='ai_literacy.W001')]
+        return []
+
+    def files(self):
+        for pattern in settings.STATIC_SITE_FILES:
+            for path in sorted(self.root.glob(pattern)):
+                if path.is_file():
+                    yield path.relative_to(self.root).as_posix()
+
+    def find(self, path, find_all=False, **kwargs):
+        if path in set(self.files()):
+            match = str(self.root / path)
+            return [match] if find_all else match
+        return []
+
+    def list(self, ignore_patterns):
+        for path in self.files():
+            yield path, self.storage
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    manifest_strict = False
+    patterns = ManifestStaticFilesStorage.patterns + (
+        ('*.html', (
+            (
+                r"""(?P<matched>(?P<tag><(?:link|script|img)\b[^>]*?\b(?:href|src)=)(?P<quote>["'])(?P<url>[^"']+)(?P=quote))""",
+                '%(tag)s%(quote)s%(url)s%(quote)s',
+            ),
+        )),
+    )
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Not collected (tests, or collectstatic hasn't run): use the plain name
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in paths:
+            if name.endswith('.html'):
+                # Pages keep their names, with the asset references rewritten
+                with self.open(self.stored_name(name)) as page:
+                    content = page.read()
+                self.delete(name)
+                self._save(name, ContentFile(content))
+        for name in sorted(set(paths) | set(self.hashed_files.values())):
+            self.compress(name)
+
+    def compress(self, name):
+        """Write the ``.gz`` and ``.br`` variants of ``name`` that are worth keeping"""
+        if posixpath.splitext(name)[1].lower() not in COMPRESSIBLE:
+            return
+        with self.open(name) as f:
+            data = f.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        for suffix, compressed in (('.gz', gzip_compress(data)), ('.br', brotli_compress(data))):
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            # Keep a variant only if it saves at least 5%
+            if compressed is not None and len(compressed) < len(data) * 0.95:
+                self._save(name + suffix, ContentFile(compressed))
+
+
+@dataclass(frozen=True)
+class StaticFile:
+    path: str
+    size: int
+    content_type: str
+    etag: str
+    immutable: bool
+    variants: dict  # encoding -> (path, size), in preference order
+
+
+def _content_type(name):
+    content_type, _ = mimetypes.guess_type(name)
+    content_type = content_type or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+        content_type += '; charset=utf-8'
+    return content_type
+
+
+def build_index(root):
+    """Scan ``root`` once and return {relative_path: StaticFile}"""
+    fingerprinted = set(CompressedManifestStaticFilesStorage(location=root).hashed_files.values())
+    index = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(tuple(VARIANTS.values())):
+                continue
+            path = os.path.join(directory, filename)
+            name = Path(path).relative_to(root).as_posix()
+            stat = os.stat(path)
+            variants = {}
+            for encoding, suffix in VARIANTS.items():
+                if os.path.exists(path + suffix):
+                    variants[encoding] = (path + suffix, os.path.getsize(path + suffix))
+            index[name] = StaticFile(
+                path=path,
+                size=stat.st_size,
+                content_type=_content_type(filename),
+                etag=f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+                immutable=name in fingerprinted or name.startswith(PREFINGERPRINTED),
+                variants=variants,
+            )
+    return index
+
+
+def get_index():
+    """Return the STATIC_ROOT index, built on first use (restart after collectstatic)"""
+    global _index
+    root = str(settings.STATIC_ROOT)
+    built_for, index = _index
+    if built_for != root:
+        with _lock:
+            built_for, index = _index
+            if built_for != root:
+                index = build_index(root)
+                _index = (root, index)
+    return index
+
+
+@require_safe
+def serve(request, path):
+    """Serve a collected static file, precompressed when the client accepts it"""
+    index = get_index()
+    entry = index.get(path)
+    if entry is None and path.startswith(SPA_ROOT) and '.' not in posixpath.basename(path):
+        entry = index.get(SPA_ROOT + 'index.html')
+    if entry is None:
+        raise Http404(path)
+
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''), list(entry.variants))
+    file_path, size = entry.variants[encoding] if encoding else (entry.path, entry.size)
+    etag = entry.etag[:-1] + f'-{encoding}"' if encoding else entry.etag
+    headers = {'ETag': etag, 'Cache-Control': IMMUTABLE if entry.immutable else 'no-cache'}
+    if entry.variants:
+        headers['Vary'] = 'Accept-Encoding'
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        return HttpResponseNotModified(headers=headers)
+
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=entry.content_type, headers=headers)
+        response['Content-Length'] = size
+        return response
+    # safe_join guards against the index ever holding a path outside STATIC_ROOT.
+    # FileResponse streams the file in blocks and closes it when the response is done.
+    return FileResponse(
+        open(safe_join(settings.STATIC_ROOT, file_path), 'rb'),
+        # Name the original file, not the .gz/.br variant, in Content-Disposition
+        filename=posixpath.basename(entry.path),
+        content_type=entry.content_type,
+        headers=headers,
+    )
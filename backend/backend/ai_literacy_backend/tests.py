@@ -0,0 +1,380 @@
+import asyncio
+import gzip
+import io
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+import brotli
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from courses.models import UserProgress
+from . import auth, passwords, renderers, staticfiles, throttling
+from .auth import clear_user_cache
+from .metrics import registry
+from .pubsub import RESYNC, Hub
+from .singleflight import AsyncSingleFlight, SingleFlight
+
+
+class MetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.user = User.objects.create_user(username='ops', password='pw-12345', is_staff=True)
+        self.client.force_login(self.user)
+
+    def test_records_queries_and_latency_per_view(self):
+        self.client.get('/api/progress/')
+
+        body = self.client.get('/api/_metrics').content.decode()
+
+        self.assertIn('http_requests_total{view="get_progress",method="GET",status="200"} 1', body)
+        self.assertIn('http_request_duration_seconds_count{view="get_progress"} 1', body)
+        self.assertIn('db_queries_per_request_count{view="get_progress"} 1', body)
+        self.assertRegex(body, r'db_queries_per_request_sum\{view="get_progress"\} [1-9]')
+        self.assertIn('http_response_bytes_total{view="get_progress"}', body)
+
+    @override_settings(ROOT_URLCONF='ai_literacy_backend.urls_async')
+    async def test_counts_queries_of_async_views(self):
+        await self.async_client.aforce_login(self.user)
+        await self.async_client.get('/api/progress/')
+
+        body = registry.render()
+
+        self.assertIn('http_requests_total{view="get_progress",method="GET",status="200"} 1', body)
+        # The ORM runs in sync_to_async threads, not on the event loop
+        self.assertRegex(body, r'db_queries_per_request_sum\{view="get_progress"\} [1-9]')
+        self.assertRegex(body, r'db_query_seconds_total\{view="get_progress"\} 0\.\d*[1-9]')
+
+    def test_unresolved_paths_share_one_label(self):
+        self.client.get('/no/such/path/')
+        self.assertIn('view="unmatched"', self.client.get('/api/_metrics').content.decode())
+
+    def test_requires_staff_without_token(self):
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/_metrics').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='scrape-me')
+    def test_bearer_token(self):
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/_metrics').status_code, 403)
+        response = self.client.get('/api/_metrics', HTTP_AUTHORIZATION='Bearer scrape-me')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=1)
+    def test_slow_request_logs_sql(self):
+        with self.assertLogs('ai_literacy_backend.metrics', level='WARNING') as logs:
+            self.client.get('/api/progress/')
+        self.assertIn('"sql"', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='learner', password='pw-12345')
+        UserProgress.objects.create(user=self.user)
+
+    def login(self, password='pw-12345'):
+        return self.client.post(
+            '/api/login/', {'username': 'learner', 'password': password}, content_type='application/json'
+        )
+
+    def test_new_passwords_use_scrypt(self):
+        self.client.post('/api/register/', {'username': 'fresh', 'password': 'pw-12345'}, content_type='application/json')
+        self.assertTrue(User.objects.get(username='fresh').password.startswith('scrypt$'))
+        self.assertEqual(self.client.post(
+            '/api/users/login/', {'username': 'fresh', 'password': 'pw-12345'}, content_type='application/json'
+        ).status_code, 200)
+
+    def test_login_upgrades_legacy_hash(self):
+        self.user.password = PBKDF2PasswordHasher().encode('pw-12345', 'legacysalt', iterations=1000)
+        self.user.save()
+
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt$'))
+
+    def test_changed_cost_is_applied_on_next_login(self):
+        with override_settings(SCRYPT_WORK_FACTOR=2 ** 12):
+            self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt$4096$'))
+
+    def test_wrong_password_does_not_rehash(self):
+        self.user.password = PBKDF2PasswordHasher().encode('pw-12345', 'legacysalt', iterations=1000)
+        self.user.save()
+        legacy = self.user.password
+
+        self.assertEqual(self.login('nope').status_code, 401)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, legacy)
+
+    def test_inactive_user_cannot_log_in(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.login().status_code, 401)
+
+    def test_saturated_pool_returns_503(self):
+        with mock.patch.object(passwords, '_slots', threading.BoundedSemaphore(1)) as slots:
+            slots.acquire()
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+class CachedUserTests(TestCase):
+    def setUp(self):
+        clear_user_cache()
+        self.user = User.objects.create_user(username='learner', password='pw-12345')
+        UserProgress.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def test_user_is_loaded_once_per_ttl(self):
+        self.client.get('/api/leaderboard/')
+        with self.assertNumQueries(0):
+            self.client.get('/api/progress/')
+
+    @override_settings(USER_CACHE_TTL=0)
+    def test_ttl_zero_disables_cache(self):
+        self.client.get('/api/progress/')
+        with self.assertNumQueries(1):
+            self.client.get('/api/progress/')
+
+    def test_password_change_ends_cached_session(self):
+        self.assertEqual(self.client.get('/api/progress/').status_code, 200)
+        self.user.set_password('new-pw-12345')
+        self.user.save()
+        self.assertEqual(self.client.get('/api/progress/').status_code, 403)
+
+    def test_deactivated_user_is_dropped(self):
+        self.client.get('/api/progress/')
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        # A queryset update sends no signal; the cached entry serves until it expires
+        self.assertEqual(self.client.get('/api/progress/').status_code, 200)
+        clear_user_cache(self.user.pk)
+        self.assertEqual(self.client.get('/api/progress/').status_code, 403)
+
+
+    @override_settings(USER_CACHE_SIZE=2)
+    def test_cache_is_bounded(self):
+        others = [User.objects.create_user(username=f'other{n}', password='pw-12345') for n in range(3)]
+        for user in others:
+            auth._remember(user.pk, user, ttl=30)
+        self.assertEqual(list(auth._users), [others[1].pk, others[2].pk])
+
+    def test_expired_entries_are_dropped_on_insert(self):
+        others = [User.objects.create_user(username=f'other{n}', password='pw-12345') for n in range(3)]
+        with mock.patch('time.monotonic', return_value=1000.0):
+            auth._remember(others[0].pk, others[0], ttl=30)
+            auth._remember(others[1].pk, others[1], ttl=30)
+        with mock.patch('time.monotonic', return_value=1020.0):
+            auth._remember(others[2].pk, others[2], ttl=30)
+        with mock.patch('time.monotonic', return_value=1040.0):
+            auth._remember(others[0].pk, others[0], ttl=30)
+        self.assertEqual(list(auth._users), [others[2].pk, others[0].pk])
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_bucket_allows_burst_then_refills_at_rate(self):
+        state = None
+        for _ in range(3):
+            state, wait = throttling._take(state, rate=2, burst=3, now=100.0)
+            self.assertEqual(wait, 0)
+        state, wait = throttling._take(state, rate=2, burst=3, now=100.0)
+        self.assertEqual(wait, 0.5)
+
+        state, wait = throttling._take(state, rate=2, burst=3, now=100.5)
+        self.assertEqual(wait, 0)
+        # Refilling never goes past the burst size
+        state, wait = throttling._take(state, rate=2, burst=3, now=1000.0)
+        self.assertEqual(state, (2, 1000.0))
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {'value': 42}
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do('user:1', fetch)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(flight.do('user:1', fetch))) for _ in range(4)]
+        for thread in followers:
+            thread.start()
+        time.sleep(0.1)  # let the followers reach do() and block on the leader
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'value': 42}] * 5)
+        # Finished calls are forgotten: the next caller fetches again
+        release.set()
+        flight.do('user:1', fetch)
+        self.assertEqual(len(calls), 2)
+
+    def test_errors_are_shared_and_not_cached(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fail():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError('boom')
+
+        async def run():
+            return await asyncio.gather(*(flight.do('k', fail) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(run())
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(flight._calls, {})
+
+
+class PubSubTests(SimpleTestCase):
+    def test_publish_from_another_thread(self):
+        hub = Hub()
+
+        async def run():
+            first = hub.subscribe('progress:1')
+            second = hub.subscribe('progress:1')
+            other = hub.subscribe('progress:2')
+            await asyncio.to_thread(hub.publish, 'progress:1', {'n': 1})
+            received = [await first.get(timeout=1), await second.get(timeout=1), await other.get(timeout=0.05)]
+            for subscription in (first, second, other):
+                subscription.close()
+            return received
+
+        self.assertEqual(asyncio.run(run()), [{'n': 1}, {'n': 1}, None])
+        self.assertEqual(hub.subscriber_count(), 0)
+
+    def test_slow_subscriber_is_told_to_resync(self):
+        hub = Hub(queue_size=2)
+
+        async def run():
+            subscription = hub.subscribe('progress:1')
+            for n in range(3):
+                hub.publish('progress:1', {'n': n})
+            await asyncio.sleep(0)  # let the loop run the queued deliveries
+            received = [await subscription.get(timeout=1)]
+            hub.publish('progress:1', {'n': 3})
+            received.append(await subscription.get(timeout=1))
+            subscription.close()
+            return received
+
+        self.assertEqual(asyncio.run(run()), [RESYNC, {'n': 3}])
+
+
+class RendererTests(SimpleTestCase):
+    data = {
+        'when': datetime(2025, 10, 25, 11, 0, 0, 123456, tzinfo=timezone.utc),
+        'score': Decimal('9.5'),
+        'name': 'Zoë',
+        'by_lesson': {1: [True, None]},
+    }
+
+    def test_output_matches_drf(self):
+        expected = JSONRenderer().render(self.data)
+        self.assertEqual(renderers.ORJSONRenderer().render(self.data), expected)
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(renderers.ORJSONRenderer().render(self.data), expected)
+
+    def test_parser(self):
+        parser = renderers.ORJSONParser()
+        self.assertEqual(parser.parse(io.BytesIO('{"name": "Zoë"}'.encode())), {'name': 'Zoë'})
+        for orjson in (renderers.orjson, None):
+            with mock.patch.object(renderers, 'orjson', orjson), self.assertRaises(ParseError):
+                parser.parse(io.BytesIO(b'{"name":'))
+
+
+class StaticPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp = Path(tempfile.mkdtemp())
+        cls.addClassCleanup(shutil.rmtree, cls.tmp)
+        dist = cls.tmp / 'dist'
+        (dist / 'assets').mkdir(parents=True)
+        # What `VITE_BASE=/static/app/ npm run build` writes
+        (dist / 'index.html').write_text(
+            '<!doctype html><html><head><script type="module" src="/static/app/assets/index-Bx7f.js"></script>'
+            '</head><body><div id="root"></div></body></html>'
+        )
+        (dist / 'assets' / 'index-Bx7f.js').write_text('console.log("app");\n' * 50)
+        cls.enterClassContext(override_settings(STATIC_ROOT=cls.tmp / 'static', STATICFILES_DIRS=[('app', dist)]))
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def get(self, path, **headers):
+        return self.client.get(f'/static/{path}', headers=headers)
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_assets_are_fingerprinted_and_precompressed(self):
+        hashed = staticfiles_storage.stored_name('style.css')
+        self.assertRegex(hashed, r'^style\.[0-9a-f]{12}\.css$')
+        root = self.tmp / 'static'
+        self.assertIn(f'href="{hashed}"', (root / 'index.html').read_text())
+        self.assertIn(f'href="../{hashed}"', (root / 'lessons' / 'lesson1.html').read_text())
+        self.assertEqual(gzip.decompress((root / f'{hashed}.gz').read_bytes()), (root / hashed).read_bytes())
+
+    def test_fingerprinted_assets_are_immutable_and_negotiated(self):
+        hashed = staticfiles_storage.stored_name('style.css')
+        original = (self.tmp / 'static' / hashed).read_bytes()
+        response = self.get(hashed, **{'Accept-Encoding': 'br;q=0, gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], staticfiles.IMMUTABLE)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['Content-Type'].startswith('text/css'))
+        self.assertEqual(gzip.decompress(self.body(response)), original)
+
+        identity = self.get(hashed)
+        self.assertFalse(identity.has_header('Content-Encoding'))
+        self.assertEqual(self.body(identity), original)
+        self.assertNotEqual(identity['ETag'], response['ETag'])
+
+        head = self.client.head(f'/static/{hashed}')
+        self.assertEqual(int(head['Content-Length']), len(original))
+
+        compressed = self.get(hashed, **{'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(compressed['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(self.body(compressed)), original)
+        self.assertEqual(int(compressed['Content-Length']), (self.tmp / 'static' / f'{hashed}.br').stat().st_size)
+
+    def test_pages_revalidate(self):
+        response = self.get('index.html', **{'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        again = self.get('index.html', **{'Accept-Encoding': 'gzip', 'If-None-Match': response['ETag']})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(self.get('missing.css').status_code, 404)
+
+    def test_react_build(self):
+        page = self.body(self.get('app/index.html')).decode()
+        script = staticfiles_storage.stored_name('app/assets/index-Bx7f.js')
+        self.assertIn(f'src="/static/{script}"', page)
+        self.assertEqual(self.get(script)['Cache-Control'], staticfiles.IMMUTABLE)
+        # Vite already fingerprints its assets, so the unrewritten name is immutable too
+        self.assertEqual(self.get('app/assets/index-Bx7f.js')['Cache-Control'], staticfiles.IMMUTABLE)
+        # Client-side routes get the app's page
+        self.assertEqual(self.body(self.get('app/lesson/2')).decode(), page)
@@ -0,0 +1,93 @@
+"""
+Token-bucket rate limiting backed by Django's cache.
+
+Every (scope, user, client IP) pair gets a bucket of ``burst`` tokens that
+refills at ``rate`` tokens per second. Each request takes one token, and a
+request that finds the bucket empty is refused with 429 and a Retry-After
+header telling the client when the next token will be available. Limits are
+configured per scope in THROTTLE_BUCKETS; THROTTLE_ENABLED=0 turns them off.
+
+A bucket is one cache entry, ``(tokens, updated_at)``. It expires once it
+would have refilled completely, so idle clients cost nothing. Updates within a
+process are serialized. Across processes sharing a cache, two simultaneous
+requests can both spend the same token, so a client may occasionally get one
+extra request through. That is acceptable for abuse protection.
+
+``ProgressReadThrottle`` and ``ProgressWriteThrottle`` plug into DRF views.
+The async views call ``aretry_after()`` directly.
+"""
+
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+_lock = threading.Lock()
+
+
+def _key(scope, request, user):
+    ident = BaseThrottle().get_ident(request)
+    return f'throttle:{scope}:{user.pk if user.is_authenticated else "anon"}:{ident}'
+
+
+def _take(state, rate, burst, now):
+    """Return ``(new_state, retry_after)`` for taking one token; retry_after is 0 when allowed"""
+    tokens, updated_at = state if state is not None else (burst, now)
+    tokens = min(burst, tokens + (now - updated_at) * rate)
+    if tokens < 1:
+        return (tokens, now), (1 - tokens) / rate
+    return (tokens - 1, now), 0
+
+
+def _timeout(rate, burst):
+    return math.ceil(burst / rate) + 1
+
+
+def retry_after(scope, request, user):
+    """Take a token from the caller's ``scope`` bucket; return seconds to wait, or 0 if allowed"""
+    if not settings.THROTTLE_ENABLED:
+        return 0
+    rate, burst = settings.THROTTLE_BUCKETS[scope]
+    key = _key(scope, request, user)
+    with _lock:
+        state, wait = _take(cache.get(key), rate, burst, time.time())
+        cache.set(key, state, _timeout(rate, burst))
+    return wait
+
+
+async def aretry_after(scope, request, user):
+    """Async counterpart of retry_after() for the async views"""
+    if not settings.THROTTLE_ENABLED:
+        return 0
+    rate, burst = settings.THROTTLE_BUCKETS[scope]
+    key = _key(scope, request, user)
+    # Not locked: another task may interleave at the awaits, just as another process can
+    state, wait = _take(await cache.aget(key), rate, burst, time.time())
+    await cache.aset(key, state, _timeout(rate, burst))
+    return wait
+
+
+def retry_after_header(wait):
+    return str(math.ceil(wait))
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+
+    def allow_request(self, request, view):
+        self.wait_seconds = retry_after(self.scope, request, request.user)
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class ProgressReadThrottle(TokenBucketThrottle):
+    scope = 'progress_read'
+
+
+class ProgressWriteThrottle(TokenBucketThrottle):
+    scope = 'progress_write'
@@ -1,7 +1,20 @@
+import re
+
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from . import staticfiles
+from .metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('courses.urls')),
+    path('api/users/', include('users.urls')),
+    path('api/_metrics', metrics_view, name='metrics'),
 ]
+
+if settings.STATIC_SERVE:
+    urlpatterns.append(
+        re_path(r'^%s/(?P<path>.*)$' % re.escape(settings.STATIC_URL.strip('/')), staticfiles.serve, name='static')
+    )
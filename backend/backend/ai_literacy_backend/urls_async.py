@@ -0,0 +1,9 @@
+"""URLconf used when ASYNC_PROGRESS_VIEWS is on: progress endpoints are async views."""
+from django.urls import include, path
+
+from courses.urls import async_urlpatterns
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/', include(async_urlpatterns)),
+] + sync_urlpatterns
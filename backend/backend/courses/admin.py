@@ -1,3 +1,34 @@
 from django.contrib import admin
 
-# Temporary empty admin file to fix import errors
+from .models import Lesson, ProgressEvent, QuizQuestion
+
+
+class QuizQuestionInline(admin.StackedInline):
+    model = QuizQuestion
+    extra = 0
+
+
+@admin.register(Lesson)
+class LessonAdmin(admin.ModelAdmin):
+    list_display = ('id', 'title', 'position', 'published', 'content_hash', 'updated_at')
+    readonly_fields = ('content_hash',)
+    inlines = [QuizQuestionInline]
+
+
+@admin.register(ProgressEvent)
+class ProgressEventAdmin(admin.ModelAdmin):
+    """Read-only audit trail; the log is append-only"""
+    list_display = ('id', 'user', 'kind', 'lesson_id', 'score', 'applied', 'source', 'occurred_at', 'recorded_at')
+    list_filter = ('kind', 'source', 'applied')
+    search_fields = ('user__username',)
+    list_select_related = ('user',)
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
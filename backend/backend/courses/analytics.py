@@ -0,0 +1,248 @@
+"""
+Cohort analytics and recommendations from a users x lessons score matrix.
+
+``manage.py build_analytics`` (run it periodically, e.g. from cron) loads
+every learner's completions into a dense NumPy matrix, with -1 for lessons
+not completed. Everything else is derived with whole-array operations:
+
+- per lesson: completion rate, mean score and difficulty (1 - mean / 100)
+- per learner:
+  - the percentile rank of their total_score
+  - their skill: how far above or below the cohort mean they score, averaged
+    over the lessons they completed
+  - a difficulty level from 1 to 5: the cohort quintile of that skill
+  - the next lesson in catalog order and the score they can expect on it
+  - the completed lesson they scored furthest below the cohort on, as a
+    review suggestion
+
+The arrays are saved as .npy files in a new directory under ANALYTICS_DIR.
+``current.json`` is then replaced atomically to publish them. Each worker
+process memory-maps the current snapshot, so all workers share one copy in
+the page cache. A /api/recommendations/ lookup reads a few array cells: O(1)
+per request, with no queries. A new build is picked up on the next request.
+
+Recommendations are as of the last build: ``built_at`` is included in every
+response. Until the first build, /api/recommendations/ answers 503.
+"""
+
+import json
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Lesson, LessonCompletion, UserProgress
+
+POINTER = 'current.json'
+MISSING = -1
+# Levels use the same 1-5 scale as TopicProgress.current_difficulty
+LEVELS = 5
+# Suggest reviewing a lesson scored at least this far below the cohort mean
+REVIEW_MARGIN = 10
+# Previous snapshots are kept so a worker still mapping one can finish with it
+KEEP_SNAPSHOTS = 2
+CHUNK_SIZE = 10000
+
+_snapshot = (None, None)
+_lock = threading.Lock()
+
+
+def load_matrix(chunk_size=CHUNK_SIZE):
+    """Return ``(user_ids, total_scores, lesson_ids, scores)`` from the database.
+
+    Users are sorted by id and lessons are in catalog order. ``scores`` is an
+    int16 users x lessons matrix holding MISSING where a lesson isn't completed.
+    """
+    lesson_ids = np.fromiter(
+        Lesson.objects.filter(published=True).order_by('position', 'id').values_list('id', flat=True), dtype=np.int64
+    )
+    learners = UserProgress.objects.order_by('user_id').values_list('user_id', 'total_score')
+    learners = np.array(list(learners.iterator(chunk_size=chunk_size)), dtype=np.int64).reshape(-1, 2)
+    user_ids, total_scores = learners[:, 0], learners[:, 1]
+
+    scores = np.full((len(user_ids), len(lesson_ids)), MISSING, dtype=np.int16)
+    lesson_order = np.argsort(lesson_ids)
+    completions = LessonCompletion.objects.values_list('user_id', 'lesson_id', 'score').iterator(chunk_size=chunk_size)
+    while chunk := list(islice(completions, chunk_size)):
+        chunk = np.array(chunk, dtype=np.int64)
+        rows = _positions(user_ids, chunk[:, 0])
+        cols = _positions(lesson_ids[lesson_order], chunk[:, 1])
+        found = (rows >= 0) & (cols >= 0)
+        scores[rows[found], lesson_order[cols[found]]] = np.clip(chunk[found, 2], 0, np.iinfo(np.int16).max)
+    return user_ids, total_scores, lesson_ids, scores
+
+
+def _positions(sorted_ids, ids):
+    """Index of each of ``ids`` in ``sorted_ids``, or -1 where it is absent"""
+    positions = np.searchsorted(sorted_ids, ids)
+    found = positions < len(sorted_ids)
+    found[found] = sorted_ids[positions[found]] == ids[found]
+    return np.where(found, positions, -1)
+
+
+def analyze(user_ids, total_scores, lesson_ids, scores):
+    """Derive the snapshot arrays from a score matrix (see the module docstring)"""
+    learners, lessons = scores.shape
+    done = scores >= 0
+    points = np.where(done, scores, 0).astype(np.int64)
+
+    completions = done.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lesson_mean = np.where(completions > 0, points.sum(axis=0) / completions, np.nan)
+        completion_rate = completions / max(learners, 1)
+
+        # Mid-rank percentile, so tied learners share one value
+        ordered = np.sort(total_scores)
+        below = np.searchsorted(ordered, total_scores, side='left')
+        tied = np.searchsorted(ordered, total_scores, side='right') - below
+        percentile = 100 * (below + tied / 2) / max(learners, 1)
+
+        # Skill: mean of (score - lesson mean) over the learner's completions
+        residuals = np.where(done, scores - lesson_mean, 0)
+        attempted = done.sum(axis=1)
+        skill = np.where(attempted > 0, residuals.sum(axis=1) / attempted, np.nan)
+
+    active = ~np.isnan(skill)
+    level = np.ones(learners, dtype=np.int8)
+    if active.any():
+        ranked = np.sort(skill[active])
+        skill_rank = (np.searchsorted(ranked, skill[active], side='right') - 0.5) / len(ranked)
+        level[active] = np.clip(np.ceil(skill_rank * LEVELS), 1, LEVELS)
+
+    next_col = np.full(learners, MISSING)
+    review_col = np.full(learners, MISSING)
+    if lessons:
+        # Lessons unlock in order, so the next one is the first not completed
+        remaining = ~done
+        next_col = np.where(remaining.any(axis=1), remaining.argmax(axis=1), MISSING)
+        gaps = np.where(done, scores - lesson_mean, np.inf)
+        weakest = gaps.argmin(axis=1)
+        review_col = np.where(gaps[np.arange(learners), weakest] <= -REVIEW_MARGIN, weakest, MISSING)
+    has_next = next_col != MISSING
+    expected = np.full(learners, np.nan)
+    expected[has_next] = np.clip(lesson_mean[next_col[has_next]] + np.nan_to_num(skill[has_next]), 0, 100)
+
+    rows = np.full(int(user_ids.max()) + 1 if learners else 0, MISSING, dtype=np.int32)
+    rows[user_ids] = np.arange(learners, dtype=np.int32)
+    return {
+        'lesson_ids': lesson_ids,
+        'lesson_completion_rate': completion_rate.astype(np.float32),
+        'lesson_mean_score': lesson_mean.astype(np.float32),
+        'lesson_difficulty': (1 - lesson_mean / 100).astype(np.float32),
+        'scores': scores,
+        'rows': rows,
+        'percentile': percentile.astype(np.float32),
+        'level': level,
+        'next_lesson': next_col.astype(np.int16),
+        'expected_score': expected.astype(np.float32),
+        'review_lesson': review_col.astype(np.int16),
+    }
+
+
+def build():
+    """Build a snapshot from the database and publish it; returns its metadata"""
+    root = Path(settings.ANALYTICS_DIR)
+    root.mkdir(parents=True, exist_ok=True)
+    user_ids, total_scores, lesson_ids, scores = load_matrix()
+    arrays = analyze(user_ids, total_scores, lesson_ids, scores)
+
+    built_at = timezone.now()
+    name = f'snapshot-{built_at:%Y%m%d%H%M%S%f}'
+    staging = root / f'.{name}'
+    staging.mkdir()
+    for key, array in arrays.items():
+        np.save(staging / f'{key}.npy', array)
+    staging.rename(root / name)
+
+    meta = {
+        'snapshot': name,
+        'built_at': built_at.isoformat(),
+        'learners': len(user_ids),
+        'lessons': len(lesson_ids),
+        'arrays': sorted(arrays),
+    }
+    pointer = root / f'.{POINTER}'
+    pointer.write_text(json.dumps(meta))
+    os.replace(pointer, root / POINTER)
+
+    for old in sorted(root.glob('snapshot-*'))[:-KEEP_SNAPSHOTS]:
+        # Workers that mapped these files keep their pages until they reload
+        shutil.rmtree(old, ignore_errors=True)
+    return meta
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    meta: dict
+    arrays: dict  # name -> read-only memory-mapped array
+
+    def lesson_stats(self, col):
+        if col == MISSING:
+            return None
+        mean = float(self.arrays['lesson_mean_score'][col])
+        return {
+            'lesson_id': int(self.arrays['lesson_ids'][col]),
+            'completion_rate': round(float(self.arrays['lesson_completion_rate'][col]), 4),
+            'mean_score': None if np.isnan(mean) else round(mean, 1),
+            'difficulty': None if np.isnan(mean) else round(1 - mean / 100, 4),
+        }
+
+    def recommend(self, user_id):
+        """The /api/recommendations/ body for ``user_id``"""
+        rows = self.arrays['rows']
+        row = int(rows[user_id]) if 0 <= user_id < len(rows) else MISSING
+        if row == MISSING:
+            # Joined after the build: treat as a new learner
+            next_lesson = self.lesson_stats(0 if len(self.arrays['lesson_ids']) else MISSING)
+            if next_lesson is not None:
+                next_lesson['expected_score'] = next_lesson['mean_score']
+            return {
+                'built_at': self.meta['built_at'],
+                'percentile': None,
+                'level': 1,
+                'next_lesson': next_lesson,
+                'review_lesson': None,
+            }
+        next_lesson = self.lesson_stats(int(self.arrays['next_lesson'][row]))
+        if next_lesson is not None:
+            expected = float(self.arrays['expected_score'][row])
+            next_lesson['expected_score'] = None if np.isnan(expected) else round(expected, 1)
+        review_lesson = self.lesson_stats(int(self.arrays['review_lesson'][row]))
+        if review_lesson is not None:
+            review_lesson['score'] = int(self.arrays['scores'][row, self.arrays['review_lesson'][row]])
+        return {
+            'built_at': self.meta['built_at'],
+            'percentile': round(float(self.arrays['percentile'][row]), 1),
+            'level': int(self.arrays['level'][row]),
+            'next_lesson': next_lesson,
+            'review_lesson': review_lesson,
+        }
+
+
+def get_snapshot():
+    """Return the current Snapshot, mapped on first use and after each build, or None"""
+    global _snapshot
+    pointer = Path(settings.ANALYTICS_DIR) / POINTER
+    try:
+        stat = pointer.stat()
+    except FileNotFoundError:
+        return None
+    # os.replace() gives every published pointer a new inode
+    key = (str(pointer), stat.st_ino, stat.st_mtime_ns)
+    loaded_for, snapshot = _snapshot
+    if loaded_for != key:
+        with _lock:
+            loaded_for, snapshot = _snapshot
+            if loaded_for != key:
+                meta = json.loads(pointer.read_text())
+                directory = pointer.parent / meta['snapshot']
+                arrays = {name: np.load(directory / f'{name}.npy', mmap_mode='r') for name in meta['arrays']}
+                snapshot = Snapshot(meta, arrays)
+                _snapshot = (key, snapshot)
+    return snapshot
@@ -0,0 +1,166 @@
+"""
+Async versions of the progress endpoints, served under ASGI.
+
+ai_literacy_backend.asgi routes /api/progress/ and /api/update-progress/ here
+(see ASYNC_PROGRESS_VIEWS), so an idle polling connection waits on the event
+loop instead of holding a worker thread. Responses match the DRF views in
+views.py.
+
+Reads use the async ORM and cache. Django has no async transactions, so the
+locked write in update_progress runs as one sync_to_async call.
+
+/api/progress/stream/ exists only here. It is a long-lived server-sent
+events response, and under WSGI each open one would pin a worker thread.
+"""
+
+import asyncio
+import json
+from functools import partial
+
+from asgiref.sync import SyncToAsync, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_GET, require_POST
+
+from ai_literacy_backend.pubsub import RESYNC, get_hub
+from ai_literacy_backend.renderers import json_response
+from ai_literacy_backend.throttling import aretry_after, retry_after_header
+from . import live
+from .cache import aload_progress
+from .lessons import alesson_ids
+from .progress import (
+    CLIENT_SCORES_DISABLED, abuild_progress_payload, astored_response, parse_progress_query, parse_update,
+    select_progress, submit_completion,
+)
+
+NOT_AUTHENTICATED = {'detail': 'Authentication credentials were not provided.'}
+# How long EventSource waits before reconnecting after the stream drops
+STREAM_RETRY_MS = 5000
+
+
+def throttled(wait):
+    """The 429 DRF sends when a throttle refuses a request"""
+    seconds = retry_after_header(wait)
+    return json_response(
+        {'detail': f"Request was throttled. Expected available in {seconds} second{'' if seconds == '1' else 's'}."},
+        status=429,
+        headers={'Retry-After': seconds},
+    )
+
+
+@require_GET
+async def get_progress(request):
+    """Get user's lesson progress, optionally only what changed ``?since=`` a cursor and only ``?fields=``"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return json_response(NOT_AUTHENTICATED, status=403)
+
+    wait = await aretry_after('progress_read', request, user)
+    if wait:
+        return throttled(wait)
+
+    query, error = parse_progress_query(request.GET)
+    if error:
+        return json_response({'error': error}, status=400)
+    payload, etag, versions = await aload_progress(user.id, partial(abuild_progress_payload, user))
+    payload, etag = select_progress(payload, versions, etag, *query)
+
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        return HttpResponseNotModified(headers=headers)
+    return json_response(payload, headers=headers)
+
+
+@require_POST
+async def update_progress(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return json_response(NOT_AUTHENTICATED, status=403)
+    wait = await aretry_after('progress_write', request, user)
+    if wait:
+        return throttled(wait)
+    if not settings.ACCEPT_CLIENT_SCORES:
+        return json_response({'error': CLIENT_SCORES_DISABLED}, status=403)
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return json_response({'error': 'Request body must be JSON'}, status=400)
+    if not isinstance(data, dict):
+        return json_response({'error': 'Request body must be a JSON object'}, status=400)
+
+    update, error = parse_update(data, request.headers, await alesson_ids())
+    if error:
+        return json_response({'error': error}, status=400)
+    lesson_id, score, idempotency_key = update
+
+    # Replayed submission: answer from the stored response without touching progress
+    if idempotency_key:
+        replay = await astored_response(user, idempotency_key)
+        if replay is not None:
+            return json_response(replay)
+
+    return json_response(await sync_to_async(submit_completion)(user, lesson_id, score, idempotency_key))
+
+
+@require_GET
+async def progress_stream(request):
+    """Server-sent events: a progress snapshot, then every committed change"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return json_response(NOT_AUTHENTICATED, status=403)
+    wait = await aretry_after('progress_read', request, user)
+    if wait:
+        return throttled(wait)
+    return StreamingHttpResponse(
+        _progress_events(user),
+        content_type='text/event-stream',
+        # X-Accel-Buffering stops nginx from holding events back
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+async def _progress_events(user):
+    # Subscribe before reading the snapshot so no write can fall in between;
+    # an event that repeats what the snapshot already shows is harmless
+    subscription = get_hub().subscribe(live.channel(user.id))
+    snapshot = partial(aload_progress, user.id, partial(abuild_progress_payload, user))
+    try:
+        payload, _, _ = await snapshot()
+        await _release_request_thread()
+        yield f'retry: {STREAM_RETRY_MS}\n\n' + live.format_event('snapshot', payload)
+        while True:
+            message = await subscription.get(timeout=settings.PROGRESS_STREAM_HEARTBEAT)
+            if message is None:
+                yield ': keep-alive\n\n'
+            elif message is RESYNC:
+                payload, _, _ = await snapshot()
+                yield live.format_event('snapshot', payload)
+            else:
+                yield live.format_event(message['event'], message['data'])
+    finally:
+        # Runs when the client disconnects and Django cancels the response
+        subscription.close()
+
+
+async def _release_request_thread():
+    """Shut down this request's dedicated sync thread before an open-ended wait.
+
+    Django runs each ASGI request in an asgiref ThreadSensitiveContext, which
+    keeps a thread per request alive until the response ends: one idle thread
+    per open stream. Close that thread's database connections and stop it.
+    Later sync_to_async calls from this response go to the shared sync thread.
+
+    asgiref has no public API for this, so it uses SyncToAsync internals.
+    requirements.txt caps asgiref, and ProgressStreamTests fails if they change.
+    """
+    context = SyncToAsync.thread_sensitive_context.get(None)
+    if context is None:
+        return
+    executor = SyncToAsync.context_to_thread_executor.pop(context, None)
+    if executor is None:
+        return
+    SyncToAsync.thread_sensitive_context.set(None)
+    await asyncio.get_running_loop().run_in_executor(executor, connections.close_all)
+    executor.shutdown(wait=False)
@@ -0,0 +1,265 @@
+"""
+Benchmark harness for the progress API.
+
+Used by ``manage.py bench_progress``: seeds a throwaway database with N users
+and realistic progress, then drives register/login/get_progress/update_progress
+through the Django test client from several threads, recording latency,
+throughput and SQL queries per request. The *_async scenarios send the same
+requests to the async views from tasks on one event loop, for comparing the
+ASGI path with the threaded WSGI one. ``benchmark_hashers`` measures password
+verifications per second per core for each configured hasher.
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import get_hashers, make_password
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.utils import timezone
+
+from . import stats
+from .models import LessonCompletion, UserProgress
+
+# *_async scenarios drive the async views (courses/async_views.py) from
+# concurrent tasks on one event loop instead of one thread per client
+ASYNC_SCENARIOS = ('get_progress_async', 'update_progress_async')
+SCENARIOS = ('register', 'login', 'get_progress', 'update_progress') + ASYNC_SCENARIOS
+BENCH_PASSWORD = 'bench-password-1'
+USERNAME_PREFIX = 'bench-'
+
+# Upper bound of SQL statements per request (SQLite; savepoints included).
+# Write budgets cover the worst case of a request that also creates missing
+# aggregate rows, awards certification and stores an idempotency key.
+# courses.tests.QueryBudgetTests enforces these, so an N+1 fails the suite.
+QUERY_BUDGETS = {
+    'register': 5,
+    'login': 10,
+    'get_progress': 3,
+    'update_progress': 23,
+    'update_progress_replay': 3,
+    'batch_update_progress': 17,
+    'grade_lesson': 23,
+    'grade_batch': 17,
+}
+
+# Share of learners who stopped after completing k lessons
+LESSON_FUNNEL = (0.30, 0.25, 0.20, 0.10, 0.15)
+# Seeded learners complete lessons 1..SEED_LESSONS, the default certification path
+SEED_LESSONS = len(LESSON_FUNNEL) - 1
+
+
+def seed_users(count, batch_size=5000, seed=0, progress_callback=None):
+    """Bulk-insert ``count`` users with progress following LESSON_FUNNEL"""
+    rng = random.Random(seed)
+    # Hash once: seeding millions of users must not pay PBKDF2 per row
+    password = make_password(BENCH_PASSWORD)
+    now = timezone.now()
+
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        users = User.objects.bulk_create([
+            User(username=f'{USERNAME_PREFIX}{created + i}', password=password)
+            for i in range(size)
+        ])
+        progress_rows = []
+        completions = []
+        for user in users:
+            lessons = rng.choices(range(SEED_LESSONS + 1), weights=LESSON_FUNNEL)[0]
+            scores = [rng.randint(40, 100) for _ in range(lessons)]
+            completions += [
+                LessonCompletion(user=user, lesson_id=lesson_id, score=score, completed_at=now)
+                for lesson_id, score in enumerate(scores, start=1)
+            ]
+            progress_rows.append(UserProgress(
+                user=user,
+                lessons_completed=lessons,
+                total_score=sum(scores),
+                certification_earned=lessons >= SEED_LESSONS,
+                certification_date=now if lessons >= SEED_LESSONS else None,
+            ))
+        UserProgress.objects.bulk_create(progress_rows)
+        LessonCompletion.objects.bulk_create(completions)
+        created += size
+        if progress_callback:
+            progress_callback(created)
+
+    # bulk_create skips signals, so rebuild the leaderboard/funnel aggregates once
+    stats.rebuild()
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_scenario(name, requests, concurrency, user_count, seed=0):
+    """Issue ``requests`` calls of scenario ``name`` from ``concurrency`` threads"""
+    if name in ASYNC_SCENARIOS:
+        # Run the event loop on a fresh thread so it opens its own DB connections
+        with override_settings(ROOT_URLCONF='ai_literacy_backend.urls_async'), ThreadPoolExecutor(1) as executor:
+            return executor.submit(
+                asyncio.run, _run_async_scenario(name, requests, concurrency, user_count, seed)
+            ).result()
+
+    latencies = []
+    queries = []
+    errors = []
+    peak_threads = [threading.active_count()]
+    lock = threading.Lock()
+
+    def worker(index, count):
+        rng = random.Random(seed * 1000 + index)
+        client = Client()
+        if name in ('get_progress', 'update_progress'):
+            # Each thread acts as one seeded learner
+            client.force_login(User.objects.get(username=f'{USERNAME_PREFIX}{rng.randrange(user_count)}'))
+        try:
+            for _ in range(count):
+                request = _build_request(name, rng, user_count)
+                counter = _QueryCounter()
+                started = time.perf_counter()
+                with connection.execute_wrapper(counter):
+                    response = request(client)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    queries.append(counter.count)
+                    peak_threads[0] = max(peak_threads[0], threading.active_count())
+                    if response.status_code >= 400:
+                        errors.append(response.status_code)
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=worker, args=(i, n)) for i, n in enumerate(_split(requests, concurrency)) if n
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    result = _summarize(latencies, errors, wall, concurrency, peak_threads[0])
+    result.update({
+        'queries_median': statistics.median(queries),
+        'queries_max': max(queries),
+        'query_budget': QUERY_BUDGETS.get(name),
+    })
+    return result
+
+
+async def _run_async_scenario(name, requests, concurrency, user_count, seed):
+    # ``concurrency`` tasks on one event loop, through the ASGI request handler
+    endpoint = name.removesuffix('_async')
+    latencies = []
+    errors = []
+    peak_threads = [threading.active_count()]
+
+    async def worker(index, count):
+        rng = random.Random(seed * 1000 + index)
+        client = AsyncClient()
+        await client.aforce_login(await User.objects.aget(username=f'{USERNAME_PREFIX}{rng.randrange(user_count)}'))
+        for _ in range(count):
+            request = _build_request(endpoint, rng, user_count)
+            started = time.perf_counter()
+            response = await request(client)
+            latencies.append(time.perf_counter() - started)
+            peak_threads[0] = max(peak_threads[0], threading.active_count())
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i, n) for i, n in enumerate(_split(requests, concurrency)) if n))
+    wall = time.perf_counter() - started
+
+    result = _summarize(latencies, errors, wall, concurrency, peak_threads[0])
+    # Concurrent tasks share one connection, so queries can't be attributed per request
+    result.update({'queries_median': None, 'queries_max': None, 'query_budget': None})
+    return result
+
+
+def _split(requests, concurrency):
+    return [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+
+
+def _summarize(latencies, errors, wall, concurrency, peak_threads):
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'errors': len(errors),
+        'throughput_rps': round(len(latencies) / wall, 2) if wall else 0.0,
+        'p50_ms': round(_percentile(latencies, 0.50) * 1000, 3),
+        'p90_ms': round(_percentile(latencies, 0.90) * 1000, 3),
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3),
+        'throughput_per_core_rps': round(len(latencies) / wall / (os.cpu_count() or 1), 2) if wall else 0.0,
+        'peak_threads': peak_threads,
+    }
+
+
+def benchmark_hashers(duration=2.0):
+    """Single-threaded password verifications/sec for each configured hasher"""
+    results = {}
+    for hasher in get_hashers():
+        try:
+            encoded = hasher.encode(BENCH_PASSWORD, hasher.salt())
+        except ValueError as exc:
+            # Optional library (argon2-cffi, bcrypt) not installed
+            results[hasher.algorithm] = {'error': str(exc)}
+            continue
+        verified = 0
+        started = time.perf_counter()
+        while True:
+            hasher.verify(BENCH_PASSWORD, encoded)
+            verified += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= duration:
+                break
+        results[hasher.algorithm] = {
+            'parameters': {
+                key: value for key, value in hasher.decode(encoded).items() if key not in ('algorithm', 'hash', 'salt')
+            },
+            'verify_ms': round(elapsed / verified * 1000, 2),
+            'logins_per_sec_per_core': round(verified / elapsed, 1),
+        }
+    return results
+
+
+def _build_request(name, rng, user_count):
+    if name == 'register':
+        username = f'bench-new-{uuid.uuid4().hex[:16]}'
+        return lambda client: client.post(
+            '/api/register/', {'username': username, 'password': BENCH_PASSWORD}, content_type='application/json'
+        )
+    if name == 'login':
+        username = f'{USERNAME_PREFIX}{rng.randrange(user_count)}'
+        return lambda client: client.post(
+            '/api/login/', {'username': username, 'password': BENCH_PASSWORD}, content_type='application/json'
+        )
+    if name == 'get_progress':
+        return lambda client: client.get('/api/progress/')
+    if name == 'update_progress':
+        body = {'lesson_id': rng.randint(1, SEED_LESSONS), 'score': rng.randint(40, 100)}
+        return lambda client: client.post('/api/update-progress/', body, content_type='application/json')
+    raise ValueError(f'Unknown scenario {name!r}')
+
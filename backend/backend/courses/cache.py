@@ -0,0 +1,113 @@
+"""
+Cached /api/progress/ payloads.
+
+Each user's rendered payload is cached with its ETag and lesson versions,
+and every write drops it once it commits. A build that read the database
+before a write committed could still store its payload after that
+invalidation. So writes also record the user's new UserProgress.version
+under a second key, and a cached payload whose ``cursor`` is older than that
+version is treated as a miss. Both keys are fetched with one get_many().
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ai_literacy_backend.renderers import dumps
+from ai_literacy_backend.singleflight import AsyncSingleFlight, SingleFlight
+
+# v2: entries carry the per-lesson versions for ?since= reads
+PROGRESS_CACHE_VERSION = 2
+
+# Outlives any payload stored by a build that was already running when the version was recorded
+PROGRESS_VERSION_TIMEOUT_FACTOR = 2
+
+# Concurrent cache misses for one user share a single payload build
+_builds = SingleFlight()
+_abuilds = AsyncSingleFlight()
+
+
+def progress_cache_key(user_id):
+    return f'progress:v{PROGRESS_CACHE_VERSION}:{user_id}'
+
+
+def progress_version_key(user_id):
+    return f'progress:v{PROGRESS_CACHE_VERSION}:{user_id}:version'
+
+
+def _fresh(entries, user_id):
+    cached = entries.get(progress_cache_key(user_id))
+    committed = entries.get(progress_version_key(user_id))
+    if cached is None or (committed is not None and cached[0]['cursor'] < committed):
+        return None
+    return cached
+
+
+def compute_etag(payload):
+    """Return a quoted strong ETag for a progress payload"""
+    return '"%s"' % hashlib.blake2b(dumps(payload, sort_keys=True), digest_size=16).hexdigest()
+
+
+def get_cached_progress(user_id):
+    """Return ``(payload, etag, versions)`` for the user, or None on a miss or a stale entry"""
+    return _fresh(cache.get_many([progress_cache_key(user_id), progress_version_key(user_id)]), user_id)
+
+
+def cache_progress(user_id, payload, versions):
+    """Store a rendered progress payload with its lesson versions and return its ETag"""
+    etag = compute_etag(payload)
+    cache.set(progress_cache_key(user_id), (payload, etag, versions), settings.PROGRESS_CACHE_TIMEOUT)
+    return etag
+
+
+async def aget_cached_progress(user_id):
+    return _fresh(await cache.aget_many([progress_cache_key(user_id), progress_version_key(user_id)]), user_id)
+
+
+async def acache_progress(user_id, payload, versions):
+    etag = compute_etag(payload)
+    await cache.aset(progress_cache_key(user_id), (payload, etag, versions), settings.PROGRESS_CACHE_TIMEOUT)
+    return etag
+
+
+def load_progress(user_id, build):
+    """Return ``(payload, etag, versions)`` from the cache, or from one shared call to ``build()``"""
+    cached = get_cached_progress(user_id)
+    if cached is not None:
+        return cached
+
+    def fill():
+        payload, versions = build()
+        return payload, cache_progress(user_id, payload, versions), versions
+
+    return _builds.do(user_id, fill)
+
+
+async def aload_progress(user_id, build):
+    """Async load_progress(); ``build`` is a coroutine function"""
+    cached = await aget_cached_progress(user_id)
+    if cached is not None:
+        return cached
+
+    async def fill():
+        payload, versions = await build()
+        return payload, await acache_progress(user_id, payload, versions), versions
+
+    return await _abuilds.do(user_id, fill)
+
+
+def invalidate_progress(user_id, version=None):
+    """Drop the user's cached payload.
+
+    Pass the UserProgress.version just committed so that payloads built from
+    an older read can't be served afterwards either.
+    """
+    cache.delete(progress_cache_key(user_id))
+    if version is not None:
+        timeout = settings.PROGRESS_CACHE_TIMEOUT * PROGRESS_VERSION_TIMEOUT_FACTOR
+        cache.set(progress_version_key(user_id), version, timeout)
+
+
+def invalidate_progress_many(user_ids):
+    cache.delete_many([progress_cache_key(user_id) for user_id in user_ids])
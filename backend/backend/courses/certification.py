@@ -0,0 +1,90 @@
+"""
+Certification rules.
+
+Whether a learner is certified is decided by the CERTIFICATION_RULES setting:
+
+- ``required_lessons``: lesson ids that must all be completed
+- ``min_lesson_score``: minimum score on each required lesson
+- ``min_total_score``: minimum sum of the required lessons' scores
+- ``valid_days``: days a certification stays valid (None = forever)
+
+The write path re-evaluates a learner after every completion, and
+``manage.py recompute_certifications`` re-applies the rules to every learner
+after they change. A certification dates from the moment its learner first
+met the rules; with ``valid_days`` set it lapses that many days later unless
+a required lesson has been completed again since.
+"""
+
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+
+from .models import LessonCompletion
+
+
+@dataclass(frozen=True)
+class CertificationRules:
+    required_lessons: frozenset
+    min_lesson_score: int = 0
+    min_total_score: int = 0
+    valid_days: int | None = None
+
+    def all_completed(self, completions):
+        """Whether ``completions`` ({lesson_id: ...}) includes every required lesson"""
+        return bool(self.required_lessons) and self.required_lessons <= completions.keys()
+
+    def qualified_at(self, completions):
+        """When ``completions`` ({lesson_id: (score, completed_at)}) met the rules, or None"""
+        if not self.all_completed(completions):
+            return None
+        required = [completions[lesson_id] for lesson_id in self.required_lessons]
+        if any(score < self.min_lesson_score for score, _ in required):
+            return None
+        if sum(score for score, _ in required) < self.min_total_score:
+            return None
+        return max(completed_at for _, completed_at in required)
+
+    def expired(self, certified_at, now):
+        return self.valid_days is not None and certified_at + timedelta(days=self.valid_days) <= now
+
+    def evaluate(self, completions, earned, certified_at, now):
+        """Return the ``(certification_earned, certification_date)`` a learner should have"""
+        qualified_at = self.qualified_at(completions)
+        if qualified_at is None:
+            return False, None
+        # Keep the original date of a standing certification
+        start = certified_at if earned and certified_at is not None else qualified_at
+        if self.expired(start, now) and qualified_at > start:
+            # A required lesson was redone since: that renews the certification
+            start = qualified_at
+        return not self.expired(start, now), start
+
+
+def get_rules():
+    config = settings.CERTIFICATION_RULES
+    return CertificationRules(
+        required_lessons=frozenset(config['required_lessons']),
+        min_lesson_score=config.get('min_lesson_score', 0),
+        min_total_score=config.get('min_total_score', 0),
+        valid_days=config.get('valid_days'),
+    )
+
+
+def required_completions(rules, user_ids):
+    """Return {user_id: {lesson_id: (score, completed_at)}} for the required lessons"""
+    completions = {user_id: {} for user_id in user_ids}
+    rows = LessonCompletion.objects.filter(
+        user_id__in=user_ids, lesson_id__in=rules.required_lessons
+    ).values_list('user_id', 'lesson_id', 'score', 'completed_at')
+    for user_id, lesson_id, score, completed_at in rows:
+        completions[user_id][lesson_id] = (score, completed_at)
+    return completions
+
+
+def is_active(progress, now, rules=None):
+    """Whether a stored certification is still valid at ``now``"""
+    rules = rules or get_rules()
+    return progress.certification_earned and not (
+        progress.certification_date and rules.expired(progress.certification_date, now)
+    )
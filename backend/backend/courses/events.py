@@ -0,0 +1,160 @@
+"""
+Progress snapshots rebuilt from the ProgressEvent log.
+
+Every progress write appends to ProgressEvent and, in the same transaction,
+updates the snapshot: LessonCompletion rows plus the UserProgress counters.
+The log is the source of truth and the snapshot can always be recomputed
+from it:
+
+- each lesson's completion dates from its most recently recorded applied
+  event and carries the best score of its applied events
+- ``total_score`` is the sum of the completions' scores plus every
+  ``baseline`` event: completing a lesson again never lowers it
+- ``lessons_completed`` is the number of lessons with a completion
+
+``manage.py compact_progress`` replays the log chunk by chunk and repairs any
+snapshot that has drifted. With ``prune_before`` it also compacts the log:
+superseded events recorded before that time are deleted, and old baseline
+events are folded into a single one per user. The latest and the
+best-scoring event for each lesson and everything recorded after
+``prune_before`` are always kept.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from .models import LessonCompletion, ProgressEvent, UserProgress
+
+
+@dataclass
+class Snapshot:
+    completions: dict = field(default_factory=dict)  # lesson_id -> (score, completed_at)
+    total_score: int = 0
+
+    @property
+    def lessons_completed(self):
+        return len(self.completions)
+
+
+def replay(user_ids):
+    """Fold each user's applied events, in recording order, into {user_id: Snapshot}"""
+    snapshots = {user_id: Snapshot() for user_id in user_ids}
+    events = ProgressEvent.objects.filter(user_id__in=user_ids, applied=True).order_by('id').values_list(
+        'user_id', 'kind', 'lesson_id', 'score', 'occurred_at'
+    )
+    baselines = defaultdict(int)
+    for user_id, kind, lesson_id, score, occurred_at in events:
+        if kind == ProgressEvent.COMPLETION:
+            completions = snapshots[user_id].completions
+            best = max(score, completions[lesson_id][0]) if lesson_id in completions else score
+            completions[lesson_id] = (best, occurred_at)
+        else:
+            baselines[user_id] += score
+    for user_id, snapshot in snapshots.items():
+        snapshot.total_score = baselines[user_id] + sum(score for score, _ in snapshot.completions.values())
+    return snapshots
+
+
+def prune(user_ids, before):
+    """Delete superseded events recorded before ``before``, keeping each user's totals.
+
+    Returns the number of events removed. Must run inside transaction.atomic()
+    with the users' progress rows locked.
+    """
+    events = ProgressEvent.objects.filter(user_id__in=user_ids).order_by('id').values_list(
+        'id', 'user_id', 'kind', 'lesson_id', 'score', 'applied', 'recorded_at', 'occurred_at'
+    )
+    latest = {}
+    best = {}
+    old = []
+    for event in events:
+        event_id, user_id, kind, lesson_id, score, applied, recorded_at, occurred_at = event
+        if kind == ProgressEvent.COMPLETION and applied:
+            latest[user_id, lesson_id] = event_id
+            if (user_id, lesson_id) not in best or score > best[user_id, lesson_id][0]:
+                best[user_id, lesson_id] = (score, event_id)
+        if recorded_at < before:
+            old.append(event)
+
+    removed = []
+    carried = defaultdict(int)
+    first_seen = {}
+    for event_id, user_id, kind, lesson_id, score, applied, _, occurred_at in old:
+        key = (user_id, lesson_id)
+        if latest.get(key) == event_id or (key in best and best[key][1] == event_id):
+            continue
+        removed.append(event_id)
+        # Superseded completions no longer count towards the total; baselines do
+        if kind == ProgressEvent.BASELINE:
+            carried[user_id] += score
+            first_seen[user_id] = min(first_seen.get(user_id, occurred_at), occurred_at)
+    if not removed:
+        return 0
+
+    ProgressEvent.objects.filter(id__in=removed).delete()
+    ProgressEvent.objects.bulk_create([
+        ProgressEvent(
+            user_id=user_id, kind=ProgressEvent.BASELINE, score=score,
+            occurred_at=first_seen[user_id], source=ProgressEvent.COMPACTION,
+        )
+        for user_id, score in carried.items()
+        if score
+    ])
+    return len(removed)
+
+
+def repair(rows, snapshots, rules, now, dry_run=False):
+    """Bring the locked UserProgress ``rows`` and their completions in line with ``snapshots``.
+
+    Returns ``(changed_rows, completion_fixes)``; with ``dry_run`` nothing is written.
+    """
+    user_ids = [row.user_id for row in rows]
+    stored = defaultdict(dict)
+    for completion in LessonCompletion.objects.filter(user_id__in=user_ids):
+        stored[completion.user_id][completion.lesson_id] = completion
+
+    upserts = []
+    stale = []
+    changed = []
+    for row in rows:
+        snapshot = snapshots[row.user_id]
+        current = stored[row.user_id]
+        fixed = [
+            LessonCompletion(
+                user_id=row.user_id, lesson_id=lesson_id, score=score, completed_at=completed_at,
+                version=row.version + 1,
+            )
+            for lesson_id, (score, completed_at) in snapshot.completions.items()
+            if lesson_id not in current or (current[lesson_id].score, current[lesson_id].completed_at) != (score, completed_at)
+        ]
+        removed = [completion.pk for lesson_id, completion in current.items() if lesson_id not in snapshot.completions]
+        upserts += fixed
+        stale += removed
+
+        earned, certified_at = rules.evaluate(
+            snapshot.completions, row.certification_earned, row.certification_date, now
+        )
+        target = (snapshot.total_score, snapshot.lessons_completed, earned, certified_at)
+        if target != (row.total_score, row.lessons_completed, row.certification_earned, row.certification_date):
+            row.total_score, row.lessons_completed, row.certification_earned, row.certification_date = target
+            changed.append(row)
+        elif fixed or removed:
+            changed.append(row)
+        if fixed or removed:
+            # Delta readers (?since=) must see the repaired lessons
+            row.version += 1
+
+    if dry_run:
+        return changed, len(upserts) + len(stale)
+    if upserts:
+        LessonCompletion.objects.bulk_create(
+            upserts, update_conflicts=True, unique_fields=['user', 'lesson_id'],
+            update_fields=['score', 'completed_at', 'version'],
+        )
+    if stale:
+        LessonCompletion.objects.filter(pk__in=stale).delete()
+    if changed:
+        UserProgress.objects.bulk_update(
+            changed, ['total_score', 'lessons_completed', 'certification_earned', 'certification_date', 'version']
+        )
+    return changed, len(upserts) + len(stale)
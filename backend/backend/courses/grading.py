@@ -0,0 +1,200 @@
+"""
+Server-side quiz grading.
+
+Answer keys live on QuizQuestion rows and never leave the server. Each
+process compiles them once into graders (precompiled regexes and choice
+sets) and keeps them in memory. Grading a submission is then pure CPU work
+with no queries.
+
+A version token in the shared cache tells processes when to recompile.
+``lessons.invalidate_catalog()`` deletes it whenever a lesson or question
+changes, so checking for staleness costs one cache read, not a query.
+
+Answer key formats (``QuizQuestion.answer_key``):
+
+- choice: ``{'correct': [choice_index, ...]}``; the answer is a choice index,
+  or a list of them for multi-select questions
+- rubric: ``{'min_length', 'too_short', 'pass_score', 'criteria': [...]}``;
+  each criterion awards its ``points`` when any of its ``patterns`` matches
+  (case-insensitive) or the answer is at least ``min_length`` characters
+"""
+
+import re
+import threading
+import uuid
+from dataclasses import dataclass
+
+from django.core.cache import cache
+
+from .lessons import ANSWER_KEYS_CACHE_KEY
+from .models import Lesson, QuizQuestion
+
+# Share of a question's points needed to pass it when its key doesn't say
+DEFAULT_PASS_SCORE = 70
+
+_compiled = (None, {})
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Criterion:
+    pattern: re.Pattern | None
+    min_length: int | None
+    points: int
+    hit: str
+    miss: str | None
+
+    def matches(self, text):
+        if self.pattern is not None and self.pattern.search(text):
+            return True
+        return self.min_length is not None and len(text) >= self.min_length
+
+
+@dataclass(frozen=True)
+class QuestionGrader:
+    id: int
+    kind: str
+    points: int
+    pass_score: int
+    correct: frozenset = frozenset()
+    criteria: tuple = ()
+    min_length: int = 0
+    too_short: str = ''
+
+    def grade(self, answer):
+        """Return ``(points_earned, passed, feedback)`` for one answer"""
+        if self.kind == QuizQuestion.CHOICE:
+            passed = _choice_indexes(answer) == self.correct
+            return (self.points if passed else 0), passed, []
+
+        text = answer.strip() if isinstance(answer, str) else ''
+        if len(text) < self.min_length:
+            return 0, False, [self.too_short] if self.too_short else []
+        earned = 0
+        feedback = []
+        for criterion in self.criteria:
+            if criterion.matches(text):
+                earned += criterion.points
+                feedback.append(criterion.hit)
+            elif criterion.miss:
+                feedback.append(criterion.miss)
+        earned = min(earned, self.points)
+        return earned, earned * 100 >= self.pass_score * self.points, feedback
+
+
+def _choice_indexes(answer):
+    """The set of choices in a choice answer, or None when it isn't an index or a list of them"""
+    chosen = answer if isinstance(answer, list) else [answer]
+    # bool is an int subclass, but True is not choice 1
+    if all(isinstance(index, int) and not isinstance(index, bool) for index in chosen):
+        return frozenset(chosen)
+    return None
+
+
+@dataclass(frozen=True)
+class LessonGrader:
+    lesson_id: int
+    questions: tuple
+
+    def grade(self, answers):
+        """Grade ``answers`` ({question_id: answer}); unanswered questions earn nothing.
+
+        A lesson is passed when every question is; its score is the percentage
+        of available points earned.
+        """
+        earned = possible = 0
+        passed = True
+        results = []
+        for question in self.questions:
+            points, question_passed, feedback = question.grade(answers.get(str(question.id)))
+            earned += points
+            possible += question.points
+            passed = passed and question_passed
+            results.append({'id': question.id, 'score': points, 'passed': question_passed, 'feedback': feedback})
+        return {
+            'lesson_id': self.lesson_id,
+            'score': round(100 * earned / possible) if possible else 0,
+            'passed': passed and bool(self.questions),
+            'questions': results,
+        }
+
+
+def compile_question(question):
+    key = question.answer_key or {}
+    pass_score = key.get('pass_score', DEFAULT_PASS_SCORE)
+    if question.kind == QuizQuestion.CHOICE:
+        correct = key.get('correct', [])
+        return QuestionGrader(
+            id=question.id, kind=question.kind, points=question.points, pass_score=pass_score,
+            correct=frozenset(correct if isinstance(correct, list) else [correct]),
+        )
+    criteria = tuple(
+        Criterion(
+            pattern=re.compile('|'.join(f'(?:{p})' for p in item['patterns']), re.IGNORECASE) if item.get('patterns') else None,
+            min_length=item.get('min_length'),
+            points=item['points'],
+            hit=item.get('hit', ''),
+            miss=item.get('miss'),
+        )
+        for item in key.get('criteria', [])
+    )
+    return QuestionGrader(
+        id=question.id, kind=question.kind, points=question.points, pass_score=pass_score,
+        criteria=criteria, min_length=key.get('min_length', 0), too_short=key.get('too_short', ''),
+    )
+
+
+def compile_graders():
+    """Build a LessonGrader for every published lesson (two queries)"""
+    lessons = Lesson.objects.filter(published=True).prefetch_related('questions')
+    return {
+        lesson.id: LessonGrader(
+            lesson_id=lesson.id,
+            questions=tuple(
+                compile_question(question)
+                for question in sorted(lesson.questions.all(), key=lambda q: (q.position, q.id))
+            ),
+        )
+        for lesson in lessons
+    }
+
+
+def get_graders():
+    """Return {lesson_id: LessonGrader}, recompiling only after lessons changed"""
+    global _compiled
+    version, graders = _compiled
+    current = cache.get(ANSWER_KEYS_CACHE_KEY)
+    if current is not None and current == version:
+        return graders
+
+    with _lock:
+        version, graders = _compiled
+        current = cache.get(ANSWER_KEYS_CACHE_KEY)
+        if current is None or current != version:
+            # Claim the token before reading: an edit made while we compile
+            # deletes it again, so the next call recompiles
+            cache.add(ANSWER_KEYS_CACHE_KEY, uuid.uuid4().hex, None)
+            current = cache.get(ANSWER_KEYS_CACHE_KEY)
+            graders = compile_graders()
+            _compiled = (current, graders)
+        return graders
+
+
+def grade_submission(graders, submission):
+    """Grade one ``{lesson_id, answers}`` dict.
+
+    Returns ``(result, None)`` or ``(None, error)``.
+    """
+    if not isinstance(submission, dict):
+        return None, 'submission must be an object'
+    try:
+        lesson_id = int(submission.get('lesson_id'))
+    except (TypeError, ValueError):
+        return None, 'lesson_id must be an integer'
+    grader = graders.get(lesson_id)
+    if grader is None:
+        return None, 'Unknown lesson_id'
+    answers = submission.get('answers')
+    if not isinstance(answers, dict):
+        return None, 'answers must be an object keyed by question id'
+    return grader.grade(answers), None
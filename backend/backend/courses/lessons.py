@@ -0,0 +1,132 @@
+"""
+Lesson catalog and precompiled lesson bundles.
+
+Each lesson is compiled into one JSON bundle holding its metadata, content and
+questions (without answer keys). The bundle is stored together with gzip and
+brotli variants and named by a hash of its content, so the bundle URL changes
+whenever the lesson does. That lets clients and CDNs cache bundles forever
+(``immutable``) and re-fetch only the lessons whose hash changed in the
+catalog.
+
+Bundles are recompiled by signals whenever a lesson or question is saved,
+and lazily for lessons that have never been compiled (e.g. rows added by a
+migration) or were compiled before brotli was installed.
+"""
+
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.urls import reverse
+
+from ai_literacy_backend import compression
+from ai_literacy_backend.compression import brotli_compress, gzip_compress
+from .models import Lesson
+
+BUNDLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+CATALOG_CACHE_CONTROL = 'public, max-age=60'
+CATALOG_CACHE_KEY = 'lessons:catalog:v1'
+LESSON_IDS_CACHE_KEY = 'lessons:ids:v1'
+# Version token for the answer keys each process compiles (see grading.py)
+ANSWER_KEYS_CACHE_KEY = 'lessons:answer-keys:v1'
+
+
+def bundle_payload(lesson):
+    return {
+        'id': lesson.id,
+        'slug': lesson.slug,
+        'title': lesson.title,
+        'icon': lesson.icon,
+        'description': lesson.description,
+        'content': lesson.content,
+        'questions': [
+            {
+                'id': question.id,
+                'position': question.position,
+                'kind': question.kind,
+                'prompt': question.prompt,
+                'choices': question.choices,
+                'points': question.points,
+            }
+            for question in lesson.questions.order_by('position', 'id')
+        ],
+    }
+
+
+def compile_lesson(lesson):
+    """Render, hash and precompress a lesson's bundle and store it on the row"""
+    body = json.dumps(bundle_payload(lesson), sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode()
+    compiled = {
+        'content_hash': hashlib.blake2b(body, digest_size=16).hexdigest(),
+        'bundle': body,
+        'bundle_gzip': gzip_compress(body),
+        'bundle_brotli': brotli_compress(body),
+    }
+    # update() rather than save(): no post_save, so compiling never re-triggers itself
+    Lesson.objects.filter(pk=lesson.pk).update(**compiled)
+    for field, value in compiled.items():
+        setattr(lesson, field, value)
+    return lesson
+
+
+def bundle_url(lesson):
+    return reverse('lesson_bundle', args=[lesson.id, lesson.content_hash])
+
+
+def catalog():
+    """Return ``(payload, etag)`` for /api/lessons/, from the cache when possible"""
+    cached = cache.get(CATALOG_CACHE_KEY)
+    if cached is not None:
+        return cached
+
+    lessons = list(
+        Lesson.objects.filter(published=True).defer('bundle', 'bundle_gzip', 'bundle_brotli')
+        .annotate(missing_brotli=Q(bundle_brotli__isnull=True))
+    )
+    for lesson in lessons:
+        if not lesson.content_hash or (lesson.missing_brotli and compression.brotli is not None):
+            compile_lesson(lesson)
+    payload = {
+        'lessons': [
+            {
+                'id': lesson.id,
+                'slug': lesson.slug,
+                'title': lesson.title,
+                'icon': lesson.icon,
+                'description': lesson.description,
+                'position': lesson.position,
+                'version': lesson.content_hash,
+                'bundle_url': bundle_url(lesson),
+            }
+            for lesson in lessons
+        ],
+    }
+    # The catalog changes exactly when some lesson's hash does
+    digest = hashlib.blake2b(digest_size=16)
+    for lesson in lessons:
+        digest.update(f'{lesson.id}:{lesson.position}:{lesson.content_hash};'.encode())
+    result = (payload, '"%s"' % digest.hexdigest())
+    cache.set(CATALOG_CACHE_KEY, result, None)
+    return result
+
+
+def lesson_ids():
+    """Set of published lesson ids, used to validate progress submissions"""
+    ids = cache.get(LESSON_IDS_CACHE_KEY)
+    if ids is None:
+        ids = frozenset(Lesson.objects.filter(published=True).values_list('id', flat=True))
+        cache.set(LESSON_IDS_CACHE_KEY, ids, None)
+    return ids
+
+
+async def alesson_ids():
+    ids = await cache.aget(LESSON_IDS_CACHE_KEY)
+    if ids is None:
+        ids = frozenset([lesson_id async for lesson_id in Lesson.objects.filter(published=True).values_list('id', flat=True)])
+        await cache.aset(LESSON_IDS_CACHE_KEY, ids, None)
+    return ids
+
+
+def invalidate_catalog():
+    cache.delete_many([CATALOG_CACHE_KEY, LESSON_IDS_CACHE_KEY, ANSWER_KEYS_CACHE_KEY])
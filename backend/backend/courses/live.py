@@ -0,0 +1,49 @@
+"""
+Live progress events, pushed to /api/progress/stream/ subscribers.
+
+Once a progress write commits, the learner's channel receives a
+``progress`` event with the lessons that changed and the new totals. A
+``certification`` event follows when the certification was earned or lost.
+Events carry absolute values, not increments, so a client can apply one
+twice without harm.
+
+The stream opens with a ``snapshot`` event holding the full /api/progress/
+payload. A subscriber that falls too far behind gets a fresh snapshot
+instead of the events it missed (see ai_literacy_backend/pubsub.py).
+"""
+
+from ai_literacy_backend.pubsub import get_hub
+from ai_literacy_backend.renderers import dumps
+
+
+def channel(user_id):
+    return f'progress:{user_id}'
+
+
+def progress_events(progress, completions, certification_changed):
+    """Return the events describing a committed write, as ``[(event, data), ...]``"""
+    certification = {
+        'certification_earned': progress.certification_earned,
+        'certification_date': progress.certification_date.isoformat() if progress.certification_date else None,
+    }
+    events = [('progress', {
+        'progress': {str(c.lesson_id): c.as_progress_entry() for c in completions},
+        'total_lessons': progress.lessons_completed,
+        'total_score': progress.total_score,
+        **certification,
+        'cursor': progress.version,
+    })]
+    if certification_changed:
+        events.append(('certification', certification))
+    return events
+
+
+def publish(user_id, events):
+    hub = get_hub()
+    for event, data in events:
+        hub.publish(channel(user_id), {'event': event, 'data': data})
+
+
+def format_event(event, data):
+    """Render one server-sent event"""
+    return f'event: {event}\ndata: {dumps(data).decode()}\n\n'
@@ -0,0 +1,98 @@
+import json
+import logging
+import os
+import platform
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from courses.benchmarks import SCENARIOS, benchmark_hashers, run_scenario, seed_users
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the progress API against a throwaway database seeded with N users. '
+        'Prints (or writes) JSON results and fails if a scenario exceeds its query budget.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='learners to seed (default 1000)')
+        parser.add_argument('--requests', type=int, default=200, help='requests per scenario (default 200)')
+        parser.add_argument('--concurrency', type=int, default=8, help='client threads (default 8)')
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='run only these scenarios')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+        parser.add_argument(
+            '--hashers', action='store_true', help='also measure password verifications/sec per core for each hasher'
+        )
+        parser.add_argument('--no-budget-check', action='store_true', help='report query budget overruns without failing')
+
+    def handle(self, *args, **options):
+        scenarios = options['scenario'] or list(SCENARIOS)
+        # Password hashing makes every register/login "slow"; keep the report readable
+        logging.getLogger('ai_literacy_backend.metrics').setLevel(logging.ERROR)
+
+        # Never touch the real database: benchmark against a fresh test database
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.stderr.write(f"Seeding {options['users']} users...")
+            seed_users(
+                options['users'],
+                seed=options['seed'],
+                progress_callback=lambda n: self.stderr.write(f'  {n} users', ending='\r'),
+            )
+            self.stderr.write('')
+
+            results = {}
+            # Each client thread plays one learner sending far more than a real one
+            # would; measure the endpoints, not the rate limiter
+            with override_settings(THROTTLE_ENABLED=False):
+                for name in scenarios:
+                    self.stderr.write(f'Running {name}...')
+                    results[name] = run_scenario(
+                        name, options['requests'], options['concurrency'], options['users'], seed=options['seed']
+                    )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['hashers']:
+            self.stderr.write('Measuring password hashers...')
+            hashers = benchmark_hashers()
+
+        report = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'users': options['users'],
+                'requests_per_scenario': options['requests'],
+                'concurrency': options['concurrency'],
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'password_hasher': settings.PASSWORD_HASHER,
+            },
+            'scenarios': results,
+        }
+        if options['hashers']:
+            report['hashers'] = hashers
+        rendered = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(rendered + '\n')
+        else:
+            self.stdout.write(rendered)
+
+        over_budget = [
+            f"{name}: {result['queries_max']} queries (budget {result['query_budget']})"
+            for name, result in results.items()
+            if result['query_budget'] is not None and result['queries_max'] > result['query_budget']
+        ]
+        if over_budget and not options['no_budget_check']:
+            raise CommandError('Query budget exceeded: ' + '; '.join(over_budget))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from courses import analytics
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the cohort score-matrix snapshot behind /api/recommendations/ and publish it to ANALYTICS_DIR. '
+        'Run it periodically; workers pick up each new snapshot on their next request.'
+    )
+
+    def handle(self, *args, **options):
+        meta = analytics.build()
+
+        snapshot = analytics.get_snapshot()
+        for col in range(meta['lessons']):
+            stats = snapshot.lesson_stats(col)
+            difficulty = '-' if stats['difficulty'] is None else f"{stats['difficulty']:.2f}"
+            self.stdout.write(
+                f"lesson {stats['lesson_id']}: {stats['completion_rate']:.0%} completed, difficulty {difficulty}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Built {meta['snapshot']} ({meta['learners']} learners x {meta['lessons']} lessons)"
+        ))
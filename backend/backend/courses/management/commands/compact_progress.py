@@ -0,0 +1,70 @@
+from datetime import timedelta
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from courses import certification, events, stats
+from courses.cache import invalidate_progress_many
+from courses.models import UserProgress
+
+FIELDS = ['user_id', 'total_score', 'lessons_completed', 'certification_earned', 'certification_date', 'version']
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild progress snapshots (UserProgress and LessonCompletion) from the ProgressEvent log, '
+        'optionally compacting old superseded events. Works in chunks, so memory stays bounded.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='learners per chunk (default 2000)')
+        parser.add_argument('--dry-run', action='store_true', help='report drift without writing')
+        parser.add_argument(
+            '--prune-older-than', type=int, metavar='DAYS',
+            help='delete superseded events recorded more than DAYS days ago, merging old score baselines',
+        )
+
+    def handle(self, *args, **options):
+        rules = certification.get_rules()
+        now = timezone.now()
+        days = options['prune_older_than']
+        prune_before = now - timedelta(days=days) if days is not None and not options['dry_run'] else None
+        totals = {'processed': 0, 'repaired': 0, 'completions': 0, 'pruned': 0}
+
+        pks = UserProgress.objects.order_by('pk').values_list('pk', flat=True).iterator(
+            chunk_size=options['chunk_size']
+        )
+        chunk = []
+        for pk in pks:
+            chunk.append(pk)
+            if len(chunk) == options['chunk_size']:
+                self._compact(chunk, rules, now, prune_before, options['dry_run'], totals)
+                chunk = []
+        if chunk:
+            self._compact(chunk, rules, now, prune_before, options['dry_run'], totals)
+
+        if (totals['repaired'] or totals['completions']) and not options['dry_run']:
+            # Snapshot repairs bypass the incremental counters
+            stats.rebuild()
+
+        prefix = 'Would repair' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {totals['repaired']} of {totals['processed']} learners "
+            f"({totals['completions']} lesson completions), pruned {totals['pruned']} events"
+        ))
+
+    def _compact(self, pks, rules, now, prune_before, dry_run, totals):
+        # Lock the chunk so no progress write lands between replaying the log and repairing
+        with transaction.atomic():
+            rows = list(UserProgress.objects.select_for_update().filter(pk__in=pks).only(*FIELDS))
+            user_ids = [row.user_id for row in rows]
+            changed, fixes = events.repair(rows, events.replay(user_ids), rules, now, dry_run=dry_run)
+            if prune_before is not None:
+                totals['pruned'] += events.prune(user_ids, prune_before)
+            totals['processed'] += len(rows)
+            totals['repaired'] += len(changed)
+            totals['completions'] += fixes
+            if changed and not dry_run:
+                transaction.on_commit(partial(invalidate_progress_many, [row.user_id for row in changed]))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from courses import export
+
+
+class Command(BaseCommand):
+    help = (
+        "Export every learner's progress and certification status as CSV or NDJSON. "
+        'Rows are streamed in chunks, so memory stays constant for millions of users.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=export.FORMATS, default='csv', help='output format (default csv)')
+        parser.add_argument('--output', '-o', help='file to write (default stdout)')
+        parser.add_argument(
+            '--chunk-size', type=int, default=export.DEFAULT_CHUNK_SIZE,
+            help=f'learners per chunk (default {export.DEFAULT_CHUNK_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        content = export.stream(options['format'], options['chunk_size'])
+        if not options['output']:
+            for part in content:
+                self.stdout.write(part, ending='')
+            return
+
+        with open(options['output'], 'w', encoding='utf-8', newline='') as out:
+            for part in content:
+                out.write(part)
+        self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from courses import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute leaderboard and funnel aggregates from progress rows'
+
+    def handle(self, *args, **options):
+        stats.rebuild()
+        self.stdout.write(self.style.SUCCESS('Aggregates rebuilt'))
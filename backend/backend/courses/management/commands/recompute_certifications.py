@@ -0,0 +1,70 @@
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from courses import certification, stats
+from courses.cache import invalidate_progress_many
+from courses.models import UserProgress
+
+FIELDS = ['certification_earned', 'certification_date']
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-apply CERTIFICATION_RULES to every learner. Streams progress rows in chunks and '
+        'writes changes with bulk_update, so memory stays bounded for millions of users.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='learners per chunk (default 2000)')
+        parser.add_argument('--dry-run', action='store_true', help='report what would change without writing')
+
+    def handle(self, *args, **options):
+        rules = certification.get_rules()
+        now = timezone.now()
+        totals = {'processed': 0, 'granted': 0, 'revoked': 0, 'updated': 0}
+
+        pks = UserProgress.objects.order_by('pk').values_list('pk', flat=True).iterator(
+            chunk_size=options['chunk_size']
+        )
+        chunk = []
+        for pk in pks:
+            chunk.append(pk)
+            if len(chunk) == options['chunk_size']:
+                self._recompute(chunk, rules, now, options['dry_run'], totals)
+                chunk = []
+        if chunk:
+            self._recompute(chunk, rules, now, options['dry_run'], totals)
+
+        prefix = 'Would update' if options['dry_run'] else 'Updated'
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {totals['updated']} of {totals['processed']} learners "
+            f"({totals['granted']} certified, {totals['revoked']} no longer certified)"
+        ))
+
+    def _recompute(self, pks, rules, now, dry_run, totals):
+        # Lock the chunk so a concurrent progress write can't be overwritten with a stale verdict
+        with transaction.atomic():
+            rows = list(UserProgress.objects.select_for_update().filter(pk__in=pks).only('user_id', *FIELDS))
+            completions = certification.required_completions(rules, [row.user_id for row in rows])
+            changed = []
+            delta = 0
+            for row in rows:
+                verdict = rules.evaluate(completions[row.user_id], row.certification_earned, row.certification_date, now)
+                if verdict == (row.certification_earned, row.certification_date):
+                    continue
+                if verdict[0] != row.certification_earned:
+                    delta += 1 if verdict[0] else -1
+                    totals['granted' if verdict[0] else 'revoked'] += 1
+                row.certification_earned, row.certification_date = verdict
+                changed.append(row)
+            totals['processed'] += len(rows)
+            totals['updated'] += len(changed)
+            if dry_run or not changed:
+                return
+
+            UserProgress.objects.bulk_update(changed, FIELDS)
+            stats.certifications_changed(delta)
+            transaction.on_commit(partial(invalidate_progress_many, [row.user_id for row in changed]))
@@ -0,0 +1,129 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:26
+
+import json
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.dateparse import parse_datetime
+
+
+def _load_json(value, default):
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _entry_score(entry):
+    try:
+        return int(entry.get('score') or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _entry_completed_at(entry, default):
+    value = entry.get('completed_at')
+    try:
+        return (parse_datetime(value) if isinstance(value, str) else None) or default
+    except ValueError:
+        return default
+
+
+def copy_blobs_to_completions(apps, schema_editor):
+    """Explode the completed_lesson_ids/progress_data blobs into LessonCompletion rows"""
+    UserProgress = apps.get_model('courses', 'UserProgress')
+    LessonCompletion = apps.get_model('courses', 'LessonCompletion')
+
+    batch = []
+    user_id = None
+    seen = set()
+    # A user's rows are adjacent, so the dedup set only ever holds one user's lessons
+    for progress in UserProgress.objects.order_by('user_id', 'pk').iterator(chunk_size=1000):
+        if progress.user_id != user_id:
+            user_id = progress.user_id
+            seen = set()
+        lesson_ids = _load_json(progress.completed_lesson_ids, [])
+        if not isinstance(lesson_ids, list):
+            lesson_ids = []
+        progress_data = _load_json(progress.progress_data, {})
+        if not isinstance(progress_data, dict):
+            progress_data = {}
+
+        for lesson_id in lesson_ids:
+            try:
+                lesson_id = int(lesson_id)
+            except (TypeError, ValueError):
+                continue
+            if lesson_id in seen:
+                continue
+            seen.add(lesson_id)
+
+            entry = progress_data.get(str(lesson_id))
+            if not isinstance(entry, dict):
+                entry = {}
+            batch.append(LessonCompletion(
+                user_id=progress.user_id,
+                lesson_id=lesson_id,
+                score=_entry_score(entry),
+                completed_at=_entry_completed_at(entry, progress.created_at),
+            ))
+
+        if len(batch) >= 1000:
+            LessonCompletion.objects.bulk_create(batch)
+            batch = []
+
+    LessonCompletion.objects.bulk_create(batch)
+
+
+def copy_completions_to_blobs(apps, schema_editor):
+    """Rebuild the JSON blobs from LessonCompletion rows"""
+    UserProgress = apps.get_model('courses', 'UserProgress')
+    LessonCompletion = apps.get_model('courses', 'LessonCompletion')
+
+    for progress in UserProgress.objects.order_by('pk').iterator(chunk_size=1000):
+        completions = LessonCompletion.objects.filter(user_id=progress.user_id).order_by('lesson_id')
+        progress.completed_lesson_ids = json.dumps([c.lesson_id for c in completions])
+        progress.progress_data = json.dumps({
+            str(c.lesson_id): {
+                'score': c.score,
+                'completed': True,
+                'completed_at': c.completed_at.isoformat(),
+            }
+            for c in completions
+        })
+        progress.save(update_fields=['completed_lesson_ids', 'progress_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_userprogress_certification_date_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LessonCompletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lesson_id', models.IntegerField()),
+                ('score', models.IntegerField(default=0)),
+                ('completed_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lesson_completions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['lesson_id', 'score'], name='lessoncompletion_lesson_score')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'lesson_id'), name='unique_lesson_completion')],
+            },
+        ),
+        migrations.RunPython(copy_blobs_to_completions, copy_completions_to_blobs),
+        migrations.RemoveField(
+            model_name='userprogress',
+            name='completed_lesson_ids',
+        ),
+        migrations.RemoveField(
+            model_name='userprogress',
+            name='progress_data',
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def drop_duplicate_progress_rows(apps, schema_editor):
+    """Keep only the oldest UserProgress row per user before adding the unique constraint"""
+    UserProgress = apps.get_model('courses', 'UserProgress')
+    keep = UserProgress.objects.values('user_id').annotate(first_pk=Min('pk')).values('first_pk')
+    UserProgress.objects.exclude(pk__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_lessoncompletion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64)),
+                ('response', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(drop_duplicate_progress_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='userprogress',
+            constraint=models.UniqueConstraint(fields=('user',), name='unique_user_progress'),
+        ),
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='idempotency_keys', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='idempotencykey',
+            constraint=models.UniqueConstraint(fields=('user', 'key'), name='unique_idempotency_key'),
+        ),
+    ]
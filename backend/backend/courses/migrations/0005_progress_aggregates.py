@@ -0,0 +1,67 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:50
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_aggregates(apps, schema_editor):
+    UserProgress = apps.get_model('courses', 'UserProgress')
+    LessonCompletion = apps.get_model('courses', 'LessonCompletion')
+    LessonStats = apps.get_model('courses', 'LessonStats')
+    ScoreBucket = apps.get_model('courses', 'ScoreBucket')
+    CohortStats = apps.get_model('courses', 'CohortStats')
+
+    LessonStats.objects.bulk_create(
+        LessonStats(lesson_id=row['lesson_id'], completions=row['n'])
+        for row in LessonCompletion.objects.values('lesson_id').annotate(n=Count('pk'))
+    )
+    ScoreBucket.objects.bulk_create(
+        ScoreBucket(score=row['total_score'], learners=row['n'])
+        for row in UserProgress.objects.values('total_score').annotate(n=Count('pk'))
+    )
+    CohortStats.objects.create(
+        pk=1,
+        learners=UserProgress.objects.count(),
+        certified=UserProgress.objects.filter(certification_earned=True).count(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_userprogress_unique_idempotencykey'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CohortStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('learners', models.IntegerField(default=0)),
+                ('certified', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LessonStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lesson_id', models.IntegerField(unique=True)),
+                ('completions', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ScoreBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.IntegerField(unique=True)),
+                ('learners', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='userprogress',
+            index=models.Index(fields=['-total_score'], name='userprogress_total_score'),
+        ),
+        migrations.RunPython(backfill_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_progress_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LearningTopic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('difficulty_level', models.IntegerField(default=1)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TopicProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lessons_completed', models.IntegerField(default=0)),
+                ('average_score', models.FloatField(default=0)),
+                ('current_difficulty', models.IntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='courses.learningtopic')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'topic'), name='unique_topic_progress')],
+            },
+        ),
+    ]
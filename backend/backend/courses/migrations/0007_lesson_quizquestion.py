@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_learningtopic_topicprogress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lesson',
+            fields=[
+                ('id', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('slug', models.SlugField(unique=True)),
+                ('title', models.CharField(max_length=200)),
+                ('icon', models.CharField(blank=True, max_length=16)),
+                ('description', models.TextField(blank=True)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('published', models.BooleanField(default=True)),
+                ('content', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('content_hash', models.CharField(blank=True, max_length=32)),
+                ('bundle', models.BinaryField(default=b'')),
+                ('bundle_gzip', models.BinaryField(default=b'')),
+                ('bundle_brotli', models.BinaryField(null=True)),
+            ],
+            options={
+                'ordering': ['position', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='QuizQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('kind', models.CharField(choices=[('choice', 'Multiple choice'), ('rubric', 'Free text graded by rubric')], max_length=16)),
+                ('prompt', models.TextField()),
+                ('choices', models.JSONField(blank=True, default=list)),
+                ('answer_key', models.JSONField(default=dict)),
+                ('points', models.PositiveIntegerField(default=100)),
+                ('lesson', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='questions', to='courses.lesson')),
+            ],
+            options={
+                'ordering': ['lesson', 'position', 'id'],
+            },
+        ),
+    ]
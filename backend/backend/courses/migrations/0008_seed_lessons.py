@@ -0,0 +1,243 @@
+from django.db import migrations
+
+# The four lessons that used to exist only in the React pages (pages/Lesson1-4.jsx),
+# with the rubric each page used to grade its exercise.
+LESSONS = [
+    {
+        'id': 1,
+        'slug': 'prompt-fundamentals',
+        'title': 'Prompt Fundamentals',
+        'icon': '🎯',
+        'description': 'Learn how to write clear, effective prompts that get you better results.',
+        'question': {
+            'prompt': 'Rewrite the vague prompt "Help me with my essay" using WHO, WHAT, and HOW. Make it specific!',
+            'answer_key': {
+                'min_length': 20,
+                'too_short': 'Your prompt needs more detail. Aim for at least 50 characters with WHO, WHAT, and HOW elements.',
+                'pass_score': 70,
+                'criteria': [
+                    {
+                        'patterns': [r'you are|act as|as a|like a|pretend|role|expert|professional|advisor|coach'],
+                        'points': 30,
+                        'hit': '✅ Great! You defined the role (WHO)',
+                        'miss': '❌ Add a role like "You are an expert writing coach..."',
+                    },
+                    {
+                        'patterns': [r'help|write|create|make|explain|tell|describe|list|provide|give|show|teach'],
+                        'points': 30,
+                        'hit': '✅ Excellent! You stated your goal clearly (WHAT)',
+                        'miss': '❌ Specify what you need: "help me write...", "explain...", etc.',
+                    },
+                    {
+                        'patterns': [r'format|bullet|paragraph|step|list|example|specific|detail|concise|brief|structured'],
+                        'points': 25,
+                        'hit': '✅ Perfect! You specified the format (HOW)',
+                        'miss': '💡 Bonus: Add format details like "use bullet points" or "keep it concise"',
+                    },
+                    {
+                        'patterns': [r'essay|paper|writing|college|school|assignment'],
+                        'points': 10,
+                        'hit': '✅ Good! Your prompt is relevant to the exercise',
+                    },
+                    {
+                        'min_length': 51,
+                        'points': 5,
+                        'hit': '✅ Your prompt is nice and detailed!',
+                    },
+                ],
+            },
+        },
+    },
+    {
+        'id': 2,
+        'slug': 'adding-context',
+        'title': 'Adding Context',
+        'icon': '📝',
+        'description': 'Discover why context matters and how to provide it effectively.',
+        'question': {
+            'prompt': (
+                'Rewrite "Help me prepare for a job interview" by adding context about the role, your '
+                'background, what concerns you, and when the interview is.'
+            ),
+            'answer_key': {
+                'min_length': 30,
+                'too_short': 'Your prompt needs much more context. Aim for at least 100 characters with specific details.',
+                'pass_score': 70,
+                'criteria': [
+                    {
+                        'patterns': [r'interview|internship|position|role|job|software|engineer|marketing|design|analyst'],
+                        'points': 25,
+                        'hit': '✅ Great! You specified the job/role',
+                        'miss': "❌ Add details about what job or position you're interviewing for",
+                    },
+                    {
+                        'patterns': [r'student|major|experience|project|year|sophomore|junior|senior|graduated|degree'],
+                        'points': 25,
+                        'hit': '✅ Excellent! You included your background',
+                        'miss': '❌ Mention your education, experience, or relevant skills',
+                    },
+                    {
+                        'patterns': [r'nervous|worried|concern|help|prepare|practice|struggle|difficulty|weak|improve'],
+                        'points': 20,
+                        'hit': '✅ Good! You identified what concerns you',
+                        'miss': '❌ Share what specifically worries you or what you need help with',
+                    },
+                    {
+                        'patterns': [r'tomorrow|next week|monday|days|weeks|soon|upcoming|scheduled'],
+                        'points': 15,
+                        'hit': '✅ Nice! You mentioned when the interview is',
+                        'miss': '💡 Bonus tip: Adding a timeline helps AI prioritize your preparation',
+                    },
+                    {
+                        'min_length': 101,
+                        'points': 15,
+                        'hit': '✅ Your prompt is detailed and thorough!',
+                        'miss': '💡 Try adding more specific details to get even better advice',
+                    },
+                ],
+            },
+        },
+    },
+    {
+        'id': 3,
+        'slug': 'think-critically',
+        'title': 'Think Critically',
+        'icon': '🔍',
+        'description': 'Learn to spot AI mistakes and verify information properly.',
+        'question': {
+            'prompt': (
+                'An AI claims a 2023 Harvard study proved 5000mg of vitamin C daily cures the common cold, '
+                'prevents all cancer and has no side effects. Identify at least 3 problems with this response '
+                'and explain how you would verify the correct information.'
+            ),
+            'answer_key': {
+                'min_length': 50,
+                'too_short': "Try to identify at least 3 specific problems with the AI response and explain how you'd verify them.",
+                'pass_score': 70,
+                'criteria': [
+                    {
+                        'patterns': [r"unverifiable|can't verify|no source|citation|harvard|dr\.?\s*johnson|2023 study|fake|made up"],
+                        'points': 25,
+                        'hit': '✅ Great! You identified the unverifiable citation (the fake Harvard study)',
+                        'miss': '❌ Look for citations or sources that sound real but may be made up',
+                    },
+                    {
+                        'patterns': [r'absolute|cure|completely|all types|prevents all|no side effects|too strong|overstated|exaggerat|guarantee'],
+                        'points': 25,
+                        'hit': '✅ Excellent! You caught the absolute claims like "cure completely" or "prevents all cancer"',
+                        'miss': "❌ Watch for absolute statements - they're rarely accurate in health/science",
+                    },
+                    {
+                        'patterns': [r'5000|dosage|too much|too high|safe|toxic|maximum|excess|side effect'],
+                        'points': 20,
+                        'hit': '✅ Good! You noticed the concerning dosage claim (5000mg is very high)',
+                        'miss': '💡 The extremely high dosage and claim of "no side effects" are major red flags',
+                    },
+                    {
+                        'patterns': [r'verify|check|search|look up|consult|doctor|expert|medical|reliable source|official|research|pubmed|journal'],
+                        'points': 20,
+                        'hit': '✅ Perfect! You explained how to verify the information with reliable sources',
+                        'miss': '❌ Always explain HOW you would verify suspicious claims',
+                    },
+                    {
+                        'patterns': [r'medical|health|dangerous|misinformation|misleading|harmful|risky'],
+                        'min_length': 121,
+                        'points': 10,
+                        'hit': '✅ You showed strong critical thinking about medical misinformation',
+                    },
+                ],
+            },
+        },
+    },
+    {
+        'id': 4,
+        'slug': 'use-ai-ethically',
+        'title': 'Use AI Ethically',
+        'icon': '⚖️',
+        'description': 'Understand privacy, plagiarism, and responsible AI practices.',
+        'question': {
+            'prompt': (
+                'Alex submits an AI-written paper as his own, Sarah shares her medical and insurance details '
+                'with an AI, and Mike invests his savings on unchecked AI advice. For each scenario, identify the '
+                'ethical principle being violated and what could go wrong.'
+            ),
+            'answer_key': {
+                'min_length': 40,
+                'too_short': 'Try to identify at least 2-3 ethical concerns for each scenario.',
+                'pass_score': 70,
+                'criteria': [
+                    {
+                        'patterns': [r'privacy|personal|sensitive|data|private|confidential|ssn|medical|health|password'],
+                        'points': 25,
+                        'hit': '✅ Great! You identified privacy concerns',
+                        'miss': '❌ Consider privacy risks - sharing sensitive personal data with AI',
+                    },
+                    {
+                        'patterns': [r'plagiarism|cite|source|credit|attribution|copy|original|academic|integrity|cheating'],
+                        'points': 25,
+                        'hit': '✅ Excellent! You recognized plagiarism and attribution issues',
+                        'miss': '❌ Think about academic integrity and giving proper credit',
+                    },
+                    {
+                        'patterns': [
+                            r'bias|fair|diverse|perspective|stereotype|discriminat|represent',
+                            r'verify|check|fact|accuracy|responsibility|review|confirm',
+                        ],
+                        'points': 20,
+                        'hit': '✅ Good! You considered bias or verification responsibility',
+                        'miss': '💡 Remember to verify AI outputs and watch for bias',
+                    },
+                    {
+                        'patterns': [r'consent|permission|allow|authorized|appropriate'],
+                        'points': 15,
+                        'hit': '✅ Perfect! You thought about consent and appropriate use',
+                        'miss': '💡 Always consider if you have permission to share information',
+                    },
+                    {
+                        'min_length': 101,
+                        'points': 15,
+                        'hit': '✅ Your response shows thorough ethical thinking!',
+                    },
+                ],
+            },
+        },
+    },
+]
+
+
+def seed_lessons(apps, schema_editor):
+    Lesson = apps.get_model('courses', 'Lesson')
+    QuizQuestion = apps.get_model('courses', 'QuizQuestion')
+    for position, data in enumerate(LESSONS, start=1):
+        question = data['question']
+        lesson = Lesson.objects.create(
+            id=data['id'],
+            slug=data['slug'],
+            title=data['title'],
+            icon=data['icon'],
+            description=data['description'],
+            position=position,
+        )
+        QuizQuestion.objects.create(
+            lesson=lesson,
+            position=1,
+            kind='rubric',
+            prompt=question['prompt'],
+            answer_key=question['answer_key'],
+            points=100,
+        )
+
+
+def remove_lessons(apps, schema_editor):
+    apps.get_model('courses', 'Lesson').objects.filter(id__in=[data['id'] for data in LESSONS]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_lesson_quizquestion'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_lessons, remove_lessons),
+    ]
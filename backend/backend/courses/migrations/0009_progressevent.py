@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_seed_lessons'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgressEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('completion', 'Lesson completion'), ('baseline', 'Score baseline')], default='completion', max_length=16)),
+                ('lesson_id', models.IntegerField(null=True)),
+                ('score', models.IntegerField(default=0)),
+                ('occurred_at', models.DateTimeField()),
+                ('recorded_at', models.DateTimeField(auto_now_add=True)),
+                ('source', models.CharField(choices=[('update', 'update-progress'), ('batch', 'progress/batch'), ('grade', 'grade'), ('backfill', 'backfilled from the snapshot'), ('compaction', 'compact_progress')], max_length=16)),
+                ('applied', models.BooleanField(default=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'lesson_id', 'id'], name='progressevent_user_lesson'), models.Index(fields=['recorded_at'], name='progressevent_recorded_at')],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+from django.db import migrations
+from django.db.models import Sum
+from django.utils import timezone
+
+CHUNK_SIZE = 2000
+
+
+def backfill_events(apps, schema_editor):
+    """Seed the log from the existing snapshot so compact_progress reproduces it exactly"""
+    UserProgress = apps.get_model('courses', 'UserProgress')
+    LessonCompletion = apps.get_model('courses', 'LessonCompletion')
+    ProgressEvent = apps.get_model('courses', 'ProgressEvent')
+    now = timezone.now()
+
+    rows = UserProgress.objects.order_by('user_id').values_list('user_id', 'total_score', 'created_at')
+    chunk = []
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            _backfill_chunk(chunk, LessonCompletion, ProgressEvent, now)
+            chunk = []
+    if chunk:
+        _backfill_chunk(chunk, LessonCompletion, ProgressEvent, now)
+
+
+def _backfill_chunk(rows, LessonCompletion, ProgressEvent, now):
+    completions = LessonCompletion.objects.filter(user_id__in=[user_id for user_id, _, _ in rows])
+    events = [
+        ProgressEvent(
+            user_id=completion.user_id, lesson_id=completion.lesson_id, score=completion.score,
+            occurred_at=completion.completed_at, source='backfill',
+        )
+        for completion in completions
+    ]
+    latest_scores = dict(
+        completions.values('user_id').annotate(total=Sum('score')).values_list('user_id', 'total')
+    )
+    # total_score also counts earlier attempts that left no completion row
+    events += [
+        ProgressEvent(
+            user_id=user_id, kind='baseline', score=total_score - latest_scores.get(user_id, 0),
+            occurred_at=created_at or now, source='backfill',
+        )
+        for user_id, total_score, created_at in rows
+        if total_score != latest_scores.get(user_id, 0)
+    ]
+    ProgressEvent.objects.bulk_create(events)
+
+
+def remove_backfilled_events(apps, schema_editor):
+    apps.get_model('courses', 'ProgressEvent').objects.filter(source='backfill').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_progressevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_events, remove_backfilled_events),
+    ]
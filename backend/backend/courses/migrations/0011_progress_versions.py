@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_backfill_progress_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessoncompletion',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprogress',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -1,38 +1,234 @@
 from django.db import models
 from django.contrib.auth.models import User
-import json
 
 class UserProgress(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     lessons_completed = models.IntegerField(default=0)
     total_score = models.IntegerField(default=0)
-    completed_lesson_ids = models.TextField(default='[]')  # JSON array of completed lesson IDs
-    progress_data = models.TextField(default='{}')  # JSON object with detailed progress per lesson
     certification_earned = models.BooleanField(default=False)
     certification_date = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped by every write that changes the user's completions; the ?since= cursor
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user'], name='unique_user_progress'),
+        ]
+        indexes = [
+            models.Index(fields=['-total_score'], name='userprogress_total_score'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.lessons_completed} lessons"
 
     def get_completed_lessons(self):
-        """Return list of completed lesson IDs"""
-        try:
-            return json.loads(self.completed_lesson_ids)
-        except:
-            return []
-
-    def set_completed_lessons(self, lesson_ids):
-        """Set completed lesson IDs"""
-        self.completed_lesson_ids = json.dumps(lesson_ids)
+        """Return sorted list of completed lesson IDs"""
+        return list(
+            LessonCompletion.objects.filter(user_id=self.user_id)
+            .order_by('lesson_id')
+            .values_list('lesson_id', flat=True)
+        )
 
     def get_progress_data(self):
-        """Return progress data as dictionary"""
-        try:
-            return json.loads(self.progress_data)
-        except:
-            return {}
-
-    def set_progress_data(self, data):
-        """Set progress data"""
-        self.progress_data = json.dumps(data)
+        """Return progress data as dictionary keyed by lesson ID"""
+        return {
+            str(completion.lesson_id): completion.as_progress_entry()
+            for completion in LessonCompletion.objects.filter(user_id=self.user_id)
+        }
+
+
+class LessonCompletion(models.Model):
+    """One row per (user, lesson) the user has completed"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lesson_completions')
+    lesson_id = models.IntegerField()
+    score = models.IntegerField(default=0)
+    completed_at = models.DateTimeField()
+    # UserProgress.version of the write that last changed this row
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'lesson_id'], name='unique_lesson_completion'),
+        ]
+        indexes = [
+            models.Index(fields=['lesson_id', 'score'], name='lessoncompletion_lesson_score'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - lesson {self.lesson_id}"
+
+    def as_progress_entry(self):
+        """Return the per-lesson dict used in the progress API response"""
+        return {
+            'score': self.score,
+            'completed': True,
+            'completed_at': self.completed_at.isoformat(),
+        }
+
+
+class IdempotencyKey(models.Model):
+    """Response of an already-applied progress submission, replayed for duplicate POSTs"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=64)
+    response = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.key}"
+
+
+class ProgressEvent(models.Model):
+    """Append-only log of every progress submission.
+
+    UserProgress and LessonCompletion are a snapshot of this log, kept up to
+    date by the write path and rebuilt from it by ``manage.py compact_progress``.
+    """
+    COMPLETION = 'completion'
+    BASELINE = 'baseline'
+    KIND_CHOICES = [
+        (COMPLETION, 'Lesson completion'),
+        # Score carried over from events that predate the log or were compacted away
+        (BASELINE, 'Score baseline'),
+    ]
+
+    UPDATE = 'update'
+    BATCH = 'batch'
+    GRADE = 'grade'
+    BACKFILL = 'backfill'
+    COMPACTION = 'compaction'
+    SOURCE_CHOICES = [
+        (UPDATE, 'update-progress'),
+        (BATCH, 'progress/batch'),
+        (GRADE, 'grade'),
+        (BACKFILL, 'backfilled from the snapshot'),
+        (COMPACTION, 'compact_progress'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='progress_events')
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES, default=COMPLETION)
+    lesson_id = models.IntegerField(null=True)
+    score = models.IntegerField(default=0)
+    # When the learner finished (the client's clock for offline batches)
+    occurred_at = models.DateTimeField()
+    recorded_at = models.DateTimeField(auto_now_add=True)
+    source = models.CharField(max_length=16, choices=SOURCE_CHOICES)
+    # False when a newer completion of the lesson was already recorded
+    applied = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'lesson_id', 'id'], name='progressevent_user_lesson'),
+            models.Index(fields=['recorded_at'], name='progressevent_recorded_at'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.kind} {self.lesson_id} ({self.score})"
+
+
+# Aggregates below are maintained incrementally by courses.stats so that
+# leaderboard and funnel reads never scan UserProgress.
+
+class LessonStats(models.Model):
+    """Number of learners who have completed each lesson"""
+    lesson_id = models.IntegerField(unique=True)
+    completions = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"lesson {self.lesson_id} - {self.completions} completions"
+
+
+class ScoreBucket(models.Model):
+    """Number of learners at each total_score, used to compute ranks"""
+    score = models.IntegerField(unique=True)
+    learners = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.score} points - {self.learners} learners"
+
+
+class CohortStats(models.Model):
+    """Single-row totals across all learners"""
+    learners = models.IntegerField(default=0)
+    certified = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.learners} learners - {self.certified} certified"
+
+
+class LearningTopic(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    description = models.TextField(blank=True)
+    difficulty_level = models.IntegerField(default=1)
+
+    def __str__(self):
+        return self.name
+
+
+class TopicProgress(models.Model):
+    """Per-topic scores driving the adaptive difficulty of the next lesson"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='topic_progress')
+    topic = models.ForeignKey(LearningTopic, on_delete=models.CASCADE, related_name='progress')
+    lessons_completed = models.IntegerField(default=0)
+    average_score = models.FloatField(default=0)
+    current_difficulty = models.IntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'topic'], name='unique_topic_progress'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.topic_id} (difficulty {self.current_difficulty})"
+
+
+class Lesson(models.Model):
+    """A lesson in the catalog; ``id`` is the lesson_id used by progress rows"""
+    id = models.PositiveIntegerField(primary_key=True)
+    slug = models.SlugField(unique=True)
+    title = models.CharField(max_length=200)
+    icon = models.CharField(max_length=16, blank=True)
+    description = models.TextField(blank=True)
+    position = models.PositiveIntegerField(default=0)
+    published = models.BooleanField(default=True)
+    content = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Precompiled bundle (see courses.lessons); rebuilt whenever the lesson or its questions change
+    content_hash = models.CharField(max_length=32, blank=True)
+    bundle = models.BinaryField(default=b'', editable=False)
+    bundle_gzip = models.BinaryField(default=b'', editable=False)
+    bundle_brotli = models.BinaryField(null=True, editable=False)
+
+    class Meta:
+        ordering = ['position', 'id']
+
+    def __str__(self):
+        return f"{self.id}. {self.title}"
+
+
+class QuizQuestion(models.Model):
+    """An exercise in a lesson. ``answer_key`` stays on the server and is never bundled."""
+    CHOICE = 'choice'
+    RUBRIC = 'rubric'
+    KIND_CHOICES = [(CHOICE, 'Multiple choice'), (RUBRIC, 'Free text graded by rubric')]
+
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='questions')
+    position = models.PositiveIntegerField(default=0)
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    prompt = models.TextField()
+    choices = models.JSONField(default=list, blank=True)
+    answer_key = models.JSONField(default=dict)
+    points = models.PositiveIntegerField(default=100)
+
+    class Meta:
+        ordering = ['lesson', 'position', 'id']
+
+    def __str__(self):
+        return f"lesson {self.lesson_id} - question {self.position}"
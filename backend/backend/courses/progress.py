@@ -0,0 +1,353 @@
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import certification, live, stats
+from .cache import invalidate_progress
+from .models import IdempotencyKey, LessonCompletion, ProgressEvent, UserProgress
+
+MAX_BATCH_EVENTS = 500
+CLIENT_SCORES_DISABLED = 'Scores are graded on the server: submit answers to /api/grade/'
+PROGRESS_FIELDS = (
+    'completed_lessons', 'progress', 'total_lessons', 'total_score', 'certification_earned', 'certification_date',
+    'cursor',
+)
+
+
+def build_progress_payload(user):
+    """Return ``(payload, versions)``: the /api/progress/ body and {lesson_id: version}"""
+    progress, _ = UserProgress.objects.get_or_create(user=user)
+    completions = LessonCompletion.objects.filter(user=user).order_by('lesson_id')
+    return _render_payload(progress, completions)
+
+
+async def abuild_progress_payload(user):
+    """Async build_progress_payload() for the async views"""
+    progress, _ = await UserProgress.objects.aget_or_create(user=user)
+    completions = [c async for c in LessonCompletion.objects.filter(user=user).order_by('lesson_id')]
+    return _render_payload(progress, completions)
+
+
+def _render_payload(progress, completions):
+    payload = {
+        'completed_lessons': [c.lesson_id for c in completions],
+        'progress': {str(c.lesson_id): c.as_progress_entry() for c in completions},
+        'total_lessons': progress.lessons_completed,
+        'total_score': progress.total_score,
+        # A certification can lapse between writes, so check expiry on read too
+        'certification_earned': certification.is_active(progress, timezone.now()),
+        'certification_date': progress.certification_date.isoformat() if progress.certification_date else None,
+        'cursor': progress.version,
+    }
+    return payload, {str(c.lesson_id): c.version for c in completions}
+
+
+def parse_progress_query(params):
+    """Validate ``?since=`` and ``?fields=``.
+
+    Returns ``((since, fields), None)`` or ``(None, error)``; either may be
+    None when not given.
+    """
+    since = params.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return None, 'since must be a cursor from an earlier response'
+        if since < 0:
+            return None, 'since must be a cursor from an earlier response'
+    fields = params.get('fields')
+    if fields is not None:
+        fields = tuple(sorted({name.strip() for name in fields.split(',') if name.strip()}))
+        unknown = [name for name in fields if name not in PROGRESS_FIELDS]
+        if unknown or not fields:
+            return None, f'fields must be a comma-separated subset of: {", ".join(PROGRESS_FIELDS)}'
+    return (since, fields), None
+
+
+def select_progress(payload, versions, etag, since=None, fields=None):
+    """Narrow a full progress payload to the lessons changed after ``since`` and to ``fields``.
+
+    Returns ``(body, etag)``. The body is derived from the cached payload
+    without queries. Its ETag extends the full payload's, so it still changes
+    exactly when the underlying progress does. With ``since``, ``delta`` says
+    whether ``progress`` holds only the changed lessons; a cursor this server
+    never issued gets the full payload. ``completed_lessons`` stays the full
+    list in a delta, so clients can also drop lessons that were removed.
+    """
+    if since is None and fields is None:
+        return payload, etag
+    body = dict(payload)
+    if since is not None:
+        body['delta'] = since <= payload['cursor']
+        if body['delta']:
+            body['progress'] = {
+                lesson_id: entry for lesson_id, entry in payload['progress'].items() if versions[lesson_id] > since
+            }
+    if fields is not None:
+        body = {name: value for name, value in body.items() if name in fields or name == 'delta'}
+    variant = hashlib.blake2b(f'{since}|{",".join(fields or ())}'.encode(), digest_size=4).hexdigest()
+    return body, f'{etag[:-1]}-{variant}"'
+
+
+def lock_progress(user):
+    """Return the user's UserProgress row, locked for the rest of the transaction"""
+    progress, _ = UserProgress.objects.select_for_update().get_or_create(user=user)
+    return progress
+
+
+def record_completion(progress, lesson_id, score, source=ProgressEvent.UPDATE):
+    """Log one lesson completion, upsert it into the snapshot and bump the user's counters.
+
+    Must run inside transaction.atomic() with ``progress`` obtained from
+    lock_progress(), so concurrent submissions for the same user serialize
+    on the progress row instead of losing updates.
+    """
+    now = timezone.now()
+    ProgressEvent.objects.create(
+        user_id=progress.user_id, lesson_id=lesson_id, score=score, occurred_at=now, source=source
+    )
+    version = progress.version + 1
+    completion = LessonCompletion(
+        user_id=progress.user_id, lesson_id=lesson_id, score=score, completed_at=now, version=version
+    )
+    existing = LessonCompletion.objects.filter(user_id=progress.user_id, lesson_id=lesson_id)
+    old_score = existing.values_list('score', flat=True).first()
+    if old_score is None:
+        completion.save(force_insert=True)
+        _bump_counters(progress, [completion], new_lesson_ids=[lesson_id], score_delta=score, now=now)
+    else:
+        # A lesson counts once, with its best score: a weaker retake can't lower the total
+        existing.update(score=Greatest('score', Value(score)), completed_at=now, version=version)
+        completion.score = max(score, old_score)
+        _bump_counters(progress, [completion], new_lesson_ids=[], score_delta=completion.score - old_score, now=now)
+    return progress
+
+
+def all_lessons_completed(progress):
+    """Whether the learner has completed every lesson certification requires"""
+    # _bump_counters() has already looked this up for a progress row it just updated
+    completed = getattr(progress, 'required_lessons_completed', None)
+    if completed is not None:
+        return completed
+    rules = certification.get_rules()
+    if not rules.required_lessons or progress.lessons_completed < len(rules.required_lessons):
+        return False
+    completions = certification.required_completions(rules, [progress.user_id])[progress.user_id]
+    return rules.all_completed(completions)
+
+
+def parse_update(data, headers, known_lessons):
+    """Validate an update_progress body against the ids in ``known_lessons``.
+
+    Returns ``((lesson_id, score, idempotency_key), None)`` or ``(None, error)``.
+    """
+    lesson_id = data.get('lesson_id')
+    score = data.get('score', 0)
+    idempotency_key = headers.get('Idempotency-Key') or data.get('idempotency_key')
+
+    if lesson_id is None:
+        return None, 'lesson_id is required'
+    try:
+        lesson_id = int(lesson_id)
+    except (TypeError, ValueError):
+        return None, 'lesson_id must be an integer'
+    if lesson_id not in known_lessons:
+        return None, 'Unknown lesson_id'
+    try:
+        score = int(score)
+    except (TypeError, ValueError):
+        return None, 'score must be an integer'
+    if idempotency_key is not None and not 0 < len(str(idempotency_key)) <= 64:
+        return None, 'idempotency_key must be 1-64 characters'
+    return (lesson_id, score, idempotency_key), None
+
+
+def stored_response(user, idempotency_key):
+    """Return the response recorded for an idempotency key, or None"""
+    return IdempotencyKey.objects.filter(user=user, key=idempotency_key).values_list('response', flat=True).first()
+
+
+async def astored_response(user, idempotency_key):
+    return await IdempotencyKey.objects.filter(user=user, key=idempotency_key).values_list('response', flat=True).afirst()
+
+
+def submit_completion(user, lesson_id, score, idempotency_key=None, source=ProgressEvent.UPDATE):
+    """Record one lesson completion atomically and return the response body.
+
+    With an idempotency key, the first response is stored with the write and
+    any later submission carrying the same key gets it back unchanged.
+    """
+    try:
+        with transaction.atomic():
+            progress = lock_progress(user)
+            # Re-check under the row lock in case a concurrent duplicate just committed
+            if idempotency_key:
+                replay = stored_response(user, idempotency_key)
+                if replay is not None:
+                    return replay
+
+            progress = record_completion(progress, lesson_id, score, source)
+            response_data = {
+                'message': 'Progress updated',
+                'certification_earned': progress.certification_earned,
+                'all_lessons_completed': all_lessons_completed(progress),
+            }
+            if idempotency_key:
+                IdempotencyKey.objects.create(user=user, key=idempotency_key, response=response_data)
+    except IntegrityError:
+        # Lost the race against a duplicate submission carrying the same key
+        replay = stored_response(user, idempotency_key) if idempotency_key else None
+        if replay is None:
+            raise
+        return replay
+    return response_data
+
+
+def parse_batch_events(events, known_lessons):
+    """Validate a list of ``{lesson_id, score, client_ts}`` dicts.
+
+    Returns ``(parsed, errors)`` where ``parsed`` is a list of
+    ``(lesson_id, score, client_ts)`` tuples and ``errors`` maps the index
+    of each invalid event to a message.
+    """
+    parsed = []
+    errors = {}
+    for index, event in enumerate(events):
+        if not isinstance(event, dict):
+            errors[index] = 'event must be an object'
+            continue
+        try:
+            lesson_id = int(event['lesson_id'])
+            score = int(event.get('score', 0))
+        except (KeyError, TypeError, ValueError):
+            errors[index] = 'lesson_id and score must be integers'
+            continue
+        if lesson_id not in known_lessons:
+            errors[index] = 'unknown lesson_id'
+            continue
+        client_ts = _parse_client_ts(event.get('client_ts'))
+        if client_ts is None:
+            errors[index] = 'client_ts must be an ISO 8601 string or epoch milliseconds'
+            continue
+        parsed.append((lesson_id, score, client_ts))
+    return parsed, errors
+
+
+def record_batch(progress, events, source=ProgressEvent.BATCH):
+    """Apply parsed batch events for one user with last-write-wins by timestamp.
+
+    For each lesson only the newest event is kept, and it is applied only if
+    it is newer than the stored completion; the lesson keeps the better of
+    the two scores. Every event goes into the log (the losers marked as not
+    applied), and all winners are written with a single upsert plus one
+    UserProgress update. Must run inside
+    transaction.atomic() with ``progress`` obtained from lock_progress().
+
+    Returns ``(applied, stale)`` event counts.
+    """
+    now = timezone.now()
+    # Clamp clock-skewed clients so a future timestamp can't pin a lesson forever
+    events = [(lesson_id, score, min(client_ts, now)) for lesson_id, score, client_ts in events]
+    latest = {}
+    winner_index = {}
+    for index, (lesson_id, score, client_ts) in enumerate(events):
+        if lesson_id not in latest or client_ts >= latest[lesson_id][1]:
+            latest[lesson_id] = (score, client_ts)
+            winner_index[lesson_id] = index
+
+    existing = {
+        lesson_id: (completed_at, score)
+        for lesson_id, completed_at, score in LessonCompletion.objects.filter(
+            user_id=progress.user_id, lesson_id__in=latest
+        ).values_list('lesson_id', 'completed_at', 'score')
+    }
+    winners = [
+        LessonCompletion(
+            user_id=progress.user_id, lesson_id=lesson_id, score=max(score, existing.get(lesson_id, (None, 0))[1]),
+            completed_at=client_ts, version=progress.version + 1,
+        )
+        for lesson_id, (score, client_ts) in sorted(latest.items())
+        if lesson_id not in existing or client_ts > existing[lesson_id][0]
+    ]
+
+    applied = {winner_index[completion.lesson_id] for completion in winners}
+    ProgressEvent.objects.bulk_create([
+        ProgressEvent(
+            user_id=progress.user_id, lesson_id=lesson_id, score=score, occurred_at=client_ts,
+            source=source, applied=index in applied,
+        )
+        for index, (lesson_id, score, client_ts) in enumerate(events)
+    ])
+
+    if winners:
+        LessonCompletion.objects.bulk_create(
+            winners,
+            update_conflicts=True,
+            unique_fields=['user', 'lesson_id'],
+            update_fields=['score', 'completed_at', 'version'],
+        )
+        new_lesson_ids = [c.lesson_id for c in winners if c.lesson_id not in existing]
+        # Re-completed lessons keep their best score and only move the total by its gain
+        score_delta = sum(c.score - existing.get(c.lesson_id, (None, 0))[1] for c in winners)
+        _bump_counters(progress, winners, new_lesson_ids, score_delta, now)
+
+    return len(winners), len(events) - len(winners)
+
+
+def _bump_counters(progress, changed, new_lesson_ids, score_delta, now):
+    old_score = progress.total_score
+    changes = {'total_score': F('total_score') + score_delta, 'version': F('version') + 1}
+    progress.total_score += score_delta
+    progress.version += 1
+    if new_lesson_ids:
+        changes['lessons_completed'] = F('lessons_completed') + len(new_lesson_ids)
+        progress.lessons_completed += len(new_lesson_ids)
+    was_certified = progress.certification_earned
+    rules = certification.get_rules()
+    progress.required_lessons_completed = False
+    # Certification needs every required lesson, so skip the lookup until then
+    if progress.lessons_completed >= len(rules.required_lessons) or was_certified:
+        completions = certification.required_completions(rules, [progress.user_id])[progress.user_id]
+        progress.required_lessons_completed = rules.all_completed(completions)
+        earned, certified_at = rules.evaluate(
+            completions, progress.certification_earned, progress.certification_date, now
+        )
+        if (earned, certified_at) != (progress.certification_earned, progress.certification_date):
+            changes['certification_earned'] = progress.certification_earned = earned
+            changes['certification_date'] = progress.certification_date = certified_at
+    UserProgress.objects.filter(pk=progress.pk).update(**changes)
+
+    stats.score_changed(old_score, progress.total_score)
+    stats.lessons_completed(new_lesson_ids)
+    if progress.certification_earned != was_certified:
+        stats.certifications_changed(1 if progress.certification_earned else -1)
+    transaction.on_commit(partial(invalidate_progress, progress.user_id, progress.version))
+    # Publishing must not fail a write that has already committed
+    events = live.progress_events(progress, changed, progress.certification_earned != was_certified)
+    transaction.on_commit(partial(live.publish, progress.user_id, events), robust=True)
+
+
+def _parse_client_ts(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        try:
+            return datetime.fromtimestamp(value / 1000, tz=dt_timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            return None
+    if isinstance(value, str):
+        try:
+            parsed = parse_datetime(value)
+        except ValueError:
+            return None
+        if parsed is not None and timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed, dt_timezone.utc)
+        return parsed
+    return None
@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import lessons, stats
+from .models import Lesson, LessonCompletion, QuizQuestion, UserProgress
+
+
+@receiver(post_save, sender=UserProgress)
+def count_new_learner(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.learners_added(score=instance.total_score)
+
+
+@receiver(post_delete, sender=UserProgress)
+def uncount_learner(sender, instance, **kwargs):
+    stats.learner_removed(instance.total_score, instance.certification_earned)
+
+
+@receiver(post_delete, sender=LessonCompletion)
+def uncount_completion(sender, instance, **kwargs):
+    stats.lessons_completed([instance.lesson_id], delta=-1)
+
+
+@receiver(post_save, sender=Lesson)
+def compile_saved_lesson(sender, instance, raw=False, **kwargs):
+    if not raw:
+        lessons.compile_lesson(instance)
+        transaction.on_commit(lessons.invalidate_catalog)
+
+
+@receiver(post_delete, sender=Lesson)
+def drop_deleted_lesson(sender, instance, **kwargs):
+    transaction.on_commit(lessons.invalidate_catalog)
+
+
+@receiver(post_save, sender=QuizQuestion)
+@receiver(post_delete, sender=QuizQuestion)
+def recompile_question_lesson(sender, instance, raw=False, **kwargs):
+    lesson = Lesson.objects.filter(pk=instance.lesson_id).first()
+    # The lesson is already gone when its questions are cascade-deleted
+    if not raw and lesson is not None:
+        lessons.compile_lesson(lesson)
+        transaction.on_commit(lessons.invalidate_catalog)
@@ -0,0 +1,138 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import CohortStats, LessonCompletion, LessonStats, ScoreBucket, UserProgress
+
+COHORT_PK = 1
+
+
+def _increment(model, lookup, **deltas):
+    """Add ``deltas`` to the row matching ``lookup``, creating it if missing"""
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Someone else created the row between our UPDATE and INSERT
+        model.objects.filter(**lookup).update(**changes)
+
+
+def learners_added(count=1, score=0):
+    _increment(CohortStats, {'pk': COHORT_PK}, learners=count)
+    _increment(ScoreBucket, {'score': score}, learners=count)
+
+
+def learner_removed(score, certified):
+    _increment(CohortStats, {'pk': COHORT_PK}, learners=-1, certified=-1 if certified else 0)
+    _increment(ScoreBucket, {'score': score}, learners=-1)
+
+
+def learners_removed_in_bulk(progress_rows, lesson_ids):
+    """Uncount deleted UserProgress rows and their completed lessons, for deletes that skip the signals"""
+    if progress_rows:
+        certified = sum(1 for progress in progress_rows if progress.certification_earned)
+        _increment(CohortStats, {'pk': COHORT_PK}, learners=-len(progress_rows), certified=-certified)
+        for score, count in Counter(progress.total_score for progress in progress_rows).items():
+            _increment(ScoreBucket, {'score': score}, learners=-count)
+    for lesson_id, count in Counter(lesson_ids).items():
+        _increment(LessonStats, {'lesson_id': lesson_id}, completions=-count)
+
+
+def score_changed(old_score, new_score):
+    if old_score != new_score:
+        _increment(ScoreBucket, {'score': old_score}, learners=-1)
+        _increment(ScoreBucket, {'score': new_score}, learners=1)
+
+
+def lessons_completed(lesson_ids, delta=1):
+    lesson_ids = set(lesson_ids)
+    if not lesson_ids:
+        return
+    changes = {'completions': F('completions') + delta}
+    updated = LessonStats.objects.filter(lesson_id__in=lesson_ids).update(**changes)
+    if updated < len(lesson_ids):
+        # First completion of some lesson: create the missing rows
+        existing = set(LessonStats.objects.filter(lesson_id__in=lesson_ids).values_list('lesson_id', flat=True))
+        for lesson_id in lesson_ids - existing:
+            _increment(LessonStats, {'lesson_id': lesson_id}, completions=delta)
+
+
+def certifications_changed(delta):
+    """Adjust the certified count by ``delta`` (negative when certifications lapse)"""
+    if delta:
+        _increment(CohortStats, {'pk': COHORT_PK}, certified=delta)
+
+
+def rank_for_score(score):
+    """Competition rank (1 = best) of a total_score, in O(distinct scores)"""
+    above = ScoreBucket.objects.filter(score__gt=score).aggregate(total=Sum('learners'))['total']
+    return (above or 0) + 1
+
+
+def leaderboard(limit):
+    """Return the top ``limit`` learners by total_score with their ranks"""
+    top = (
+        UserProgress.objects.select_related('user')
+        .order_by('-total_score', 'pk')
+        .only('total_score', 'lessons_completed', 'user__username')[:limit]
+    )
+    leaders = []
+    for position, progress in enumerate(top, start=1):
+        # Ties share the rank of the first learner with that score
+        if leaders and leaders[-1]['total_score'] == progress.total_score:
+            rank = leaders[-1]['rank']
+        else:
+            rank = position
+        leaders.append({
+            'rank': rank,
+            'username': progress.user.username,
+            'total_score': progress.total_score,
+            'lessons_completed': progress.lessons_completed,
+        })
+    return leaders
+
+
+def funnel():
+    """Return completion counts per lesson and the certification rate"""
+    cohort = CohortStats.objects.filter(pk=COHORT_PK).first() or CohortStats(learners=0, certified=0)
+    learners = max(cohort.learners, 0)
+
+    def rate(count):
+        return round(count / learners, 4) if learners else 0.0
+
+    return {
+        'learners': learners,
+        'lessons': [
+            {
+                'lesson_id': stats.lesson_id,
+                'completions': stats.completions,
+                'completion_rate': rate(stats.completions),
+            }
+            for stats in LessonStats.objects.order_by('lesson_id')
+        ],
+        'certified': cohort.certified,
+        'certification_rate': rate(cohort.certified),
+    }
+
+
+@transaction.atomic
+def rebuild():
+    """Recompute every aggregate from UserProgress and LessonCompletion"""
+    LessonStats.objects.all().delete()
+    LessonStats.objects.bulk_create(
+        LessonStats(lesson_id=row['lesson_id'], completions=row['n'])
+        for row in LessonCompletion.objects.values('lesson_id').annotate(n=Count('pk'))
+    )
+    ScoreBucket.objects.all().delete()
+    ScoreBucket.objects.bulk_create(
+        ScoreBucket(score=row['total_score'], learners=row['n'])
+        for row in UserProgress.objects.values('total_score').annotate(n=Count('pk'))
+    )
+    CohortStats.objects.update_or_create(pk=COHORT_PK, defaults={
+        'learners': UserProgress.objects.count(),
+        'certified': UserProgress.objects.filter(certification_earned=True).count(),
+    })
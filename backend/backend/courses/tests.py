@@ -1,3 +1,1061 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import json
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+import brotli
+from asgiref.sync import SyncToAsync, ThreadSensitiveContext, sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ai_literacy_backend.pubsub import get_hub
+from . import analytics, async_views, grading, stats
+from .benchmarks import QUERY_BUDGETS
+from .cache import get_cached_progress, load_progress
+from .certification import CertificationRules
+from .models import Lesson, LessonCompletion, ProgressEvent, QuizQuestion, UserProgress
+from .progress import build_progress_payload, submit_completion
+
+
+class ProgressAPITests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='learner', password='pw-12345')
+        UserProgress.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def post_progress(self, lesson_id, score):
+        return self.client.post(
+            '/api/update-progress/',
+            {'lesson_id': lesson_id, 'score': score},
+            content_type='application/json',
+        )
+
+    def test_get_progress_response_shape(self):
+        self.post_progress(2, 80)
+        self.post_progress(1, 100)
+
+        data = self.client.get('/api/progress/').json()
+
+        self.assertEqual(data['completed_lessons'], [1, 2])
+        self.assertEqual(set(data['progress']), {'1', '2'})
+        self.assertEqual(data['progress']['2']['score'], 80)
+        self.assertTrue(data['progress']['2']['completed'])
+        self.assertIn('completed_at', data['progress']['2'])
+        self.assertEqual(data['total_lessons'], 2)
+        self.assertEqual(data['total_score'], 180)
+        self.assertFalse(data['certification_earned'])
+
+    def test_repeat_completion_upserts_single_row(self):
+        self.post_progress(1, 50)
+        self.post_progress(1, 90)
+
+        completion = LessonCompletion.objects.get(user=self.user, lesson_id=1)
+        self.assertEqual(completion.score, 90)
+        self.assertEqual(UserProgress.objects.get(user=self.user).lessons_completed, 1)
+
+    def test_all_lessons_award_certification(self):
+        for lesson_id in (1, 2, 3, 4):
+            response = self.post_progress(lesson_id, 100)
+
+        self.assertTrue(response.json()['certification_earned'])
+        self.assertTrue(response.json()['all_lessons_completed'])
+
+    def test_all_lessons_completed_follows_the_certification_rules(self):
+        with self.settings(CERTIFICATION_RULES={'required_lessons': [1, 2]}):
+            self.assertFalse(self.post_progress(1, 100).json()['all_lessons_completed'])
+            self.assertTrue(self.post_progress(2, 100).json()['all_lessons_completed'])
+
+    def test_non_required_lessons_do_not_complete_the_course(self):
+        with self.settings(CERTIFICATION_RULES={'required_lessons': [1, 2, 3]}):
+            for lesson_id in (1, 2, 4):
+                data = self.post_progress(lesson_id, 100).json()
+            self.assertEqual((data['all_lessons_completed'], data['certification_earned']), (False, False))
+
+            # A batch of stale events records nothing, so the answer comes from the database
+            data = self.client.post('/api/progress/batch/', {'events': [
+                {'lesson_id': 4, 'score': 50, 'client_ts': '2020-01-01T00:00:00Z'},
+            ]}, content_type='application/json').json()
+            self.assertEqual((data['stale'], data['all_lessons_completed']), (1, False))
+
+            data = self.post_progress(3, 100).json()
+            self.assertEqual((data['all_lessons_completed'], data['certification_earned']), (True, True))
+
+    def test_replayed_idempotency_key_is_a_no_op(self):
+        for _ in range(3):
+            response = self.client.post(
+                '/api/update-progress/',
+                {'lesson_id': 1, 'score': 40},
+                content_type='application/json',
+                HTTP_IDEMPOTENCY_KEY='attempt-1',
+            )
+            self.assertEqual(response.status_code, 200)
+
+        progress = UserProgress.objects.get(user=self.user)
+        self.assertEqual(progress.total_score, 40)
+        self.assertEqual(progress.lessons_completed, 1)
+
+    def test_invalid_score_is_rejected(self):
+        response = self.post_progress(1, 'lots')
+        self.assertEqual(response.status_code, 400)
+
+
+class BatchProgressTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='offline', password='pw-12345')
+        self.client.force_login(self.user)
+
+    def post_batch(self, events):
+        return self.client.post('/api/progress/batch/', {'events': events}, content_type='application/json')
+
+    def test_batch_applies_latest_event_per_lesson(self):
+        response = self.post_batch([
+            {'lesson_id': 1, 'score': 40, 'client_ts': '2025-10-25T10:00:00Z'},
+            {'lesson_id': 1, 'score': 90, 'client_ts': '2025-10-25T11:00:00Z'},
+            {'lesson_id': 2, 'score': 70, 'client_ts': 1761390000000},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['applied'], 2)
+        self.assertEqual(response.json()['stale'], 1)
+        self.assertEqual(LessonCompletion.objects.get(user=self.user, lesson_id=1).score, 90)
+        progress = UserProgress.objects.get(user=self.user)
+        self.assertEqual(progress.lessons_completed, 2)
+        self.assertEqual(progress.total_score, 160)
+
+    def test_older_events_lose_to_stored_completion(self):
+        self.post_batch([{'lesson_id': 1, 'score': 90, 'client_ts': '2025-10-25T11:00:00Z'}])
+        response = self.post_batch([{'lesson_id': 1, 'score': 10, 'client_ts': '2025-10-25T09:00:00Z'}])
+
+        self.assertEqual(response.json()['applied'], 0)
+        self.assertEqual(LessonCompletion.objects.get(user=self.user, lesson_id=1).score, 90)
+        self.assertEqual(UserProgress.objects.get(user=self.user).total_score, 90)
+
+    def test_invalid_events_reject_the_batch(self):
+        response = self.post_batch([
+            {'lesson_id': 1, 'score': 90, 'client_ts': '2025-10-25T11:00:00Z'},
+            {'lesson_id': 'x', 'score': 90, 'client_ts': 'yesterday'},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('1', response.json()['events'])
+        self.assertFalse(LessonCompletion.objects.filter(user=self.user).exists())
+
+
+class ProgressCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cached', password='pw-12345')
+        UserProgress.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def test_cache_hit_skips_progress_queries(self):
+        self.client.get('/api/progress/')
+        # Session and user come from the cache too: a warm read touches no table
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/progress/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_unchanged_progress_returns_304(self):
+        etag = self.client.get('/api/progress/')['ETag']
+
+        response = self.client.get('/api/progress/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_concurrent_misses_share_one_build(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            time.sleep(0.1)
+            return {'completed_lessons': []}, {}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(load_progress(self.user.id, build))) for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(len(set(etag for _, etag, _ in results)), 1)
+        self.assertEqual(get_cached_progress(self.user.id), results[0])
+
+    def test_build_older_than_a_write_is_not_served(self):
+        def stale_build():
+            built = build_progress_payload(self.user)
+            # A write commits while the build is still in flight
+            with self.captureOnCommitCallbacks(execute=True):
+                submit_completion(self.user, 1, 100)
+            return built
+
+        payload, _, _ = load_progress(self.user.id, stale_build)
+
+        self.assertEqual(payload['completed_lessons'], [])
+        self.assertIsNone(get_cached_progress(self.user.id))
+        self.assertEqual(self.client.get('/api/progress/').json()['completed_lessons'], [1])
+        self.assertIsNotNone(get_cached_progress(self.user.id))
+
+    def test_update_invalidates_cached_payload(self):
+        etag = self.client.get('/api/progress/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                '/api/update-progress/', {'lesson_id': 1, 'score': 100}, content_type='application/json'
+            )
+
+        response = self.client.get('/api/progress/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['completed_lessons'], [1])
+
+
+class DeltaReadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='delta', password='pw-12345')
+        UserProgress.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def complete(self, lesson_id, score):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                '/api/update-progress/', {'lesson_id': lesson_id, 'score': score}, content_type='application/json'
+            )
+
+    def test_since_returns_only_lessons_changed_after_the_cursor(self):
+        self.complete(1, 80)
+        self.complete(2, 70)
+        cursor = self.client.get('/api/progress/').json()['cursor']
+        self.complete(3, 90)
+        self.complete(1, 95)
+
+        self.client.get('/api/progress/')
+        with self.assertNumQueries(0):
+            body = self.client.get(f'/api/progress/?since={cursor}').json()
+
+        self.assertTrue(body['delta'])
+        self.assertEqual(set(body['progress']), {'1', '3'})
+        self.assertEqual(body['progress']['1']['score'], 95)
+        self.assertEqual(body['completed_lessons'], [1, 2, 3])
+        self.assertEqual(body['total_score'], 255)
+        self.assertEqual(body['cursor'], cursor + 2)
+        self.assertEqual(self.client.get(f'/api/progress/?since={body["cursor"]}').json()['progress'], {})
+
+    def test_unknown_cursor_gets_the_full_payload(self):
+        self.complete(1, 80)
+
+        body = self.client.get('/api/progress/?since=999').json()
+
+        self.assertFalse(body['delta'])
+        self.assertEqual(set(body['progress']), {'1'})
+
+    def test_fields_selects_top_level_keys(self):
+        self.complete(1, 80)
+
+        body = self.client.get('/api/progress/?fields=total_score,cursor').json()
+
+        self.assertEqual(body, {'total_score': 80, 'cursor': 1})
+
+    def test_invalid_query_is_rejected(self):
+        for query in ('since=abc', 'since=-1', 'fields=total_score,password', 'fields=,'):
+            response = self.client.get(f'/api/progress/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+    def test_each_variant_has_its_own_etag(self):
+        self.complete(1, 80)
+        full = self.client.get('/api/progress/')['ETag']
+        delta = self.client.get('/api/progress/?since=1')['ETag']
+
+        self.assertNotEqual(full, delta)
+        response = self.client.get('/api/progress/?since=1', HTTP_IF_NONE_MATCH=delta)
+        self.assertEqual(response.status_code, 304)
+        self.complete(2, 70)
+        self.assertEqual(self.client.get('/api/progress/?since=1', HTTP_IF_NONE_MATCH=delta).status_code, 200)
+
+
+class ConcurrentProgressTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='tabs', password='pw-12345')
+        UserProgress.objects.create(user=self.user)
+
+    def submit_from_threads(self, submissions):
+        barrier = threading.Barrier(len(submissions), timeout=30)
+        statuses = []
+        logged_in = Client()
+        logged_in.force_login(self.user)
+
+        def submit(lesson_id, score):
+            client = Client()
+            client.cookies = logged_in.cookies
+            barrier.wait()
+            try:
+                response = client.post(
+                    '/api/update-progress/',
+                    {'lesson_id': lesson_id, 'score': score},
+                    content_type='application/json',
+                )
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit, args=args) for args in submissions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=60)
+        return statuses
+
+    def test_sqlite_connection_uses_wal(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite-specific pragmas')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+    def test_concurrent_writers_do_not_lose_updates(self):
+        submissions = [(index % 4 + 1, 10 + index) for index in range(12)]
+
+        statuses = self.submit_from_threads(submissions)
+
+        self.assertEqual(statuses, [200] * len(submissions))
+        progress = UserProgress.objects.get(user=self.user)
+        scores = LessonCompletion.objects.filter(user=self.user).values_list('score', flat=True)
+        # Every re-completion must have been applied against the score before it
+        self.assertEqual(progress.total_score, sum(scores))
+        self.assertEqual(progress.lessons_completed, 4)
+        self.assertEqual(len(scores), 4)
+        self.assertEqual(ProgressEvent.objects.filter(user=self.user).count(), len(submissions))
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = []
+        for name, lessons in (('ana', 4), ('ben', 2), ('cy', 2), ('dee', 0)):
+            user = User.objects.create_user(username=name, password='pw-12345')
+            UserProgress.objects.create(user=user)
+            self.client.force_login(user)
+            for lesson_id in range(1, lessons + 1):
+                self.client.post(
+                    '/api/update-progress/', {'lesson_id': lesson_id, 'score': 50}, content_type='application/json'
+                )
+            self.users.append(user)
+
+    def test_leaderboard_ranks_with_ties(self):
+        self.client.force_login(self.users[2])
+
+        data = self.client.get('/api/leaderboard/?limit=3').json()
+
+        self.assertEqual([row['username'] for row in data['leaders']], ['ana', 'ben', 'cy'])
+        self.assertEqual([row['rank'] for row in data['leaders']], [1, 2, 2])
+        self.assertEqual(data['me'], {'rank': 2, 'total_score': 100})
+
+    def test_rank_lookup_does_not_scan_progress_rows(self):
+        self.client.force_login(self.users[3])
+        # user (session is cached), own progress row, score buckets, top-N
+        with self.assertNumQueries(4):
+            data = self.client.get('/api/leaderboard/?limit=1').json()
+        self.assertEqual(data['me']['rank'], 4)
+
+    def test_funnel_counts_match_progress(self):
+        admin = User.objects.create_superuser(username='admin', password='pw-12345')
+        self.client.force_login(admin)
+
+        data = self.client.get('/api/stats/funnel/').json()
+
+        self.assertEqual(data['learners'], 4)
+        self.assertEqual(
+            [(row['lesson_id'], row['completions']) for row in data['lessons']],
+            [(1, 3), (2, 3), (3, 1), (4, 1)],
+        )
+        self.assertEqual(data['certified'], 1)
+        self.assertEqual(data['certification_rate'], 0.25)
+
+    def test_funnel_requires_staff(self):
+        self.client.force_login(self.users[0])
+        self.assertEqual(self.client.get('/api/stats/funnel/').status_code, 403)
+
+    def test_rebuild_matches_incremental_aggregates(self):
+        before = stats.funnel(), stats.rank_for_score(100)
+        stats.rebuild()
+        self.assertEqual((stats.funnel(), stats.rank_for_score(100)), before)
+
+
+@override_settings(ROOT_URLCONF='ai_literacy_backend.urls_async')
+class AsyncProgressViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='async', password='pw-12345')
+        UserProgress.objects.create(user=self.user)
+        self.async_client.force_login(self.user)
+
+    async def post(self, body, **headers):
+        return await self.async_client.post('/api/update-progress/', body, content_type='application/json', headers=headers)
+
+    async def test_update_then_read(self):
+        response = await self.post({'lesson_id': 1, 'score': 80})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['message'], 'Progress updated')
+
+        response = await self.async_client.get('/api/progress/')
+        data = response.json()
+        self.assertEqual(data['completed_lessons'], [1])
+        self.assertEqual(data['total_score'], 80)
+
+        not_modified = await self.async_client.get('/api/progress/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+
+    async def test_matches_sync_payload(self):
+        await self.post({'lesson_id': 2, 'score': 70})
+        for path in ('/api/progress/', '/api/progress/?since=0&fields=progress,cursor'):
+            async_response = await self.async_client.get(path)
+            await cache.aclear()
+            with self.settings(ROOT_URLCONF='ai_literacy_backend.urls'):
+                sync_response = await self.async_client.get(path)
+            self.assertEqual(sync_response.json(), async_response.json())
+            self.assertEqual(sync_response['ETag'], async_response['ETag'])
+
+    async def test_idempotent_replay(self):
+        first = await self.post({'lesson_id': 1, 'score': 90}, **{'Idempotency-Key': 'tap-1'})
+        second = await self.post({'lesson_id': 1, 'score': 90}, **{'Idempotency-Key': 'tap-1'})
+        self.assertEqual(first.json(), second.json())
+        progress = await UserProgress.objects.aget(user=self.user)
+        self.assertEqual(progress.total_score, 90)
+
+    async def test_validation_and_auth(self):
+        self.assertEqual((await self.post({'score': 5})).status_code, 400)
+        self.assertEqual((await self.post({'lesson_id': 1, 'score': 'x'})).status_code, 400)
+        await self.async_client.alogout()
+        self.assertEqual((await self.async_client.get('/api/progress/')).status_code, 403)
+
+
+
+@override_settings(ROOT_URLCONF='ai_literacy_backend.urls_async', PROGRESS_STREAM_HEARTBEAT=0.05)
+class ProgressStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='stream', password='pw-12345')
+        UserProgress.objects.create(user=self.user)
+        self.async_client.force_login(self.user)
+
+    async def read_event(self, events):
+        """Return the next ``(event, data)`` pair, skipping keep-alive comments"""
+        while True:
+            chunk = await asyncio.wait_for(anext(events), 5)
+            chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+            fields = dict(
+                line.split(': ', 1) for line in chunk.strip().split('\n') if line.startswith(('event:', 'data:'))
+            )
+            if 'event' in fields:
+                return fields['event'], json.loads(fields['data'])
+
+    async def disconnect(self, events):
+        # The ASGI handler cancels the response when the client goes away
+        pending = asyncio.ensure_future(anext(events))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+
+    async def test_snapshot_then_committed_changes(self):
+        response = await self.async_client.get('/api/progress/stream/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+        try:
+            event, data = await self.read_event(events)
+            self.assertEqual(event, 'snapshot')
+            self.assertEqual(data['completed_lessons'], [])
+
+            def complete_all():
+                with self.captureOnCommitCallbacks(execute=True):
+                    for lesson_id in (1, 2, 3, 4):
+                        submit_completion(self.user, lesson_id, 90)
+
+            # Published from Django's sync thread, as update-progress does
+            await sync_to_async(complete_all)()
+
+            for lesson_id in (1, 2, 3):
+                event, data = await self.read_event(events)
+                self.assertEqual(event, 'progress')
+                self.assertEqual(list(data['progress']), [str(lesson_id)])
+                self.assertEqual(data['total_lessons'], lesson_id)
+            event, data = await self.read_event(events)
+            self.assertEqual((event, data['total_score'], data['certification_earned']), ('progress', 360, True))
+            event, data = await self.read_event(events)
+            self.assertEqual(event, 'certification')
+            self.assertTrue(data['certification_earned'])
+            self.assertIsNotNone(data['certification_date'])
+        finally:
+            await self.disconnect(events)
+        self.assertEqual(get_hub().subscriber_count(), 0)
+
+    async def test_requires_login(self):
+        await self.async_client.alogout()
+        self.assertEqual((await self.async_client.get('/api/progress/stream/')).status_code, 403)
+
+    def test_stream_releases_its_request_thread(self):
+        # _release_request_thread relies on asgiref internals, so requirements.txt
+        # pins asgiref to the releases this test has passed on
+        async def request():
+            # Run the way Django's ASGI handler runs a request
+            async with ThreadSensitiveContext() as context:
+                request_thread = await sync_to_async(threading.get_ident)()
+                executor = SyncToAsync.context_to_thread_executor[context]
+                await async_views._release_request_thread()
+                self.assertNotIn(context, SyncToAsync.context_to_thread_executor)
+                self.assertNotEqual(await sync_to_async(threading.get_ident)(), request_thread)
+                return executor
+
+        executor = asyncio.run(request())
+        with self.assertRaises(RuntimeError):
+            executor.submit(int)
+
+
+class CertificationRulesTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+
+    def completions(self, *scores, days_ago=0):
+        at = self.now - timedelta(days=days_ago)
+        return {lesson_id: (score, at) for lesson_id, score in enumerate(scores, start=1)}
+
+    def test_required_lessons_and_minimum_scores(self):
+        rules = CertificationRules(frozenset({1, 2, 3}), min_lesson_score=60, min_total_score=200)
+        self.assertEqual(rules.evaluate(self.completions(90, 90), False, None, self.now), (False, None))
+        self.assertEqual(rules.evaluate(self.completions(90, 90, 50), False, None, self.now), (False, None))
+        self.assertEqual(rules.evaluate(self.completions(60, 60, 60), False, None, self.now), (False, None))
+        self.assertEqual(rules.evaluate(self.completions(70, 70, 70), False, None, self.now), (True, self.now))
+
+    def test_standing_certification_keeps_its_date(self):
+        rules = CertificationRules(frozenset({1}))
+        earlier = self.now - timedelta(days=3)
+        self.assertEqual(rules.evaluate(self.completions(80), True, earlier, self.now), (True, earlier))
+
+    def test_expiry_and_renewal(self):
+        rules = CertificationRules(frozenset({1}), valid_days=30)
+        lapsed = self.now - timedelta(days=40)
+        self.assertEqual(rules.evaluate(self.completions(80, days_ago=40), True, lapsed, self.now), (False, lapsed))
+        # Redoing the lesson renews the certification from that completion
+        self.assertEqual(rules.evaluate(self.completions(80, days_ago=1), True, lapsed, self.now),
+                         (True, self.now - timedelta(days=1)))
+
+
+class CertificationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cert', password='pw-12345')
+        UserProgress.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def complete(self, *scores):
+        for lesson_id, score in enumerate(scores, start=1):
+            response = self.client.post(
+                '/api/update-progress/', {'lesson_id': lesson_id, 'score': score}, content_type='application/json'
+            )
+        return response.json()
+
+    def recompute(self, *args):
+        out = StringIO()
+        call_command('recompute_certifications', *args, stdout=out)
+        return out.getvalue()
+
+    def test_write_path_applies_rules(self):
+        with self.settings(CERTIFICATION_RULES={'required_lessons': [1, 2, 3, 4], 'min_lesson_score': 70}):
+            self.assertFalse(self.complete(90, 90, 90, 50)['certification_earned'])
+            self.assertTrue(self.complete(90, 90, 90, 70)['certification_earned'])
+        self.assertEqual(stats.funnel()['certified'], 1)
+
+    def test_weaker_retake_keeps_the_certification(self):
+        with self.settings(CERTIFICATION_RULES={'required_lessons': [1, 2, 3, 4], 'min_lesson_score': 70}):
+            self.assertTrue(self.complete(90, 90, 90, 90)['certification_earned'])
+            self.assertTrue(self.complete(40)['certification_earned'])
+            # Neither the event log nor a recompute disagrees
+            out = StringIO()
+            call_command('compact_progress', stdout=out)
+            self.assertIn('Repaired 0 of 1 learners', out.getvalue())
+            self.assertIn('Updated 0 of 1 learners', self.recompute())
+        self.assertEqual(LessonCompletion.objects.get(user=self.user, lesson_id=1).score, 90)
+
+    def test_expired_certification_reads_as_not_earned(self):
+        self.complete(90, 90, 90, 90)
+        UserProgress.objects.filter(user=self.user).update(certification_date=timezone.now() - timedelta(days=400))
+        cache.clear()
+        with self.settings(CERTIFICATION_RULES={'required_lessons': [1, 2, 3, 4], 'valid_days': 365}):
+            self.assertFalse(self.client.get('/api/progress/').json()['certification_earned'])
+
+    def test_recompute_after_rule_change(self):
+        others = [User.objects.create_user(username=f'cert{n}', password='pw-12345') for n in range(4)]
+        for user in others:
+            UserProgress.objects.create(user=user)
+            self.client.force_login(user)
+            self.complete(90, 90, 90, 90)
+        self.client.force_login(self.user)
+        self.complete(90, 90, 90)
+        self.assertEqual(stats.funnel()['certified'], 4)
+
+        stricter = {'required_lessons': [1, 2, 3, 4, 5]}
+        with self.settings(CERTIFICATION_RULES=stricter):
+            self.assertIn('Would update 4 of 5', self.recompute('--dry-run', '--chunk-size', '2'))
+            self.assertEqual(UserProgress.objects.filter(certification_earned=True).count(), 4)
+
+            self.assertIn('0 certified, 4 no longer certified', self.recompute('--chunk-size', '2'))
+        self.assertEqual(UserProgress.objects.filter(certification_earned=True).count(), 0)
+        self.assertEqual(stats.funnel()['certified'], 0)
+
+        lenient = {'required_lessons': [1, 2, 3]}
+        with self.settings(CERTIFICATION_RULES=lenient):
+            self.assertIn('5 certified', self.recompute('--chunk-size', '3'))
+            self.assertTrue(self.client.get('/api/progress/').json()['certification_earned'])
+        self.assertEqual(stats.funnel()['certified'], 5)
+
+
+class QueryBudgetTests(TestCase):
+    """Fail fast on N+1 regressions: every endpoint stays within QUERY_BUDGETS"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='budget', password='pw-12345')
+        UserProgress.objects.create(user=self.user)
+
+    def assertWithinBudget(self, name, request):
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+        self.assertLess(response.status_code, 400)
+        self.assertLessEqual(
+            len(queries), QUERY_BUDGETS[name],
+            f'{name} ran {len(queries)} queries:\n' + '\n'.join(q['sql'] for q in queries.captured_queries),
+        )
+
+    def post(self, path, data, **extra):
+        return self.client.post(path, data, content_type='application/json', **extra)
+
+    def test_auth_endpoints(self):
+        self.assertWithinBudget('register', lambda: self.post('/api/register/', {'username': 'new', 'password': 'pw-12345'}))
+        self.assertWithinBudget('login', lambda: self.post('/api/login/', {'username': 'budget', 'password': 'pw-12345'}))
+
+    def test_grading_endpoints(self):
+        self.client.force_login(self.user)
+        answer = {'lesson_id': 1, 'answers': {str(QuizQuestion.objects.get(lesson_id=1).id): GradingTests.GOOD_ANSWER}}
+        grading.get_graders()
+        self.assertWithinBudget('grade_lesson', lambda: self.post('/api/grade/', answer))
+        self.assertWithinBudget('grade_batch', lambda: self.post('/api/grade/', {'submissions': [answer] * 40}))
+
+    def test_progress_endpoints(self):
+        self.client.force_login(self.user)
+        for lesson_id in (1, 2, 3):
+            self.post('/api/update-progress/', {'lesson_id': lesson_id, 'score': 80})
+
+        self.assertWithinBudget('get_progress', lambda: self.client.get('/api/progress/'))
+        self.assertWithinBudget('update_progress', lambda: self.post('/api/update-progress/', {'lesson_id': 4, 'score': 90}, HTTP_IDEMPOTENCY_KEY='k1'))
+        self.assertWithinBudget('update_progress_replay', lambda: self.post('/api/update-progress/', {'lesson_id': 4, 'score': 90}, HTTP_IDEMPOTENCY_KEY='k1'))
+        self.assertWithinBudget('batch_update_progress', lambda: self.post('/api/progress/batch/', {'events': [
+            # Query count must not grow with the number of events
+            {'lesson_id': n % 4 + 1, 'score': 70, 'client_ts': timezone.now().isoformat()} for n in range(40)
+        ]}))
+
+
+class LessonCatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def lesson_entry(self, lesson_id):
+        response = self.client.get('/api/lessons/')
+        return next(entry for entry in response.json()['lessons'] if entry['id'] == lesson_id)
+
+    def test_catalog_lists_published_lessons(self):
+        response = self.client.get('/api/lessons/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        lessons = response.json()['lessons']
+        self.assertEqual([entry['id'] for entry in lessons], [1, 2, 3, 4])
+        self.assertEqual(lessons[0]['bundle_url'], f"/api/lessons/1/{lessons[0]['version']}.json")
+
+        not_modified = self.client.get('/api/lessons/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_bundle_is_immutable_and_hides_answer_keys(self):
+        url = self.lesson_entry(1)['bundle_url']
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        bundle = json.loads(response.content)
+        self.assertEqual(bundle['slug'], 'prompt-fundamentals')
+        self.assertNotIn('answer_key', bundle['questions'][0])
+
+        compressed = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertEqual(gzip.decompress(compressed.content), response.content)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_bundles_are_served_with_brotli(self):
+        # Lessons compiled before brotli was installed get a variant on the next catalog build
+        Lesson.objects.update(bundle_brotli=None)
+        url = self.lesson_entry(1)['bundle_url']
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(json.loads(brotli.decompress(response.content))['slug'], 'prompt-fundamentals')
+
+    def test_editing_a_question_changes_the_bundle_url(self):
+        old = self.lesson_entry(2)
+        question = QuizQuestion.objects.get(lesson_id=2)
+        question.prompt = 'A new exercise'
+        with self.captureOnCommitCallbacks(execute=True):
+            question.save()
+
+        new = self.lesson_entry(2)
+        self.assertNotEqual(new['version'], old['version'])
+        self.assertEqual(json.loads(self.client.get(new['bundle_url']).content)['questions'][0]['prompt'], 'A new exercise')
+        self.assertEqual(self.client.get(old['bundle_url']).status_code, 404)
+
+    def test_unpublished_lessons_are_rejected(self):
+        user = User.objects.create_user(username='learner', password='pw-12345')
+        UserProgress.objects.create(user=user)
+        self.client.force_login(user)
+        response = self.client.post('/api/update-progress/', {'lesson_id': 9, 'score': 80}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Unknown lesson_id')
+
+        lesson = Lesson.objects.get(pk=4)
+        lesson.published = False
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson.save()
+        self.assertNotIn(4, [entry['id'] for entry in self.client.get('/api/lessons/').json()['lessons']])
+        response = self.client.post('/api/update-progress/', {'lesson_id': 4, 'score': 80}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class GradingTests(TestCase):
+    GOOD_ANSWER = 'You are an expert writing coach. Help me write my college essay, with a structured outline in bullet points.'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='learner', password='pw-12345')
+        UserProgress.objects.create(user=self.user)
+        self.client.force_login(self.user)
+        self.question_ids = dict(QuizQuestion.objects.values_list('lesson_id', 'id'))
+
+    def grade(self, data):
+        return self.client.post('/api/grade/', data, content_type='application/json')
+
+    def submission(self, lesson_id, answer):
+        return {'lesson_id': lesson_id, 'answers': {str(self.question_ids[lesson_id]): answer}}
+
+    def test_passing_answer_is_recorded(self):
+        response = self.grade(self.submission(1, self.GOOD_ANSWER))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['passed'])
+        self.assertEqual(data['score'], 100)
+        self.assertIn('✅ Great! You defined the role (WHO)', data['questions'][0]['feedback'])
+        self.assertEqual(data['message'], 'Progress updated')
+        self.assertEqual(LessonCompletion.objects.get(user=self.user, lesson_id=1).score, 100)
+
+    def test_failing_answer_is_not_recorded(self):
+        data = self.grade(self.submission(1, 'Help me please')).json()
+        self.assertFalse(data['passed'])
+        self.assertEqual(data['score'], 0)
+        self.assertIn('at least 50 characters', data['questions'][0]['feedback'][0])
+
+        data = self.grade(self.submission(1, 'Please help me write something about anything at all')).json()
+        self.assertFalse(data['passed'])
+        self.assertEqual(data['score'], 35)
+        self.assertFalse(LessonCompletion.objects.filter(user=self.user).exists())
+
+    def test_invalid_submissions(self):
+        self.assertEqual(self.grade({'lesson_id': 99, 'answers': {}}).json()['error'], 'Unknown lesson_id')
+        self.assertEqual(self.grade({'lesson_id': 1, 'answers': 'text'}).status_code, 400)
+        response = self.grade({'submissions': [self.submission(1, self.GOOD_ANSWER), {'lesson_id': 'x'}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['submissions'], {'1': 'lesson_id must be an integer'})
+        self.assertFalse(LessonCompletion.objects.exists())
+
+    def test_batch_records_only_passed_lessons(self):
+        data = self.grade({'submissions': [
+            self.submission(1, 'too short'),
+            self.submission(1, self.GOOD_ANSWER),
+            self.submission(2, 'no'),
+        ]}).json()
+        self.assertEqual([result['passed'] for result in data['results']], [False, True, False])
+        self.assertEqual(data['recorded'], 1)
+        self.assertEqual(list(LessonCompletion.objects.filter(user=self.user).values_list('lesson_id', 'score')), [(1, 100)])
+
+    def test_regrading_a_passed_lesson_keeps_one_score(self):
+        for _ in range(5):
+            self.assertTrue(self.grade(self.submission(1, self.GOOD_ANSWER)).json()['passed'])
+        self.grade({'submissions': [self.submission(1, self.GOOD_ANSWER), self.submission(1, self.GOOD_ANSWER)]})
+
+        progress = UserProgress.objects.get(user=self.user)
+        self.assertEqual((progress.total_score, progress.lessons_completed), (100, 1))
+        # A weaker retake keeps the best score
+        self.client.post('/api/update-progress/', {'lesson_id': 1, 'score': 70}, content_type='application/json')
+        self.assertEqual(UserProgress.objects.get(user=self.user).total_score, 100)
+        self.assertEqual(LessonCompletion.objects.get(user=self.user, lesson_id=1).score, 100)
+        # The event log agrees with the snapshot
+        out = StringIO()
+        call_command('compact_progress', stdout=out)
+        self.assertIn('Repaired 0 of 1 learners', out.getvalue())
+
+    def test_choice_questions_and_recompilation(self):
+        grading.get_graders()
+        with self.assertNumQueries(0):
+            grading.get_graders()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            choice = QuizQuestion.objects.create(
+                lesson_id=1, position=2, kind=QuizQuestion.CHOICE, prompt='Pick one',
+                choices=['a', 'b', 'c'], answer_key={'correct': [2]},
+            )
+        answers = {str(self.question_ids[1]): self.GOOD_ANSWER, str(choice.id): 1}
+        data = self.grade({'lesson_id': 1, 'answers': answers}).json()
+        self.assertFalse(data['passed'])
+        self.assertEqual(data['score'], 50)
+
+        answers[str(choice.id)] = 2
+        self.assertTrue(self.grade({'lesson_id': 1, 'answers': answers}).json()['passed'])
+
+        # Malformed choice answers are wrong, not server errors
+        for malformed in ([{'x': 1}], {'x': 1}, [2, [2]], True, '2'):
+            answers[str(choice.id)] = malformed
+            response = self.grade({'lesson_id': 1, 'answers': answers})
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.json()['passed'])
+
+    @override_settings(ACCEPT_CLIENT_SCORES=False)
+    def test_client_scores_can_be_refused(self):
+        response = self.client.post('/api/update-progress/', {'lesson_id': 1, 'score': 100}, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.grade(self.submission(1, self.GOOD_ANSWER)).status_code, 200)
+
+
+class ProgressExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username='admin', password='pw-12345', is_staff=True)
+        now = timezone.now()
+        for n in range(5):
+            user = User.objects.create_user(username=f'learner{n}', email=f'l{n}@example.com', password='pw-12345')
+            UserProgress.objects.create(user=user, lessons_completed=n and 1, total_score=n * 10)
+            if n:
+                LessonCompletion.objects.create(user=user, lesson_id=2, score=n * 10, completed_at=now)
+
+    def test_csv_export_streams_every_learner(self):
+        self.client.force_login(self.admin)
+        response = self.client.get('/api/admin/progress-export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([row['username'] for row in rows], [f'learner{n}' for n in range(5)])
+        self.assertEqual(rows[3]['lesson_2_score'], '30')
+        self.assertEqual(rows[3]['lesson_1_score'], '')
+        self.assertEqual(rows[0]['certification_earned'], 'False')
+
+    def test_ndjson_command_uses_chunks(self):
+        out = StringIO()
+        # One streamed learner query plus one completions query per chunk of two
+        with self.assertNumQueries(1 + 3):
+            call_command('export_progress', '--format', 'ndjson', '--chunk-size', '2', stdout=out)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[4]['email'], 'l4@example.com')
+        self.assertEqual(records[4]['lessons'], {'2': {'score': 40, 'completed_at': records[4]['lessons']['2']['completed_at']}})
+        self.assertEqual(records[0]['lessons'], {})
+
+    def test_export_requires_staff(self):
+        self.client.force_login(User.objects.get(username='learner1'))
+        self.assertEqual(self.client.get('/api/admin/progress-export/').status_code, 403)
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get('/api/admin/progress-export/?output=xml').status_code, 400)
+
+
+@override_settings(THROTTLE_BUCKETS={'progress_read': (1, 2), 'progress_write': (0.5, 1)})
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='hammer', password='pw-12345')
+        UserProgress.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def test_reads_beyond_the_burst_get_429(self):
+        self.assertEqual(self.client.get('/api/progress/').status_code, 200)
+        self.assertEqual(self.client.get('/api/progress/').status_code, 200)
+        response = self.client.get('/api/progress/')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+
+        # Buckets are per user (and IP)
+        other = User.objects.create_user(username='calm', password='pw-12345')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get('/api/progress/').status_code, 200)
+
+    def test_writes_have_their_own_bucket(self):
+        post = lambda: self.client.post('/api/update-progress/', {'lesson_id': 1, 'score': 90}, content_type='application/json')
+        self.assertEqual(post().status_code, 200)
+        response = post()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '2')
+        self.assertEqual(self.client.get('/api/progress/').status_code, 200)
+
+    @override_settings(THROTTLE_ENABLED=False)
+    def test_can_be_disabled(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get('/api/progress/').status_code, 200)
+
+    @override_settings(ROOT_URLCONF='ai_literacy_backend.urls_async')
+    async def test_async_views_are_limited(self):
+        await self.async_client.aforce_login(self.user)
+        for _ in range(2):
+            self.assertEqual((await self.async_client.get('/api/progress/')).status_code, 200)
+        response = await self.async_client.get('/api/progress/')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(response.json()['detail'], 'Request was throttled. Expected available in 1 second.')
+
+
+class ProgressEventLogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='history', password='pw-12345')
+        UserProgress.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def post(self, path, data):
+        return self.client.post(path, data, content_type='application/json')
+
+    def compact(self, *args):
+        out = StringIO()
+        call_command('compact_progress', *args, stdout=out)
+        return out.getvalue()
+
+    def test_every_submission_is_logged(self):
+        self.post('/api/update-progress/', {'lesson_id': 1, 'score': 60})
+        self.post('/api/update-progress/', {'lesson_id': 1, 'score': 90})
+        old = (timezone.now() - timedelta(days=1)).isoformat()
+        self.post('/api/progress/batch/', {'events': [
+            {'lesson_id': 1, 'score': 10, 'client_ts': old},
+            {'lesson_id': 2, 'score': 70, 'client_ts': old},
+        ]})
+
+        events = list(ProgressEvent.objects.filter(user=self.user).values_list('lesson_id', 'score', 'source', 'applied'))
+        self.assertEqual(events, [
+            (1, 60, 'update', True),
+            (1, 90, 'update', True),
+            (1, 10, 'batch', False),
+            (2, 70, 'batch', True),
+        ])
+
+    def test_compaction_repairs_a_drifted_snapshot(self):
+        for lesson_id, score in [(1, 60), (1, 90), (2, 70)]:
+            self.post('/api/update-progress/', {'lesson_id': lesson_id, 'score': score})
+        UserProgress.objects.filter(user=self.user).update(total_score=5, lessons_completed=1)
+        LessonCompletion.objects.filter(user=self.user, lesson_id=2).delete()
+
+        self.assertIn('Would repair 1 of 1 learners (1 lesson completions)', self.compact('--dry-run'))
+        self.assertEqual(UserProgress.objects.get(user=self.user).total_score, 5)
+
+        self.assertIn('Repaired 1 of 1 learners', self.compact())
+        progress = UserProgress.objects.get(user=self.user)
+        self.assertEqual((progress.total_score, progress.lessons_completed), (160, 2))
+        self.assertEqual(
+            dict(LessonCompletion.objects.filter(user=self.user).values_list('lesson_id', 'score')), {1: 90, 2: 70}
+        )
+        self.assertEqual(stats.funnel()['learners'], 1)
+        # Repaired lessons show up in delta reads
+        self.assertEqual(set(self.client.get('/api/progress/?since=3').json()['progress']), {'2'})
+
+    def test_pruning_keeps_latest_events_and_totals(self):
+        for score in (40, 60, 50):
+            self.post('/api/update-progress/', {'lesson_id': 1, 'score': score})
+        self.post('/api/update-progress/', {'lesson_id': 2, 'score': 80})
+        ProgressEvent.objects.update(recorded_at=timezone.now() - timedelta(days=90))
+        self.post('/api/update-progress/', {'lesson_id': 2, 'score': 85})
+
+        self.assertIn('pruned 2 events', self.compact('--prune-older-than', '30'))
+
+        # The best attempt is kept along with the latest one
+        events = list(ProgressEvent.objects.order_by('id').values_list('kind', 'lesson_id', 'score'))
+        self.assertEqual(events, [('completion', 1, 60), ('completion', 1, 50), ('completion', 2, 85)])
+        # The log still reproduces the snapshot exactly
+        self.assertIn('Repaired 0 of 1 learners', self.compact())
+        self.assertEqual(UserProgress.objects.get(user=self.user).total_score, 145)
+
+
+class RecommendationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.enterContext(override_settings(ANALYTICS_DIR=directory))
+        self.learners = [User.objects.create_user(username=f'learner{n}', password='pw-12345') for n in range(4)]
+        for learner, scores in zip(self.learners, [[90, 80, 70], [60, 50], [80], []]):
+            UserProgress.objects.create(user=learner)
+            for lesson_id, score in enumerate(scores, start=1):
+                submit_completion(learner, lesson_id, score)
+
+    def build(self):
+        call_command('build_analytics', stdout=StringIO())
+
+    def recommendations(self, learner):
+        self.client.force_login(learner)
+        return self.client.get('/api/recommendations/')
+
+    def test_recommendations_come_from_the_cohort(self):
+        self.assertEqual(self.recommendations(self.learners[1]).status_code, 503)
+        self.build()
+
+        self.recommendations(self.learners[1])
+        with self.assertNumQueries(0):
+            body = self.client.get('/api/recommendations/').json()
+        self.assertEqual(body['percentile'], 62.5)
+        # Scores ~16 points under the cohort on each lesson: the lowest level
+        self.assertEqual(body['level'], 1)
+        self.assertEqual(body['next_lesson'], {
+            'lesson_id': 3, 'completion_rate': 0.25, 'mean_score': 70.0, 'difficulty': 0.3, 'expected_score': 54.2,
+        })
+        self.assertEqual(body['review_lesson']['lesson_id'], 1)
+        self.assertEqual(body['review_lesson']['score'], 60)
+
+        best = self.recommendations(self.learners[0]).json()
+        self.assertEqual((best['percentile'], best['level'], best['review_lesson']), (87.5, 5, None))
+        # Nobody has completed lesson 4 yet
+        self.assertEqual(best['next_lesson']['difficulty'], None)
+        self.assertEqual(best['next_lesson']['expected_score'], None)
+
+    def test_workers_pick_up_each_new_build(self):
+        self.build()
+        newcomer = User.objects.create_user(username='newcomer', password='pw-12345')
+        body = self.recommendations(newcomer).json()
+        self.assertEqual((body['percentile'], body['level'], body['next_lesson']['lesson_id']), (None, 1, 1))
+
+        submit_completion(newcomer, 1, 100)
+        self.build()
+        self.build()
+
+        body = self.recommendations(newcomer).json()
+        self.assertEqual(body['next_lesson']['lesson_id'], 2)
+        self.assertEqual(body['percentile'], 50.0)
+        snapshots = [path for path in analytics.Path(analytics.settings.ANALYTICS_DIR).iterdir() if path.is_dir()]
+        self.assertEqual(len(snapshots), analytics.KEEP_SNAPSHOTS)
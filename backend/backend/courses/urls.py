@@ -1,9 +1,24 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path('register/', views.register_user, name='register'),
     path('login/', views.login_user, name='login'),
     path('progress/', views.get_progress, name='get_progress'),
     path('update-progress/', views.update_progress, name='update_progress'),
+    path('progress/batch/', views.batch_update_progress, name='batch_update_progress'),
+    path('leaderboard/', views.leaderboard, name='leaderboard'),
+    path('stats/funnel/', views.completion_funnel, name='completion_funnel'),
+    path('recommendations/', views.recommendations, name='recommendations'),
+    path('admin/progress-export/', views.progress_export, name='progress_export'),
+    path('grade/', views.grade_lesson, name='grade_lesson'),
+    path('lessons/', views.lesson_catalog, name='lesson_catalog'),
+    path('lessons/<int:lesson_id>/<str:version>.json', views.lesson_bundle, name='lesson_bundle'),
+]
+
+# Served instead of the sync views above under ASGI (ai_literacy_backend.urls_async)
+async_urlpatterns = [
+    path('progress/', async_views.get_progress, name='get_progress'),
+    path('update-progress/', async_views.update_progress, name='update_progress'),
+    path('progress/stream/', async_views.progress_stream, name='progress_stream'),
 ]
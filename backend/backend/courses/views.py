@@ -1,12 +1,33 @@
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from functools import partial
+
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.contrib.auth import authenticate, login
+from django.conf import settings
+from django.contrib.auth import login
 from django.contrib.auth.models import User
 from django.views.decorators.csrf import csrf_exempt
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from .models import UserProgress
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_GET
+from ai_literacy_backend.compression import negotiate_encoding
+from ai_literacy_backend.passwords import HashingBusy, authenticate_user, busy_response, hash_password
+from ai_literacy_backend.throttling import ProgressReadThrottle, ProgressWriteThrottle
+from users import lifecycle
+from . import analytics, export, grading, lessons, stats
+from .cache import load_progress
+from .models import Lesson, ProgressEvent, UserProgress
+from .progress import (
+    CLIENT_SCORES_DISABLED, MAX_BATCH_EVENTS, all_lessons_completed, build_progress_payload, lock_progress,
+    parse_batch_events, parse_progress_query, parse_update, record_batch, select_progress, stored_response,
+    submit_completion,
+)
+
+MAX_LEADERBOARD_SIZE = 100
 
 @csrf_exempt
 @api_view(['POST'])
@@ -15,10 +36,13 @@ def register_user(request):
     username = request.data.get('username')
     password = request.data.get('password')
     
-    if User.objects.filter(username=username).exists():
+    if lifecycle.username_taken(username):
         return Response({'error': 'Username already exists'}, status=400)
     
-    user = User.objects.create_user(username=username, password=password)
+    try:
+        user = User.objects.create(username=username, password=hash_password(password))
+    except HashingBusy:
+        return busy_response()
     UserProgress.objects.create(user=user)
     
     return Response({'message': 'User created successfully'})
@@ -30,7 +54,13 @@ def login_user(request):
     username = request.data.get('username')
     password = request.data.get('password')
     
-    user = authenticate(username=username, password=password)
+    try:
+        user = authenticate_user(request, username, password)
+        if user is None and lifecycle.restore(username, password):
+            # Archived for inactivity: bring the account back and try again
+            user = authenticate_user(request, username, password)
+    except HashingBusy:
+        return busy_response()
     if user:
         login(request, user)
         progress = UserProgress.objects.get(user=user)
@@ -45,79 +75,202 @@ def login_user(request):
 @csrf_exempt
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([ProgressReadThrottle])
 def get_progress(request):
-    """Get user's lesson progress"""
-    try:
-        progress = UserProgress.objects.get(user=request.user)
-        completed_lessons = progress.get_completed_lessons()
-        progress_data = progress.get_progress_data()
+    """Get user's lesson progress, optionally only what changed ``?since=`` a cursor and only ``?fields=``"""
+    query, error = parse_progress_query(request.query_params)
+    if error:
+        return Response({'error': error}, status=400)
+    payload, etag, versions = load_progress(request.user.id, partial(build_progress_payload, request.user))
+    payload, etag = select_progress(payload, versions, etag, *query)
 
-        return Response({
-            'completed_lessons': completed_lessons,
-            'progress': progress_data,
-            'total_lessons': progress.lessons_completed,
-            'total_score': progress.total_score,
-            'certification_earned': progress.certification_earned,
-            'certification_date': progress.certification_date
-        })
-    except UserProgress.DoesNotExist:
-        # Create new progress if it doesn't exist
-        progress = UserProgress.objects.create(user=request.user)
-        return Response({
-            'completed_lessons': [],
-            'progress': {},
-            'total_lessons': 0,
-            'total_score': 0,
-            'certification_earned': False,
-            'certification_date': None
-        })
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        return Response(status=304, headers=headers)
+    return Response(payload, headers=headers)
 
 @csrf_exempt
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([ProgressWriteThrottle])
 def update_progress(request):
-    lesson_id = request.data.get('lesson_id')
-    score = request.data.get('score', 0)
+    if not settings.ACCEPT_CLIENT_SCORES:
+        return Response({'error': CLIENT_SCORES_DISABLED}, status=403)
+    update, error = parse_update(request.data, request.headers, lessons.lesson_ids())
+    if error:
+        return Response({'error': error}, status=400)
+    lesson_id, score, idempotency_key = update
 
-    try:
-        progress = UserProgress.objects.get(user=request.user)
-    except UserProgress.DoesNotExist:
-        progress = UserProgress.objects.create(user=request.user)
-
-    # Get current completed lessons and progress data
-    completed_lessons = progress.get_completed_lessons()
-    progress_data = progress.get_progress_data()
-
-    # Add lesson to completed list if not already there
-    if lesson_id not in completed_lessons:
-        completed_lessons.append(lesson_id)
-        completed_lessons.sort()
-        progress.lessons_completed += 1
-
-    # Update progress data for this lesson
-    progress_data[str(lesson_id)] = {
-        'score': score,
-        'completed': True,
-        'completed_at': timezone.now().isoformat()
-    }
-
-    # Update total score
-    progress.total_score += score
-
-    # Save updated data
-    progress.set_completed_lessons(completed_lessons)
-    progress.set_progress_data(progress_data)
-
-    # Check if all 4 lessons are completed and award certification
-    TOTAL_LESSONS = 4
-    if len(completed_lessons) >= TOTAL_LESSONS and not progress.certification_earned:
-        progress.certification_earned = True
-        progress.certification_date = timezone.now()
-
-    progress.save()
+    # Replayed submission: answer from the stored response without touching progress
+    if idempotency_key:
+        replay = stored_response(request.user, idempotency_key)
+        if replay is not None:
+            return Response(replay)
+
+    return Response(submit_completion(request.user, lesson_id, score, idempotency_key))
+
+@csrf_exempt
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@throttle_classes([ProgressWriteThrottle])
+def batch_update_progress(request):
+    """Apply a queue of offline lesson events in one transaction"""
+    if not settings.ACCEPT_CLIENT_SCORES:
+        return Response({'error': CLIENT_SCORES_DISABLED}, status=403)
+    events = request.data.get('events') if isinstance(request.data, dict) else request.data
+    if not isinstance(events, list):
+        return Response({'error': 'events must be a list'}, status=400)
+    if len(events) > MAX_BATCH_EVENTS:
+        return Response({'error': f'at most {MAX_BATCH_EVENTS} events per batch'}, status=400)
+
+    parsed, errors = parse_batch_events(events, lessons.lesson_ids())
+    if errors:
+        return Response({'error': 'Invalid events', 'events': errors}, status=400)
+
+    with transaction.atomic():
+        progress = lock_progress(request.user)
+        applied, stale = record_batch(progress, parsed)
 
     return Response({
-        'message': 'Progress updated',
+        'message': 'Progress synced',
+        'applied': applied,
+        'stale': stale,
         'certification_earned': progress.certification_earned,
-        'all_lessons_completed': len(completed_lessons) >= TOTAL_LESSONS
-    })
\ No newline at end of file
+        'all_lessons_completed': all_lessons_completed(progress)
+    })
+
+@csrf_exempt
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@throttle_classes([ProgressWriteThrottle])
+def grade_lesson(request):
+    """Grade quiz answers against the server's answer keys and record passed lessons.
+
+    Takes one ``{lesson_id, answers}`` submission, or ``{submissions: [...]}``
+    to grade many and record them in one transaction.
+    """
+    graders = grading.get_graders()
+    data = request.data if isinstance(request.data, dict) else {}
+    if 'submissions' not in data:
+        result, error = grading.grade_submission(graders, data)
+        if error:
+            return Response({'error': error}, status=400)
+        if result['passed']:
+            result.update(submit_completion(
+                request.user, result['lesson_id'], result['score'], source=ProgressEvent.GRADE
+            ))
+        return Response(result)
+
+    submissions = data['submissions']
+    if not isinstance(submissions, list):
+        return Response({'error': 'submissions must be a list'}, status=400)
+    if len(submissions) > MAX_BATCH_EVENTS:
+        return Response({'error': f'at most {MAX_BATCH_EVENTS} submissions per batch'}, status=400)
+
+    results = []
+    errors = {}
+    for index, submission in enumerate(submissions):
+        result, error = grading.grade_submission(graders, submission)
+        if error:
+            errors[index] = error
+        else:
+            results.append(result)
+    if errors:
+        return Response({'error': 'Invalid submissions', 'submissions': errors}, status=400)
+
+    # Passed submissions are recorded like an offline batch, later ones winning per lesson
+    now = timezone.now()
+    passed = [(result['lesson_id'], result['score'], now) for result in results if result['passed']]
+    with transaction.atomic():
+        progress = lock_progress(request.user)
+        applied, _ = record_batch(progress, passed, source=ProgressEvent.GRADE)
+
+    return Response({
+        'message': 'Answers graded',
+        'results': results,
+        'recorded': applied,
+        'certification_earned': progress.certification_earned,
+        'all_lessons_completed': all_lessons_completed(progress)
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def leaderboard(request):
+    """Top learners by total score plus the caller's own rank"""
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), MAX_LEADERBOARD_SIZE)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=400)
+
+    progress, _ = UserProgress.objects.get_or_create(user=request.user)
+    return Response({
+        'leaders': stats.leaderboard(limit),
+        'me': {
+            'rank': stats.rank_for_score(progress.total_score),
+            'total_score': progress.total_score,
+        },
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def recommendations(request):
+    """Next lesson, difficulty level and review suggestion from the latest analytics snapshot"""
+    snapshot = analytics.get_snapshot()
+    if snapshot is None:
+        return Response({'error': 'Recommendations are not available yet'}, status=503)
+    return Response(snapshot.recommend(request.user.id), headers={'Cache-Control': 'private, max-age=60'})
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def completion_funnel(request):
+    """Completion counts per lesson and certification rate across all learners"""
+    return Response(stats.funnel())
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def progress_export(request):
+    """Stream every learner's progress as CSV (default) or NDJSON (?output=ndjson)"""
+    export_format = request.query_params.get('output', 'csv')
+    if export_format not in export.FORMATS:
+        return Response({'error': f"output must be one of: {', '.join(export.FORMATS)}"}, status=400)
+
+    content = export.stream(export_format)
+    if isinstance(request._request, ASGIRequest):
+        content = export.aiterate(content)
+    filename = f"progress-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+    return StreamingHttpResponse(content, content_type=export.CONTENT_TYPES[export_format], headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-store',
+    })
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def lesson_catalog(request):
+    """Published lessons with the URL of each lesson's current content bundle"""
+    payload, etag = lessons.catalog()
+    headers = {'ETag': etag, 'Cache-Control': lessons.CATALOG_CACHE_CONTROL}
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        return Response(status=304, headers=headers)
+    return Response(payload, headers=headers)
+
+@require_GET
+def lesson_bundle(request, lesson_id, version):
+    """Serve a precompiled lesson bundle; the URL is content-addressed, so it never changes"""
+    etag = f'"{version}"'
+    headers = {'ETag': etag, 'Cache-Control': lessons.BUNDLE_CACHE_CONTROL, 'Vary': 'Accept-Encoding'}
+    lesson = Lesson.objects.filter(pk=lesson_id, published=True, content_hash=version)
+    if etag in parse_etags(request.headers.get('If-None-Match', '')) and lesson.exists():
+        return HttpResponseNotModified(headers=headers)
+
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''), ['br', 'gzip'])
+    field = {'br': 'bundle_brotli', 'gzip': 'bundle_gzip'}.get(encoding, 'bundle')
+    row = lesson.values_list(field, 'bundle_gzip' if encoding == 'br' else field).first()
+    if row is None:
+        return JsonResponse({'error': 'Unknown lesson version'}, status=404)
+    body, fallback = row
+    if body is None:
+        # Compiled without brotli available: gzip is the next best stored variant
+        body, encoding = fallback, 'gzip'
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return HttpResponse(bytes(body), content_type='application/json', headers=headers)
@@ -0,0 +1,41 @@
+"""
+Gunicorn configuration for the production profile.
+
+    gunicorn -c gunicorn.conf.py
+
+Every value can be overridden with the environment variable named next to it.
+See DEPLOYMENT.md at the repository root for the tuning rationale and
+load-test numbers.
+"""
+
+import multiprocessing
+import os
+
+# Production defaults for Django; explicit environment values still win.
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ai_literacy_backend.settings')
+os.environ.setdefault('DJANGO_DEBUG', '0')
+# Share the progress cache between workers so write invalidation is seen by all of them
+os.environ.setdefault('CACHE_DIR', '/tmp/ai-literacy-cache')
+
+wsgi_app = os.environ.get('GUNICORN_APP', 'ai_literacy_backend.wsgi:application')
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Requests are short and mostly waiting on the database, so a few processes
+# with a small thread pool each beat many single-threaded processes.
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Load Django once in the master and fork workers from it
+preload_app = True
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = 200
+
+# Set GUNICORN_ACCESSLOG to an empty string to disable per-request logging
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-') or None
+errorlog = '-'
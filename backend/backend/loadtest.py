@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+Minimal HTTP load test for the progress API.
+
+Registers one user per client thread, logs in, then hammers an endpoint for a
+fixed duration over keep-alive connections and prints requests/sec and
+latency percentiles. Uses only the standard library.
+
+    python loadtest.py --url http://127.0.0.1:8000 --endpoint progress --concurrency 16 --duration 15
+    python loadtest.py --endpoint update-progress
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+import uuid
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit
+
+
+class Client:
+    """Keep-alive HTTP client holding the session and CSRF cookies of one user"""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+        self.cookies = {}
+
+    def request(self, method, path, body=None):
+        headers = {'Content-Type': 'application/json'}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        if 'csrftoken' in self.cookies:
+            headers['X-CSRFToken'] = self.cookies['csrftoken']
+        payload = json.dumps(body) if body is not None else None
+        self.conn.request(method, path, body=payload, headers=headers)
+        response = self.conn.getresponse()
+        data = response.read()
+        for header in response.headers.get_all('Set-Cookie') or []:
+            cookie = SimpleCookie(header)
+            self.cookies.update({key: morsel.value for key, morsel in cookie.items()})
+        return response.status, data
+
+    def sign_in(self):
+        credentials = {'username': f'load-{uuid.uuid4().hex[:12]}', 'password': 'load-test-pw-1'}
+        self.request('POST', '/api/register/', credentials)
+        status, data = self.request('POST', '/api/login/', credentials)
+        if status != 200:
+            raise RuntimeError(f'login failed: {status} {data[:200]!r}')
+
+
+def worker(args, deadline, latencies, errors, signed_in, ready):
+    try:
+        client = Client(args.url)
+        client.sign_in()
+    except (OSError, http.client.HTTPException, RuntimeError) as exc:
+        errors.append(f'sign-in: {exc}')
+        return
+    finally:
+        signed_in.release()
+    ready.wait()
+
+    lesson_id = 0
+    while time.perf_counter() < deadline[0]:
+        if args.endpoint == 'progress':
+            method, path, body = 'GET', '/api/progress/', None
+        else:
+            lesson_id = lesson_id % 4 + 1
+            method, path, body = 'POST', '/api/update-progress/', {'lesson_id': lesson_id, 'score': 100}
+        started = time.perf_counter()
+        try:
+            status, _ = client.request(method, path, body)
+        except (OSError, http.client.HTTPException):
+            # The server may close an idle keep-alive socket (e.g. when gunicorn
+            # recycles a worker); reconnect once before counting a failure
+            client.conn.close()
+            try:
+                status, _ = client.request(method, path, body)
+            except (OSError, http.client.HTTPException):
+                errors.append('connection')
+                client.conn.close()
+                continue
+        latencies.append(time.perf_counter() - started)
+        if status >= 400:
+            errors.append(status)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--endpoint', choices=['progress', 'update-progress'], default='progress')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=15.0)
+    args = parser.parse_args()
+
+    latencies, errors = [], []
+    deadline = [0.0]
+    signed_in = threading.Semaphore(0)
+    ready = threading.Event()
+    threads = [
+        threading.Thread(target=worker, args=(args, deadline, latencies, errors, signed_in, ready), daemon=True)
+        for _ in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    # Registration and login hash passwords; keep that out of the measured window
+    for _ in threads:
+        signed_in.acquire()
+    deadline[0] = time.perf_counter() + args.duration
+    started = time.perf_counter()
+    ready.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(json.dumps({
+        'endpoint': args.endpoint,
+        'concurrency': args.concurrency,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'first_error': str(errors[0]) if errors else None,
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,18 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ArchivedUser
+
+
+@admin.register(ArchivedUser)
+class ArchivedUserAdmin(admin.ModelAdmin):
+    """Read-only; accounts come back by signing in (see users/lifecycle.py)"""
+    list_display = ('username', 'user_id', 'last_active', 'archived_at', 'rows', 'raw_size')
+    search_fields = ('username',)
+    exclude = ('data',)
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
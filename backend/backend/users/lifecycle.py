@@ -0,0 +1,209 @@
+"""
+Archiving of inactive accounts, so the live tables only hold active learners.
+
+``manage.py archive_inactive`` picks accounts with no sign-in and no progress
+for N days. Abandoned sign-ups qualify as well: they have never signed in and
+are dated from registration. Staff accounts are never archived.
+
+Each account is archived in chunks. Its User row and every row that
+references it are serialized to JSON, gzipped into one ArchivedUser row and
+deleted from the live tables. "Every row that references it" means each
+model with a cascading foreign key to User. Those rows are deleted with one
+statement per table, without per-row signals. The leaderboard and funnel
+counters are adjusted once per chunk instead.
+
+The next sign-in restores the account lazily. ``restore()`` checks the password
+against the archived hash, then recreates the rows with their original
+primary keys and counts the learner back in. An archived
+username stays reserved, so nobody else can register it in the meantime.
+"""
+
+import gzip
+import json
+
+from django.contrib.auth.models import User
+from django.core import serializers
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import CASCADE, Exists, OuterRef
+from django.db.models.functions import Coalesce
+
+from ai_literacy_backend.auth import clear_user_cache
+from ai_literacy_backend.passwords import check_password
+from ai_literacy_backend.compression import gzip_compress
+from courses import stats
+from courses.cache import invalidate_progress, invalidate_progress_many
+from courses.models import LessonCompletion, ProgressEvent, TopicProgress, UserProgress
+from .models import ArchivedUser
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def archived_models():
+    """Models whose rows are deleted along with a User, and therefore archived with it"""
+    return [
+        relation.related_model
+        for relation in User._meta.related_objects
+        if relation.on_delete is CASCADE and not relation.many_to_many
+    ]
+
+
+def inactive_users(cutoff):
+    """Non-staff users with no sign-in, registration or progress since ``cutoff``"""
+    return (
+        User.objects.filter(is_staff=False, is_superuser=False)
+        .annotate(last_active=Coalesce('last_login', 'date_joined'))
+        .filter(last_active__lt=cutoff)
+        .exclude(Exists(ProgressEvent.objects.filter(user=OuterRef('pk'), recorded_at__gte=cutoff)))
+        .exclude(Exists(TopicProgress.objects.filter(user=OuterRef('pk'), updated_at__gte=cutoff)))
+    )
+
+
+def archive(user_ids, cutoff):
+    """Archive those of ``user_ids`` that are still inactive since ``cutoff``.
+
+    Returns ``(users, rows, raw_bytes, stored_bytes)``.
+    """
+    with transaction.atomic():
+        # Re-check inside the transaction: someone may have signed in since the scan
+        users = list(
+            inactive_users(cutoff).filter(pk__in=user_ids).select_for_update(of=('self',))
+            .prefetch_related('groups', 'user_permissions')
+        )
+        if not users:
+            return 0, 0, 0, 0
+        ids = [user.pk for user in users]
+        related = {user.pk: [] for user in users}
+        for model, field in _user_foreign_keys():
+            for row in model.objects.filter(**{f'{field.name}__in': ids}).order_by('pk'):
+                related[getattr(row, field.attname)].append(row)
+
+        archives = []
+        raw_bytes = 0
+        for user in users:
+            objects = [user, *related[user.pk]]
+            body = serializers.serialize('json', objects).encode()
+            raw_bytes += len(body)
+            archives.append(ArchivedUser(
+                user_id=user.pk, username=user.username, last_active=user.last_active,
+                rows=len(objects), raw_size=len(body), data=gzip_compress(body),
+            ))
+        ArchivedUser.objects.bulk_create(archives)
+        _delete_related(ids)
+        User.objects.filter(pk__in=ids).delete()
+        rows = [row for user_rows in related.values() for row in user_rows]
+        stats.learners_removed_in_bulk(
+            [row for row in rows if isinstance(row, UserProgress)],
+            [row.lesson_id for row in rows if isinstance(row, LessonCompletion)],
+        )
+        transaction.on_commit(lambda: _forget(ids))
+    return len(users), sum(a.rows for a in archives), raw_bytes, sum(len(a.data) for a in archives)
+
+
+def _user_foreign_keys():
+    return [
+        (model, next(f for f in model._meta.fields if f.remote_field and f.remote_field.model is User))
+        for model in archived_models()
+    ]
+
+
+def _delete_related(user_ids):
+    """Delete the archived rows with one statement per table.
+
+    A cascading QuerySet.delete() sends post_delete for every row, and each
+    signal updates the stats counters one row at a time. Those counters are
+    adjusted in bulk instead.
+    """
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model, field in _user_foreign_keys():
+            cursor.execute(
+                f'DELETE FROM {quote(model._meta.db_table)} WHERE {quote(field.column)} IN ({placeholders})', user_ids
+            )
+
+
+def _forget(user_ids):
+    invalidate_progress_many(user_ids)
+    for user_id in user_ids:
+        clear_user_cache(user_id)
+
+
+def restore(username, password):
+    """Move an archived account back into the live tables if ``password`` is its password.
+
+    Returns whether the account was restored. The password is checked first,
+    so a failed sign-in leaves the archive untouched.
+    """
+    if not username or password is None:
+        return False
+    data = ArchivedUser.objects.filter(username=username).values_list('data', flat=True).first()
+    if data is None or not check_password(password, _archived_password(data)):
+        return False
+    with transaction.atomic():
+        archived = ArchivedUser.objects.select_for_update().filter(username=username).first()
+        if archived is None:
+            return False
+        objects = list(serializers.deserialize('json', gzip.decompress(archived.data)))
+        try:
+            with transaction.atomic():
+                for obj in objects:
+                    obj.save()
+        except IntegrityError:
+            # The username was registered while the archive was being written
+            return False
+        archived.delete()
+
+        # Saving raw rows skips the signals, so count the learner back in
+        for obj in objects:
+            if isinstance(obj.object, UserProgress):
+                stats.learners_added(score=obj.object.total_score)
+                if obj.object.certification_earned:
+                    stats.certifications_changed(1)
+        stats.lessons_completed([obj.object.lesson_id for obj in objects if isinstance(obj.object, LessonCompletion)])
+        transaction.on_commit(lambda: invalidate_progress(archived.user_id))
+    return True
+
+
+def _archived_password(data):
+    """The password hash stored in an archive's serialized User row"""
+    for obj in json.loads(gzip.decompress(data)):
+        if obj['model'] == 'auth.user':
+            return obj['fields']['password']
+    return None
+
+
+def is_archived(username):
+    return ArchivedUser.objects.filter(username=username).exists()
+
+
+def username_taken(username):
+    """Whether a live or an archived account has ``username``, in one query"""
+    live = User.objects.filter(username=username).values('username')
+    return live.union(ArchivedUser.objects.filter(username=username).values('username')).exists()
+
+
+def archived_usernames(usernames):
+    return set(ArchivedUser.objects.filter(username__in=usernames).values_list('username', flat=True))
+
+
+def table_sizes(models):
+    """Bytes used by each model's table and indexes, or None where the database can't tell"""
+    tables = [model._meta.db_table for model in models]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT relname, pg_total_relation_size(oid) FROM pg_class WHERE relname = ANY(%s)', [tables]
+            )
+            return dict(cursor.fetchall())
+        if connection.vendor == 'sqlite':
+            # dbstat is compiled into most SQLite builds; without it there's no size report
+            try:
+                cursor.execute(
+                    'SELECT s.tbl_name, SUM(d.pgsize) FROM dbstat d JOIN sqlite_schema s ON s.name = d.name '
+                    f'WHERE s.tbl_name IN ({", ".join(["%s"] * len(tables))}) GROUP BY s.tbl_name',
+                    tables,
+                )
+            except DatabaseError:
+                return None
+            return dict(cursor.fetchall())
+    return None
@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users import lifecycle
+
+
+def _size(n):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            return f'{n:.0f} {unit}' if unit == 'B' else f'{n:.1f} {unit}'
+        n /= 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Move accounts inactive for --days into compressed ArchivedUser rows, in batches, so the live '
+        'user and progress tables only hold active learners. Archived accounts are restored on their next sign-in.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help='inactivity before archiving (default 365)')
+        parser.add_argument(
+            '--batch-size', type=int, default=lifecycle.DEFAULT_BATCH_SIZE,
+            help=f'accounts per transaction (default {lifecycle.DEFAULT_BATCH_SIZE})',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='count the accounts without archiving them')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        inactive = lifecycle.inactive_users(cutoff)
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Would archive {inactive.count()} accounts inactive since {cutoff:%Y-%m-%d}'))
+            return
+
+        models = [User, *lifecycle.archived_models()]
+        before = lifecycle.table_sizes(models)
+        totals = {'users': 0, 'rows': 0, 'raw': 0, 'stored': 0}
+        last_pk = 0
+        while True:
+            # Keyset pagination: archived rows are gone, skipped ones stay behind last_pk
+            batch = list(
+                inactive.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1]
+            users, rows, raw, stored = lifecycle.archive(batch, cutoff)
+            for key, value in zip(('users', 'rows', 'raw', 'stored'), (users, rows, raw, stored)):
+                totals[key] += value
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {totals['users']} accounts inactive since {cutoff:%Y-%m-%d} ({totals['rows']} rows): "
+            f"{_size(totals['raw'])} of rows stored as {_size(totals['stored'])}"
+        ))
+        after = lifecycle.table_sizes(models)
+        if before is not None and after is not None:
+            freed = sum(before.values()) - sum(after.values())
+            self.stdout.write(
+                f'Live tables: {_size(sum(before.values()))} -> {_size(sum(after.values()))} '
+                f'({_size(max(freed, 0))} reclaimed)'
+            )
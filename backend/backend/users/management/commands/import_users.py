@@ -0,0 +1,44 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.roster import DEFAULT_BATCH_SIZE, RosterError, import_roster, read_roster
+
+
+class Command(BaseCommand):
+    help = (
+        'Create users from a CSV roster (username, email, password, first_name, last_name). '
+        'Passwords are hashed across a process pool and rows are inserted in batches; '
+        'invalid rows are reported and skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('roster', help="CSV file, or - for stdin")
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help=f'users per bulk insert (default {DEFAULT_BATCH_SIZE})',
+        )
+        parser.add_argument('--workers', type=int, help='hashing processes (default PASSWORD_IMPORT_WORKERS)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            if options['roster'] == '-':
+                result = self._import(sys.stdin, options)
+            else:
+                with open(options['roster'], encoding='utf-8-sig', newline='') as lines:
+                    result = self._import(lines, options)
+        except (OSError, RosterError) as e:
+            raise CommandError(e)
+        elapsed = time.perf_counter() - started
+
+        for error in result['errors']:
+            self.stderr.write(f"line {error['line']} ({error['username'] or 'no username'}): {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result['created']} users in {elapsed:.1f}s "
+            f"({result['created'] / elapsed * 60:,.0f}/min), {len(result['errors'])} rows skipped"
+        ))
+
+    def _import(self, lines, options):
+        return import_roster(read_roster(lines), options['batch_size'], options['workers'])
@@ -0,0 +1,37 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+# Engines that keep a row per session in django_session
+DB_ENGINES = ('django.contrib.sessions.backends.db', 'django.contrib.sessions.backends.cached_db')
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired sessions in small batches so the session table stays bounded '
+        'without holding a long write lock. Schedule it (e.g. hourly cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='rows deleted per transaction (default 1000)')
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE not in DB_ENGINES:
+            # Cache and cookie sessions expire on their own; other stores know how to clean up
+            import_module(settings.SESSION_ENGINE).SessionStore.clear_expired()
+            self.stdout.write(self.style.SUCCESS(f'Cleared expired sessions ({settings.SESSION_ENGINE})'))
+            return
+
+        now = timezone.now()
+        deleted = 0
+        while True:
+            batch = list(
+                Session.objects.filter(expire_date__lt=now).values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not batch:
+                break
+            deleted += Session.objects.filter(pk__in=batch).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired sessions'))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedUser',
+            fields=[
+                ('user_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('username', models.CharField(max_length=150, unique=True)),
+                ('last_active', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('rows', models.PositiveIntegerField()),
+                ('raw_size', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+            ],
+        ),
+    ]
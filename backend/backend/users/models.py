@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+XP_PER_LEVEL = 100
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     total_xp = models.IntegerField(default=0)
@@ -10,3 +12,29 @@ class UserProfile(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - Level {self.level}"
+
+    def add_xp(self, amount):
+        """Add XP and recompute level. Call on a row fetched with select_for_update()."""
+        self.total_xp += amount
+        self.level = 1 + self.total_xp // XP_PER_LEVEL
+        self.save(update_fields=['total_xp', 'level'])
+
+
+class ArchivedUser(models.Model):
+    """An inactive account moved out of the live tables by ``manage.py archive_inactive``.
+
+    ``data`` holds the User row and every row that referenced it, as gzipped
+    JSON. Logging in restores them (see users/lifecycle.py). The username
+    stays reserved while the account is archived.
+    """
+    user_id = models.IntegerField(primary_key=True)
+    username = models.CharField(max_length=150, unique=True)
+    last_active = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    rows = models.PositiveIntegerField()
+    # Serialized size before compression
+    raw_size = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    def __str__(self):
+        return f"{self.username} (archived {self.archived_at:%Y-%m-%d})"
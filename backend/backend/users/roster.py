@@ -0,0 +1,127 @@
+"""
+Bulk user provisioning from a CSV roster.
+
+The roster has a header row with a ``username`` column and, optionally,
+``email``, ``password``, ``first_name`` and ``last_name``. Users without a
+password get an unusable one. Rows are validated, hashed in parallel (see
+``passwords.bulk_hasher``) and inserted ``batch_size`` at a time with
+bulk_create, together with their UserProfile and UserProgress rows. A bad row
+is reported with its line number and skipped; it never aborts the import.
+
+Used by ``manage.py import_users`` and ``/api/users/import/``.
+"""
+
+import csv
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from ai_literacy_backend.passwords import bulk_hasher
+from courses import stats
+from courses.models import UserProgress
+from . import lifecycle
+from .models import UserProfile
+
+ROSTER_FIELDS = ('username', 'email', 'password', 'first_name', 'last_name')
+DEFAULT_BATCH_SIZE = 1000
+
+
+class RosterError(ValueError):
+    """Raised when the roster as a whole can't be read (e.g. no username column)"""
+
+
+def read_roster(lines):
+    """Yield ``(line_number, row)`` for each CSV record in ``lines``"""
+    reader = csv.DictReader(lines)
+    if not reader.fieldnames or 'username' not in [name.strip() for name in reader.fieldnames]:
+        raise RosterError('roster must have a header row with a username column')
+    for row in reader:
+        yield reader.line_num, {
+            key.strip(): (value or '').strip() for key, value in row.items() if key and key.strip() in ROSTER_FIELDS
+        }
+
+
+def _clean(row):
+    """Validate a roster row; returns the User field values or raises ValidationError"""
+    values = {'username': row.get('username', '')}
+    for name in ('email', 'first_name', 'last_name'):
+        if row.get(name):
+            values[name] = row[name]
+    if 'email' in values:
+        values['email'] = User.objects.normalize_email(values['email'])
+    for name, value in values.items():
+        User._meta.get_field(name).clean(value, None)
+    return values
+
+
+def import_roster(records, batch_size=DEFAULT_BATCH_SIZE, workers=None):
+    """Create the users in ``records`` (from read_roster).
+
+    Returns ``{'created': n, 'errors': [{'line', 'username', 'error'}, ...]}``.
+    """
+    result = {'created': 0, 'errors': []}
+    seen = set()
+    with bulk_hasher(workers) as hash_many:
+        batch = []
+        for line, row in records:
+            username = row.get('username', '')
+            try:
+                values = _clean(row)
+            except ValidationError as e:
+                result['errors'].append({'line': line, 'username': username, 'error': ' '.join(e.messages)})
+                continue
+            if username in seen:
+                result['errors'].append({'line': line, 'username': username, 'error': 'duplicate username in roster'})
+                continue
+            seen.add(username)
+            batch.append((line, values, row.get('password') or None))
+            if len(batch) == batch_size:
+                _create_batch(batch, hash_many, result)
+                batch = []
+        if batch:
+            _create_batch(batch, hash_many, result)
+    return result
+
+
+def _create_batch(batch, hash_many, result):
+    usernames = [values['username'] for _, values, _ in batch]
+    existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    # Archived accounts keep their usernames
+    existing |= lifecycle.archived_usernames(usernames)
+    fresh = []
+    for line, values, password in batch:
+        if values['username'] in existing:
+            result['errors'].append({'line': line, 'username': values['username'], 'error': 'username already exists'})
+        else:
+            fresh.append((line, values, password))
+    if not fresh:
+        return
+
+    hashes = hash_many([password for _, _, password in fresh])
+    users = [User(password=encoded, **values) for (_, values, _), encoded in zip(fresh, hashes)]
+    try:
+        with transaction.atomic():
+            _insert(users)
+    except IntegrityError:
+        # A user registered concurrently: fall back to one row at a time for this batch
+        users = []
+        for (line, values, _), encoded in zip(fresh, hashes):
+            try:
+                with transaction.atomic():
+                    users += _insert([User(password=encoded, **values)])
+            except IntegrityError as e:
+                taken = User.objects.filter(username=values['username']).exists()
+                result['errors'].append({
+                    'line': line, 'username': values['username'], 'error': 'username already exists' if taken else str(e),
+                })
+    result['created'] += len(users)
+
+
+def _insert(users):
+    users = User.objects.bulk_create(users)
+    UserProfile.objects.bulk_create([UserProfile(user=user) for user in users])
+    UserProgress.objects.bulk_create([UserProgress(user=user) for user in users])
+    # bulk_create skips the signal that counts new learners
+    stats.learners_added(len(users))
+    return users
@@ -1,3 +1,213 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from courses import stats
+from courses.models import LearningTopic, LessonCompletion, ProgressEvent, TopicProgress, UserProgress
+from courses.progress import submit_completion
+from .models import ArchivedUser, UserProfile
+
+
+class TopicProgressTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='topics', password='pw-12345')
+        UserProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+        self.topics = [
+            LearningTopic.objects.create(name=f'Topic {n}', difficulty_level=n) for n in range(1, 4)
+        ]
+
+    def submit(self, topic, score):
+        return self.client.post(
+            '/api/users/update-progress/',
+            {'topic_id': topic.id, 'score': score},
+            content_type='application/json',
+        )
+
+    def test_progress_query_count_is_constant(self):
+        self.submit(self.topics[0], 90)
+        # profile, topics joined to progress (session and user are cached)
+        with self.assertNumQueries(2):
+            self.client.get('/api/users/progress/')
+
+        LearningTopic.objects.bulk_create(LearningTopic(name=f'Extra {n}') for n in range(20))
+        with self.assertNumQueries(2):
+            data = self.client.get('/api/users/progress/').json()
+
+        self.assertEqual(len(data['progress']), 23)
+        first = data['progress'][0]
+        self.assertEqual(first['lessons_completed'], 1)
+        self.assertEqual(first['average_score'], 90)
+        self.assertEqual(data['progress'][1]['current_difficulty'], 1)
+
+    def test_difficulty_adapts_to_average_score(self):
+        self.submit(self.topics[0], 95)
+        self.submit(self.topics[1], 40)
+
+        self.assertEqual(TopicProgress.objects.get(topic=self.topics[0]).current_difficulty, 2)
+        self.assertEqual(TopicProgress.objects.get(topic=self.topics[1]).current_difficulty, 1)
+
+    def test_xp_and_level(self):
+        for _ in range(11):
+            response = self.submit(self.topics[0], 100)
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(profile.total_xp, 110)
+        self.assertEqual(profile.level, 2)
+        self.assertEqual(response.json()['new_level'], 2)
+
+    def test_unknown_topic_is_404(self):
+        response = self.client.post(
+            '/api/users/update-progress/', {'topic_id': 999, 'score': 50}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class PurgeSessionsTests(TestCase):
+    def test_deletes_only_expired_sessions(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'old{n}', session_data='', expire_date=now - timedelta(days=1)) for n in range(5)]
+            + [Session(session_key='live', session_data='', expire_date=now + timedelta(days=1))]
+        )
+        out = StringIO()
+
+        call_command('purge_sessions', batch_size=2, stdout=out)
+
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+        self.assertIn('Deleted 5 expired sessions', out.getvalue())
+
+
+ROSTER = """username,email,password,first_name
+ada,ada@school.example,pw-ada-1,Ada
+grace,grace@school.example,,Grace
+bad name!,,pw,
+ada,other@school.example,pw,
+existing,,pw,
+alan,not-an-email,pw,
+"""
+
+
+class ImportUsersTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='existing', password='pw-12345')
+
+    def assertImported(self, errors):
+        self.assertEqual({error['line']: error['error'] for error in errors}, {
+            4: 'Enter a valid username. This value may contain only letters, numbers, and @/./+/-/_ characters.',
+            5: 'duplicate username in roster',
+            6: 'username already exists',
+            7: 'Enter a valid email address.',
+        })
+        ada = User.objects.get(username='ada')
+        self.assertTrue(ada.check_password('pw-ada-1'))
+        self.assertEqual(ada.first_name, 'Ada')
+        self.assertFalse(User.objects.get(username='grace').has_usable_password())
+        self.assertEqual(UserProgress.objects.filter(user__username__in=['ada', 'grace']).count(), 2)
+        self.assertEqual(UserProfile.objects.filter(user__username__in=['ada', 'grace']).count(), 2)
+        self.assertEqual(stats.funnel()['learners'], 2)
+
+    def test_command_hashes_across_processes(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as roster:
+            roster.write(ROSTER)
+            roster.flush()
+            out, err = StringIO(), StringIO()
+            call_command('import_users', roster.name, '--workers', '2', '--batch-size', '2', stdout=out, stderr=err)
+        self.assertIn('Created 2 users', out.getvalue())
+        self.assertIn('line 5 (ada): duplicate username in roster', err.getvalue())
+        self.assertImported([
+            {'line': int(line.split()[1]), 'error': line.split(': ', 1)[1]} for line in err.getvalue().splitlines()
+        ])
+
+    @override_settings(PASSWORD_IMPORT_WORKERS=1)
+    def test_admin_endpoint(self):
+        self.client.force_login(User.objects.create_user(username='teacher', is_staff=True))
+        response = self.client.post('/api/users/import/', ROSTER, content_type='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 2)
+        self.assertImported(response.json()['errors'])
+
+        response = self.client.post('/api/users/import/', 'name\nbob\n', content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+
+    def test_endpoint_requires_staff(self):
+        self.client.force_login(User.objects.get(username='existing'))
+        response = self.client.post('/api/users/import/', ROSTER, content_type='text/csv')
+        self.assertEqual(response.status_code, 403)
+
+
+class ArchiveInactiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        long_ago = timezone.now() - timedelta(days=400)
+        self.dormant = User.objects.create_user(username='dormant', password='pw-12345')
+        UserProgress.objects.create(user=self.dormant)
+        UserProfile.objects.create(user=self.dormant)
+        submit_completion(self.dormant, 1, 80)
+        submit_completion(self.dormant, 2, 90)
+        ProgressEvent.objects.update(recorded_at=long_ago)
+        # Registered through /api/users/register/ and never came back
+        abandoned = User.objects.create_user(username='abandoned', password='pw-12345')
+        UserProfile.objects.create(user=abandoned)
+        User.objects.create_user(username='admin', password='pw-12345', is_staff=True)
+        User.objects.update(date_joined=long_ago, last_login=None)
+        User.objects.filter(username='dormant').update(last_login=long_ago)
+
+        self.active = User.objects.create_user(username='active', password='pw-12345')
+        UserProgress.objects.create(user=self.active)
+        submit_completion(self.active, 1, 70)
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_inactive', '--days', '365', *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_only_counts(self):
+        self.assertIn('Would archive 2 accounts', self.archive('--dry-run'))
+        self.assertEqual(User.objects.count(), 4)
+
+    def test_inactive_accounts_are_archived_and_restored_on_login(self):
+        funnel = stats.funnel()
+        completions = list(LessonCompletion.objects.filter(user=self.dormant).values_list('pk', 'lesson_id', 'score'))
+
+        output = self.archive('--batch-size', '1')
+
+        self.assertIn('Archived 2 accounts', output)
+        self.assertEqual(sorted(User.objects.values_list('username', flat=True)), ['active', 'admin'])
+        self.assertEqual(sorted(ArchivedUser.objects.values_list('username', flat=True)), ['abandoned', 'dormant'])
+        self.assertFalse(LessonCompletion.objects.filter(user_id=self.dormant.pk).exists())
+        self.assertEqual(stats.funnel()['learners'], 1)
+        # The username stays taken while archived
+        response = self.client.post('/api/register/', {'username': 'dormant', 'password': 'x'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            '/api/login/', {'username': 'dormant', 'password': 'pw-12345'}, content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_score'], 170)
+        self.assertEqual(
+            list(LessonCompletion.objects.filter(user=self.dormant).values_list('pk', 'lesson_id', 'score')), completions
+        )
+        self.assertFalse(ArchivedUser.objects.filter(username='dormant').exists())
+        self.assertEqual(stats.funnel(), funnel)
+        self.assertEqual(self.client.get('/api/progress/').json()['completed_lessons'], [1, 2])
+
+    def test_wrong_password_leaves_the_account_archived(self):
+        self.archive()
+
+        for username in ('dormant', 'abandoned'):
+            response = self.client.post(
+                '/api/login/', {'username': username, 'password': 'wrong-guess'}, content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 401)
+        self.assertEqual(sorted(ArchivedUser.objects.values_list('username', flat=True)), ['abandoned', 'dormant'])
+        self.assertFalse(User.objects.filter(username__in=['dormant', 'abandoned']).exists())
@@ -0,0 +1,12 @@
+from django.urls import path
+from . import views
+
+app_name = 'users'
+
+urlpatterns = [
+    path('register/', views.register_user, name='register'),
+    path('login/', views.login_user, name='login'),
+    path('progress/', views.get_user_progress, name='get_user_progress'),
+    path('update-progress/', views.update_progress, name='update_progress'),
+    path('import/', views.import_users, name='import_users'),
+]
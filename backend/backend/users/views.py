@@ -1,13 +1,24 @@
+import io
+from itertools import islice
+
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import login, logout
 from django.contrib.auth.models import User
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.db.models import FilteredRelation, FloatField, Q
+from django.db.models.functions import Coalesce
+from . import lifecycle
 from .models import UserProfile
-from courses.models import UserProgress, LearningTopic
-import json
+from .roster import RosterError, import_roster, read_roster
+from ai_literacy_backend.passwords import HashingBusy, authenticate_user, busy_response, hash_password
+from courses.models import LearningTopic, TopicProgress
+
+# Rows per upload, so an import finishes well within the request timeout;
+# manage.py import_users has no limit
+MAX_IMPORT_ROWS = 2000
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -22,13 +33,17 @@ def register_user(request):
         if not all([username, email, password]):
             return Response({'error': 'Username, email, and password required'}, 
                           status=status.HTTP_400_BAD_REQUEST)
+        if lifecycle.is_archived(username):
+            return Response({'error': 'Username already exists'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
         
-        user = User.objects.create_user(
+        user = User.objects.create(
             username=username,
-            email=email,
-            password=password,
+            email=User.objects.normalize_email(email),
+            password=hash_password(password),
             first_name=first_name
         )
+        UserProfile.objects.create(user=user)
         
         return Response({
             'message': 'User created successfully',
@@ -39,6 +54,8 @@ def register_user(request):
     except IntegrityError:
         return Response({'error': 'Username already exists'}, 
                       status=status.HTTP_400_BAD_REQUEST)
+    except HashingBusy:
+        return busy_response()
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -51,10 +68,16 @@ def login_user(request):
         return Response({'error': 'Username and password required'}, 
                       status=status.HTTP_400_BAD_REQUEST)
     
-    user = authenticate(username=username, password=password)
+    try:
+        user = authenticate_user(request, username, password)
+        if user is None and lifecycle.restore(username, password):
+            # Archived for inactivity: bring the account back and try again
+            user = authenticate_user(request, username, password)
+    except HashingBusy:
+        return busy_response()
     if user:
         login(request, user)
-        profile = user.userprofile
+        profile, _ = UserProfile.objects.get_or_create(user=user)
         
         return Response({
             'message': 'Login successful',
@@ -76,22 +99,26 @@ def login_user(request):
 def get_user_progress(request):
     """Get user's learning progress"""
     user = request.user
-    profile = user.userprofile
+    profile, _ = UserProfile.objects.get_or_create(user=user)
     
-    # Get progress for each topic
-    topics = LearningTopic.objects.all()
-    progress_data = []
-    
-    for topic in topics:
-        user_progress = UserProgress.objects.filter(user=user, topic=topic).first()
-        progress_data.append({
+    # One query for all topics, left-joined to this user's progress row (if any)
+    topics = LearningTopic.objects.annotate(
+        mine=FilteredRelation('progress', condition=Q(progress__user=user)),
+        user_lessons_completed=Coalesce('mine__lessons_completed', 0),
+        user_average_score=Coalesce('mine__average_score', 0.0, output_field=FloatField()),
+        user_difficulty=Coalesce('mine__current_difficulty', 1),
+    ).order_by('id')
+    progress_data = [
+        {
             'topic_id': topic.id,
             'topic_name': topic.name,
             'difficulty_level': topic.difficulty_level,
-            'lessons_completed': user_progress.lessons_completed if user_progress else 0,
-            'average_score': user_progress.average_score if user_progress else 0,
-            'current_difficulty': user_progress.current_difficulty if user_progress else 1
-        })
+            'lessons_completed': topic.user_lessons_completed,
+            'average_score': topic.user_average_score,
+            'current_difficulty': topic.user_difficulty
+        }
+        for topic in topics
+    ]
     
     return Response({
         'user_stats': {
@@ -111,15 +138,26 @@ def update_progress(request):
     topic_id = request.data.get('topic_id')
     score = request.data.get('score', 0)
     
+    try:
+        score = int(score)
+    except (TypeError, ValueError):
+        return Response({'error': 'score must be an integer'}, 
+                      status=status.HTTP_400_BAD_REQUEST)
+    
     try:
         topic = LearningTopic.objects.get(id=topic_id)
-        
-        # Get or create progress record
-        progress, created = UserProgress.objects.get_or_create(
+    except (LearningTopic.DoesNotExist, ValueError, TypeError):
+        return Response({'error': 'Topic not found'}, 
+                      status=status.HTTP_404_NOT_FOUND)
+    
+    with transaction.atomic():
+        # Lock the rows so concurrent submissions don't lose updates
+        progress, created = TopicProgress.objects.select_for_update().get_or_create(
             user=user,
             topic=topic,
             defaults={'lessons_completed': 0, 'average_score': 0, 'current_difficulty': 1}
         )
+        profile, _ = UserProfile.objects.select_for_update().get_or_create(user=user)
         
         # Update progress
         progress.lessons_completed += 1
@@ -138,17 +176,35 @@ def update_progress(request):
         
         # Update user XP
         xp_gained = max(10, int(score / 10))  # 10-100 XP based on score
-        user.userprofile.add_xp(xp_gained)
-        
-        return Response({
-            'message': 'Progress updated successfully',
-            'xp_gained': xp_gained,
-            'new_level': user.userprofile.level,
-            'total_xp': user.userprofile.total_xp,
-            'lessons_completed': progress.lessons_completed,
-            'current_difficulty': progress.current_difficulty
-        })
-        
-    except LearningTopic.DoesNotExist:
-        return Response({'error': 'Topic not found'}, 
-                      status=status.HTTP_404_NOT_FOUND)
+        profile.add_xp(xp_gained)
+    
+    return Response({
+        'message': 'Progress updated successfully',
+        'xp_gained': xp_gained,
+        'new_level': profile.level,
+        'total_xp': profile.total_xp,
+        'lessons_completed': progress.lessons_completed,
+        'current_difficulty': progress.current_difficulty
+    })
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def import_users(request):
+    """Create users from a CSV roster, sent as text/csv or as a 'roster' file upload"""
+    if request.content_type.startswith('text/csv'):
+        lines = io.StringIO(request.body.decode('utf-8-sig'), newline='')
+    elif 'roster' in request.FILES:
+        lines = io.TextIOWrapper(request.FILES['roster'].file, encoding='utf-8-sig', newline='')
+    else:
+        return Response({'error': 'Send the roster as text/csv or as a "roster" file upload'},
+                      status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        records = list(islice(read_roster(lines), MAX_IMPORT_ROWS + 1))
+    except (RosterError, UnicodeDecodeError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if len(records) > MAX_IMPORT_ROWS:
+        return Response({'error': f'at most {MAX_IMPORT_ROWS} rows per upload; use manage.py import_users for larger rosters'},
+                      status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(import_roster(records))
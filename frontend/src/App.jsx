@@ -11,7 +11,7 @@ import './styles/style.css';
 
 function App() {
   return (
-    <Router>
+    <Router basename={import.meta.env.BASE_URL}>
       <ProgressProvider>
         <Routes>
           {/* Public route */}
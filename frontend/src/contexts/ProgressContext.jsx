@@ -1,5 +1,5 @@
-import { createContext, useContext, useState, useEffect } from 'react';
-import { getUserProgress, updateProgress as apiUpdateProgress } from '../utils/api';
+import { createContext, useContext, useState, useEffect, useRef } from 'react';
+import { getUserProgress, openProgressStream, updateProgress as apiUpdateProgress } from '../utils/api';
 
 const ProgressContext = createContext();
 
@@ -11,6 +11,8 @@ export function ProgressProvider({ children }) {
   const [totalLessons] = useState(4);
   const [certificationEarned, setCertificationEarned] = useState(false);
   const [certificationDate, setCertificationDate] = useState(null);
+  const streamRef = useRef(null);
+  const stateRef = useRef({ completed: [], progress: {}, certified: false, certDate: null });
 
   // Load progress from sessionStorage
   const loadFromSessionStorage = () => {
@@ -18,6 +20,12 @@ export function ProgressProvider({ children }) {
       const cached = sessionStorage.getItem('lessonProgress');
       if (cached) {
         const data = JSON.parse(cached);
+        stateRef.current = {
+          completed: data.completedLessons || [],
+          progress: data.progressData || {},
+          certified: data.certificationEarned || false,
+          certDate: data.certificationDate || null
+        };
         setCompletedLessons(data.completedLessons || []);
         setProgressData(data.progressData || {});
         setCertificationEarned(data.certificationEarned || false);
@@ -45,6 +53,38 @@ export function ProgressProvider({ children }) {
     }
   };
 
+  // Apply a full /api/progress/ payload
+  const applyProgress = (data) => {
+    const completed = data.completed_lessons || [];
+    const progress = data.progress || {};
+    const certified = data.certification_earned || false;
+    const certDate = data.certification_date || null;
+
+    stateRef.current = { completed, progress, certified, certDate };
+    setCompletedLessons(completed);
+    setProgressData(progress);
+    setCertificationEarned(certified);
+    setCertificationDate(certDate);
+    saveToSessionStorage(completed, progress, certified, certDate);
+  };
+
+  // Apply a live event from /api/progress/stream/
+  const applyStreamEvent = (type, data) => {
+    if (type === 'snapshot') {
+      applyProgress(data);
+      setLoading(false);
+      return;
+    }
+    const current = stateRef.current;
+    const progress = type === 'progress' ? { ...current.progress, ...data.progress } : current.progress;
+    applyProgress({
+      completed_lessons: Object.keys(progress).map(Number).sort((a, b) => a - b),
+      progress,
+      certification_earned: data.certification_earned,
+      certification_date: data.certification_date
+    });
+  };
+
   // Fetch progress from backend
   const fetchProgress = async () => {
     setLoading(true);
@@ -55,16 +95,7 @@ export function ProgressProvider({ children }) {
 
       // Check if data is a valid response object (not null/undefined)
       if (data && typeof data === 'object') {
-        const completed = data.completed_lessons || [];
-        const progress = data.progress || {};
-        const certified = data.certification_earned || false;
-        const certDate = data.certification_date || null;
-
-        setCompletedLessons(completed);
-        setProgressData(progress);
-        setCertificationEarned(certified);
-        setCertificationDate(certDate);
-        saveToSessionStorage(completed, progress, certified, certDate);
+        applyProgress(data);
         // Clear any previous errors on successful load
         setError(null);
       } else {
@@ -109,6 +140,7 @@ export function ProgressProvider({ children }) {
       }
     };
 
+    stateRef.current = { ...stateRef.current, completed: newCompleted, progress: newProgressData };
     setCompletedLessons(newCompleted);
     setProgressData(newProgressData);
     saveToSessionStorage(newCompleted, newProgressData, certificationEarned, certificationDate);
@@ -118,8 +150,11 @@ export function ProgressProvider({ children }) {
       const success = await apiUpdateProgress(lessonId, 100);
       if (success) {
         console.log(`✓ Lesson ${lessonId} progress saved to server!`);
-        // Refresh from backend to confirm
-        await fetchProgress();
+        // The live stream delivers the confirmed state; without it, refresh from backend
+        const streaming = streamRef.current && streamRef.current.readyState === EventSource.OPEN;
+        if (!streaming) {
+          await fetchProgress();
+        }
       } else {
         console.log(`⚠ Failed to save Lesson ${lessonId} to server (will retry)`);
         // Keep the optimistic update, queue for retry
@@ -159,9 +194,12 @@ export function ProgressProvider({ children }) {
     return null; // All lessons completed
   };
 
-  // Initialize on mount
+  // Initialize on mount, then follow live updates instead of re-fetching
   useEffect(() => {
     fetchProgress();
+    const source = openProgressStream(applyStreamEvent);
+    streamRef.current = source;
+    return () => source?.close();
   }, []);
 
   const value = {
@@ -87,4 +87,43 @@ export async function getUserProgress() {
         console.error('Get progress error:', error);
         return null;
     }
-}
\ No newline at end of file
+}
+
+// Flush queued lesson events in one request.
+// events: [{ lesson_id, score, client_ts }] where client_ts is an ISO string or Date.now()
+export async function syncProgressBatch(events) {
+    try {
+        const response = await fetch(`${API_BASE_URL}/progress/batch/`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            credentials: 'include',
+            body: JSON.stringify({ events })
+        });
+        const data = await response.json();
+        if (response.ok) {
+            return data;
+        } else {
+            console.error('Failed to sync progress batch:', data);
+            return null;
+        }
+    } catch (error) {
+        console.error('Progress batch sync error:', error);
+        return null;
+    }
+}
+
+// Subscribe to live progress events (served when the backend runs under ASGI).
+// onEvent(type, data) receives 'snapshot', 'progress' and 'certification' events.
+// Returns the EventSource so the caller can close it, or null if unsupported.
+export function openProgressStream(onEvent) {
+    if (typeof EventSource === 'undefined') {
+        return null;
+    }
+    const source = new EventSource(`${API_BASE_URL}/progress/stream/`, { withCredentials: true });
+    ['snapshot', 'progress', 'certification'].forEach((type) => {
+        source.addEventListener(type, (event) => onEvent(type, JSON.parse(event.data)));
+    });
+    return source;
+}
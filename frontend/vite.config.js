@@ -4,4 +4,6 @@ import react from '@vitejs/plugin-react'
 // https://vite.dev/config/
 export default defineConfig({
   plugins: [react()],
+  // Build with VITE_BASE=/static/app/ when Django serves the app (see DEPLOYMENT.md)
+  base: process.env.VITE_BASE || '/',
 })